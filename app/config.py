@@ -28,6 +28,98 @@ REDIS_URL = os.getenv("REDIS_URL")
 REDIS_CACHE_TTL = os.getenv("REDIS_CACHE_TTL")
 
 SAGEMAKER_ENDPOINT = os.getenv("SAGEMAKER_ENDPOINT")
+AWS_REGION = os.getenv("AWS_REGION")
+USE_SAGEMAKER = os.getenv("USE_SAGEMAKER", "false").lower() == "true"
+# Where content recommendations are ranked: "local", "http" or "sagemaker"
+RECOMMENDATION_BACKEND = os.getenv(
+    "RECOMMENDATION_BACKEND", "sagemaker" if USE_SAGEMAKER else "local"
+)
+RECOMMENDATION_REMOTE_URL = os.getenv("RECOMMENDATION_REMOTE_URL")
+# Deadline of a remote call, retries included
+RECOMMENDATION_REMOTE_TIMEOUT_SECONDS = float(
+    os.getenv("RECOMMENDATION_REMOTE_TIMEOUT_SECONDS", 1.0)
+)
+RECOMMENDATION_REMOTE_RETRIES = int(os.getenv("RECOMMENDATION_REMOTE_RETRIES", 2))
+RECOMMENDATION_REMOTE_POOL_SIZE = int(os.getenv("RECOMMENDATION_REMOTE_POOL_SIZE", 20))
+# Consecutive failures that open the circuit, and how long it stays open
+RECOMMENDATION_REMOTE_BREAKER_FAILURES = int(
+    os.getenv("RECOMMENDATION_REMOTE_BREAKER_FAILURES", 5)
+)
+RECOMMENDATION_REMOTE_BREAKER_RESET_SECONDS = float(
+    os.getenv("RECOMMENDATION_REMOTE_BREAKER_RESET_SECONDS", 30)
+)
+# Concurrent requests merged into one remote call
+RECOMMENDATION_REMOTE_BATCH_SIZE = int(
+    os.getenv("RECOMMENDATION_REMOTE_BATCH_SIZE", 32)
+)
+RECOMMENDATION_REMOTE_BATCH_WAIT_MS = float(
+    os.getenv("RECOMMENDATION_REMOTE_BATCH_WAIT_MS", 5)
+)
+
+RECOMMENDATION_MODEL_DIR = os.getenv("RECOMMENDATION_MODEL_DIR", "recommendation_model")
+RECOMMENDATION_DRIFT_THRESHOLD = float(
+    os.getenv("RECOMMENDATION_DRIFT_THRESHOLD", "0.2")
+)
+# Books changed since the last fit that trigger a background retrain
+RECOMMENDATION_RETRAIN_CHANGES = int(os.getenv("RECOMMENDATION_RETRAIN_CHANGES", 1000))
+# Nearest-neighbour search backend: "brute" (exact) or "lsh" (approximate)
+RECOMMENDATION_INDEX_BACKEND = os.getenv("RECOMMENDATION_INDEX_BACKEND", "brute")
+RECOMMENDATION_LSH_TABLES = int(os.getenv("RECOMMENDATION_LSH_TABLES", 24))
+RECOMMENDATION_LSH_BITS = int(os.getenv("RECOMMENDATION_LSH_BITS", 8))
+RECOMMENDATION_LSH_PROBES = int(os.getenv("RECOMMENDATION_LSH_PROBES", 2))
+RECOMMENDATION_LSH_MAX_CANDIDATES = int(
+    os.getenv("RECOMMENDATION_LSH_MAX_CANDIDATES", 20000)
+)
+RECOMMENDATION_TRAINING_BATCH_SIZE = int(
+    os.getenv("RECOMMENDATION_TRAINING_BATCH_SIZE", 1000)
+)
+# Worker processes used for training; 0 uses every core
+RECOMMENDATION_TRAINING_WORKERS = int(os.getenv("RECOMMENDATION_TRAINING_WORKERS", 0))
+# Precomputed recommendations older than this many seconds are recomputed
+RECOMMENDATION_MAX_AGE = int(os.getenv("RECOMMENDATION_MAX_AGE", 86400))
+RECOMMENDATION_PRECOMPUTE_BATCH_SIZE = int(
+    os.getenv("RECOMMENDATION_PRECOMPUTE_BATCH_SIZE", 500)
+)
+RECOMMENDATION_PRECOMPUTE_CHUNK_SIZE = int(
+    os.getenv("RECOMMENDATION_PRECOMPUTE_CHUNK_SIZE", 10000)
+)
+# Worker processes used for precompute; 0 uses every core
+RECOMMENDATION_PRECOMPUTE_WORKERS = int(
+    os.getenv("RECOMMENDATION_PRECOMPUTE_WORKERS", 0)
+)
+# Top-rated lists served to users the recommendation model cannot serve
+FALLBACK_TOP_N = int(os.getenv("FALLBACK_TOP_N", 50))
+FALLBACK_REFRESH_SECONDS = int(os.getenv("FALLBACK_REFRESH_SECONDS", 3600))
+# Reviews at the catalog mean rating added to every book when ranking them
+FALLBACK_PRIOR_REVIEWS = int(os.getenv("FALLBACK_PRIOR_REVIEWS", 5))
+TRAINING_SNAPSHOT_DIR = os.getenv("TRAINING_SNAPSHOT_DIR", "training_snapshots")
+# Rows per Parquet row group, and per database fetch, when exporting
+TRAINING_SNAPSHOT_BATCH_SIZE = int(os.getenv("TRAINING_SNAPSHOT_BATCH_SIZE", 10000))
+SIMILAR_BOOKS_TOP_K = int(os.getenv("SIMILAR_BOOKS_TOP_K", 10))
+
+COLLABORATIVE_MODEL_DIR = os.getenv("COLLABORATIVE_MODEL_DIR", "collaborative_model")
+COLLABORATIVE_FACTORS = int(os.getenv("COLLABORATIVE_FACTORS", 32))
+COLLABORATIVE_REGULARIZATION = float(os.getenv("COLLABORATIVE_REGULARIZATION", "0.1"))
+COLLABORATIVE_ITERATIONS = int(os.getenv("COLLABORATIVE_ITERATIONS", 10))
+# Weight of the content scores in the hybrid engine, between 0 and 1
+RECOMMENDATION_HYBRID_WEIGHT = float(os.getenv("RECOMMENDATION_HYBRID_WEIGHT", "0.5"))
 
 SUMMARIZATION_API_URL = os.getenv("SUMMARIZATION_API_URL")
 RECOMMENDATION_API_URL = os.getenv("RECOMMENDATION_API_URL")
+
+SUMMARIZATION_MODEL = os.getenv("SUMMARIZATION_MODEL", "t5-small")
+# Requests summarized together, and how long to wait for them
+SUMMARIZATION_BATCH_SIZE = int(os.getenv("SUMMARIZATION_BATCH_SIZE", 8))
+SUMMARIZATION_BATCH_WAIT_MS = float(os.getenv("SUMMARIZATION_BATCH_WAIT_MS", 20))
+# Input window of the model, prompt included; longer content is chunked
+SUMMARIZATION_CHUNK_TOKENS = int(os.getenv("SUMMARIZATION_CHUNK_TOKENS", 512))
+# Dedicated worker processes, each with its own copy of the model
+SUMMARIZATION_WORKERS = int(os.getenv("SUMMARIZATION_WORKERS", 1))
+# Queued requests beyond which new ones are rejected with 503
+SUMMARIZATION_MAX_QUEUE = int(os.getenv("SUMMARIZATION_MAX_QUEUE", 64))
+# Review changes that make a stored review summary refresh in the background,
+# and the age after which any change does
+REVIEW_SUMMARY_REFRESH_REVIEWS = int(os.getenv("REVIEW_SUMMARY_REFRESH_REVIEWS", 5))
+REVIEW_SUMMARY_MAX_AGE_SECONDS = int(os.getenv("REVIEW_SUMMARY_MAX_AGE_SECONDS", 86400))
+# Incremental updates of a review summary before it is rebuilt from every review
+REVIEW_SUMMARY_MAX_FOLDS = int(os.getenv("REVIEW_SUMMARY_MAX_FOLDS", 20))
@@ -1,7 +1,17 @@
 import datetime
 import logging
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import declarative_base, relationship
 
 # Setup logger
@@ -53,6 +63,8 @@ class Book(Base):
         year_of_publication (int): The year the book was published.
         content (str): The content of the book.
         summary (str): The summary of the book.
+        review_version (int): Incremented whenever a review of the book changes.
+        updated_at (datetime): The timestamp when the book was last changed.
     """
 
     __tablename__ = "books"
@@ -63,6 +75,13 @@ class Book(Base):
     year_of_publication = Column(Integer)
     content = Column(Text)
     summary = Column(Text, default="Summary is being generated")
+    review_version = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(
+        DateTime,
+        default=datetime.datetime.utcnow,
+        onupdate=datetime.datetime.utcnow,
+        index=True,
+    )
 
     reviews = relationship("Review", back_populates="book")
 
@@ -81,6 +100,7 @@ class Review(Base):
         user_id (int): The foreign key linking to the user who wrote the review.
         review_text (str): The text content of the review.
         rating (int): The rating given in the review.
+        updated_at (datetime): The timestamp when the review was last changed.
     """
 
     __tablename__ = "reviews"
@@ -89,6 +109,12 @@ class Review(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     review_text = Column(String)
     rating = Column(Integer)
+    updated_at = Column(
+        DateTime,
+        default=datetime.datetime.utcnow,
+        onupdate=datetime.datetime.utcnow,
+        index=True,
+    )
 
     book = relationship("Book", back_populates="reviews")
     user = relationship("User")
@@ -107,6 +133,9 @@ class UserPreferences(Base):
         user_id (int): The foreign key linking to the user.
         preferred_genres (str): The user's preferred genres.
         preferred_authors (str): The user's preferred authors.
+        preference_vector (bytes): The TF-IDF vector of the preferences.
+        vector_version (str): The model version and preference signature the
+                              vector was computed for.
     """
 
     __tablename__ = "user_preferences"
@@ -114,6 +143,8 @@ class UserPreferences(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     preferred_genres = Column(String, nullable=False)
     preferred_authors = Column(String, nullable=False)
+    preference_vector = Column(LargeBinary)
+    vector_version = Column(String)
 
     user = relationship("User", back_populates="preferences")
 
@@ -128,18 +159,24 @@ class Recommendation(Base):
 
     Attributes:
         id (int): The primary key for the recommendation.
-        user_id (int): The foreign key linking to the user.
+        user_id (int): The foreign key linking to the user, unique per user.
         recommended_books (str): The book IDs recommended for the user.
+        scores (str): The score of each recommended book.
+        model_version (str): The recommendation model version used.
         created_at (datetime): The timestamp when the recommendation was created.
         updated_at (datetime): The timestamp when the recommendation was last updated.
     """
 
     __tablename__ = "recommendations"
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(
+        Integer, ForeignKey("users.id"), nullable=False, unique=True, index=True
+    )
     recommended_books = Column(
         Text, nullable=False
-    )  # Store book IDs as JSON or comma-separated list
+    )  # Store book IDs as a JSON array, in rank order
+    scores = Column(Text)  # Store scores as a JSON array aligned with the book IDs
+    model_version = Column(String)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     updated_at = Column(
         DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow
@@ -150,3 +187,143 @@ class Recommendation(Base):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         logger.info(f"Recommendations generated for user {self.user_id}")
+
+
+class SimilarBooks(Base):
+    """
+    Represents the precomputed most similar books for a book.
+
+    Attributes:
+        book_id (int): The primary key, the book the neighbours belong to.
+        similar_book_ids (str): The similar book IDs, most similar first.
+        scores (str): The cosine similarity of each similar book.
+        model_version (str): The recommendation model version used.
+        updated_at (datetime): The timestamp when the neighbours were computed.
+    """
+
+    __tablename__ = "similar_books"
+    book_id = Column(Integer, primary_key=True)
+    similar_book_ids = Column(Text, nullable=False)  # Store book IDs as JSON
+    scores = Column(Text, nullable=False)  # Store scores as JSON
+    model_version = Column(String)
+    updated_at = Column(
+        DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow
+    )
+
+
+class BackgroundJob(Base):
+    """
+    Represents a long-running job executed outside the request cycle.
+
+    Attributes:
+        id (int): The primary key for the job.
+        kind (str): The kind of job, e.g., 'recommendation' or 'collaborative'.
+        status (str): One of 'pending', 'running', 'succeeded' or 'failed'.
+        progress (float): The completed fraction of the job, from 0 to 1.
+        detail (str): The job result or error message, as JSON.
+        pid (int): The ID of the process running the job.
+        created_at (datetime): The timestamp when the job was created.
+        started_at (datetime): The timestamp when the job started running.
+        finished_at (datetime): The timestamp when the job finished.
+    """
+
+    __tablename__ = "background_jobs"
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    kind = Column(String, nullable=False, index=True)
+    status = Column(String, nullable=False, default="pending", index=True)
+    progress = Column(Float, nullable=False, default=0.0)
+    detail = Column(Text)
+    pid = Column(Integer)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+
+class DirtyUser(Base):
+    """
+    Represents a user whose precomputed recommendations need recomputing.
+
+    Attributes:
+        user_id (int): The primary key, the user to recompute.
+        reason (str): Why the user was marked, e.g., 'preferences' or 'model'.
+        marked_at (datetime): The timestamp when the user was last marked.
+    """
+
+    __tablename__ = "dirty_users"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    reason = Column(String)
+    marked_at = Column(
+        DateTime, nullable=False, default=datetime.datetime.utcnow, index=True
+    )
+
+
+class PrecomputeChunk(Base):
+    """
+    Represents a completed chunk of a full recommendation precompute.
+
+    Attributes:
+        id (int): The primary key for the checkpoint.
+        model_version (str): The recommendation model version the chunk used.
+        start_user_id (int): The first user ID of the chunk.
+        stop_user_id (int): The user ID the chunk stops before.
+        users (int): The number of users recomputed.
+        seconds (float): The time taken to recompute the chunk.
+        completed_at (datetime): The timestamp when the chunk was stored.
+    """
+
+    __tablename__ = "precompute_chunks"
+    __table_args__ = (UniqueConstraint("model_version", "start_user_id"),)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    model_version = Column(String, nullable=False, index=True)
+    start_user_id = Column(Integer, nullable=False)
+    stop_user_id = Column(Integer, nullable=False)
+    users = Column(Integer, nullable=False, default=0)
+    seconds = Column(Float)
+    completed_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+class SummaryCache(Base):
+    """
+    Represents a generated summary, keyed by everything that determines it.
+
+    Attributes:
+        key (str): The primary key, a SHA-256 hash of the model, generation
+                   parameters, prompt and input text.
+        summary (str): The generated summary.
+        model (str): The summarization model that generated it.
+        created_at (datetime): The timestamp when the summary was stored.
+    """
+
+    __tablename__ = "summary_cache"
+    key = Column(String(64), primary_key=True)
+    summary = Column(Text, nullable=False)
+    model = Column(String)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+class ReviewSummary(Base):
+    """
+    Represents the stored summary of the reviews of a book.
+
+    Attributes:
+        book_id (int): The primary key, the book whose reviews are summarized.
+        summary (str): The summary of the reviews.
+        review_version (int): The review version of the book it was computed from.
+        review_count (int): The number of reviews summarized.
+        last_review_id (int): The highest review ID summarized.
+        folds (int): New review batches folded in since the last full summary.
+        updated_at (datetime): The timestamp when the summary was computed.
+    """
+
+    __tablename__ = "review_summaries"
+    book_id = Column(Integer, ForeignKey("books.id"), primary_key=True)
+    summary = Column(Text, nullable=False)
+    review_version = Column(Integer, nullable=False)
+    review_count = Column(Integer, nullable=False)
+    last_review_id = Column(Integer, nullable=False, default=0, server_default="0")
+    folds = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(
+        DateTime,
+        default=datetime.datetime.utcnow,
+        onupdate=datetime.datetime.utcnow,
+    )
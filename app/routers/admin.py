@@ -5,9 +5,25 @@ from sqlalchemy.orm import Session
 
 from .. import database, models, schemas
 from ..auth import get_current_active_user, get_password_hash
+from ..config import SIMILAR_BOOKS_TOP_K
 from ..services.create_admin_service import create_admin
+from ..services.dirty_user_service import mark_users_dirty
 from ..services.fake_data_service import generate_fake_data
-from ..services.recommendation_service import train_recommendation_model
+from ..services.job_service import (
+    COLLABORATIVE,
+    PRECOMPUTE,
+    RECOMMENDATION,
+    SIMILAR_BOOKS,
+    SNAPSHOT,
+    SNAPSHOT_INCREMENTAL,
+    get_job,
+    start_training_job,
+)
+from ..services.recommendation_service import (
+    expire_precomputed_recommendations,
+    invalidate_user_recommendations,
+    precompute_dirty_recommendations,
+)
 
 # Setup logger
 logger = logging.getLogger("app.admin")
@@ -204,8 +220,11 @@ def set_user_preferences(
         db_preferences = models.UserPreferences(**preferences.dict(), user_id=user_id)
         db.add(db_preferences)
 
+    expire_precomputed_recommendations(db, user_id)
+    mark_users_dirty(db, [user_id])
     db.commit()
     db.refresh(db_preferences)
+    invalidate_user_recommendations(user_id)
     logger.info(f"Preferences for user ID {user_id} set successfully.")
     return db_preferences
 
@@ -322,23 +341,183 @@ def create_admin_for_test(
     return {"detail": "Admin created successfully"}
 
 
-@router.post("/train-recommendation-model", tags=["Admin"])
+@router.post(
+    "/train-recommendation-model",
+    response_model=schemas.BackgroundJob,
+    status_code=202,
+    tags=["Admin"],
+)
 def train_model_endpoint(db: Session = Depends(database.get_db)):
     """
-    Train the recommendation model.
+    Start training the recommendation model in a background job.
 
     Args:
         db (Session): The database session.
 
     Returns:
-        dict: A confirmation message.
+        schemas.BackgroundJob: The training job, to poll with /admin/jobs/{job_id}.
+    """
+    logger.info("Starting recommendation model training job")
+    return start_training_job(db, RECOMMENDATION)
+
+
+@router.post(
+    "/train-collaborative-model",
+    response_model=schemas.BackgroundJob,
+    status_code=202,
+    tags=["Admin"],
+)
+def train_collaborative_model_endpoint(
+    db: Session = Depends(database.get_db),
+    current_user: schemas.User = Depends(get_current_active_user),
+):
+    """
+    Start training the collaborative-filtering model in a background job.
+
+    Args:
+        db (Session): The database session.
+        current_user (schemas.User): The current active user.
+
+    Returns:
+        schemas.BackgroundJob: The training job, to poll with /admin/jobs/{job_id}.
+    """
+    logger.info("Starting collaborative model training job")
+    return start_training_job(db, COLLABORATIVE)
+
+
+@router.get("/jobs/{job_id}", response_model=schemas.BackgroundJob, tags=["Admin"])
+def get_job_status(
+    job_id: int,
+    db: Session = Depends(database.get_db),
+    current_user: schemas.User = Depends(get_current_active_user),
+):
+    """
+    Get the status and progress of a background job.
+
+    Args:
+        job_id (int): The ID of the job.
+        db (Session): The database session.
+        current_user (schemas.User): The current active user.
+
+    Returns:
+        schemas.BackgroundJob: The job.
+
+    Raises:
+        HTTPException: If the job is not found.
+    """
+    job = get_job(db, job_id)
+    if job is None:
+        logger.warning(f"Job with ID {job_id} not found.")
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post(
+    "/compute-similar-books",
+    response_model=schemas.BackgroundJob,
+    status_code=202,
+    tags=["Admin"],
+)
+def compute_similar_books_endpoint(
+    top_k: int = SIMILAR_BOOKS_TOP_K,
+    db: Session = Depends(database.get_db),
+    current_user: schemas.User = Depends(get_current_active_user),
+):
     """
-    logger.info("Training recommendation model")
-    result = train_recommendation_model(db)
-    logger.info("Recommendation model trained successfully")
+    Start precomputing the most similar books for every book in a background job.
+
+    Args:
+        top_k (int): The number of similar books to keep per book.
+        db (Session): The database session.
+        current_user (schemas.User): The current active user.
+
+    Returns:
+        schemas.BackgroundJob: The similarity job, to poll with /admin/jobs/{job_id}.
+    """
+    logger.info("Starting similar books job")
+    return start_training_job(db, SIMILAR_BOOKS, options={"top_k": top_k})
+
+
+@router.post("/precompute-recommendations", tags=["Admin"])
+def precompute_recommendations_endpoint(
+    db: Session = Depends(database.get_db),
+    current_user: schemas.User = Depends(get_current_active_user),
+):
+    """
+    Recompute the stored recommendations of users marked dirty.
+
+    Args:
+        db (Session): The database session.
+        current_user (schemas.User): The current active user.
+
+    Returns:
+        dict: The number of users recomputed and of marks cleared.
+
+    Raises:
+        HTTPException: If no recommendation model has been trained.
+    """
+    logger.info("Precomputing recommendations for dirty users")
+    try:
+        result = precompute_dirty_recommendations(db)
+    except FileNotFoundError as e:
+        logger.error("Recommendations not precomputed: %s", e)
+        raise HTTPException(status_code=409, detail=str(e))
+    logger.info("Recommendations precomputed successfully")
     return result
 
 
+@router.post(
+    "/precompute-recommendations/all",
+    response_model=schemas.BackgroundJob,
+    status_code=202,
+    tags=["Admin"],
+)
+def precompute_all_recommendations_endpoint(
+    db: Session = Depends(database.get_db),
+    current_user: schemas.User = Depends(get_current_active_user),
+):
+    """
+    Start recomputing every user's recommendations in a background job.
+
+    A job that stopped early resumes from the chunks it had not completed.
+
+    Args:
+        db (Session): The database session.
+        current_user (schemas.User): The current active user.
+
+    Returns:
+        schemas.BackgroundJob: The precompute job, to poll with /admin/jobs/{job_id}.
+    """
+    logger.info("Starting full recommendation precompute job")
+    return start_training_job(db, PRECOMPUTE)
+
+
+@router.post(
+    "/export-training-snapshot",
+    response_model=schemas.BackgroundJob,
+    status_code=202,
+    tags=["Admin"],
+)
+def export_training_snapshot_endpoint(
+    incremental: bool = False,
+    db: Session = Depends(database.get_db),
+    current_user: schemas.User = Depends(get_current_active_user),
+):
+    """
+    Start exporting books and reviews as a Parquet training snapshot.
+
+    Args:
+        incremental (bool): Only export rows changed since the last snapshot.
+        db (Session): The database session.
+        current_user (schemas.User): The current active user.
+
+    Returns:
+        schemas.BackgroundJob: The export job, to poll with /admin/jobs/{job_id}.
+    """
+    logger.info("Starting training snapshot export job")
+    return start_training_job(db, SNAPSHOT_INCREMENTAL if incremental else SNAPSHOT)
+
+
 @router.post("/reset-database", tags=["Admin", "Setup Test Env"])
 def reset_db_for_test(
     db: Session = Depends(database.get_db),
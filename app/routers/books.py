@@ -5,7 +5,14 @@ from sqlalchemy.future import select
 from sqlalchemy.orm import Session
 
 from .. import auth, database, models, schemas
-from ..services.summarization_service import generate_summary_for_content
+from ..services.book_service import fetch_book_cards
+from ..services.recommendation_service import index_book, unindex_book
+from ..services.similarity_service import get_similar_books
+from ..services.summarization_service import (
+    BACKGROUND,
+    SummarizationBusyError,
+    generate_summary_for_content,
+)
 
 # Setup logger
 logger = logging.getLogger("app.books")
@@ -39,7 +46,8 @@ def create_book(
     db.commit()
     db.refresh(db_book)
 
-    # Trigger background task for summary generation
+    # Add the book to the recommendation index, then generate its summary
+    background_tasks.add_task(index_book, db, db_book.id)
     background_tasks.add_task(generate_summary_for_content_task, db_book.id, db)
     logger.info(f"Book created successfully with ID: {db_book.id}")
 
@@ -57,7 +65,12 @@ async def generate_summary_for_content_task(book_id: int, db: Session):
     logger.info(f"Generating summary for book ID: {book_id}")
     book = db.query(models.Book).filter(models.Book.id == book_id).first()
     if book:
-        summary = await generate_summary_for_content(book.content)
+        try:
+            summary = await generate_summary_for_content(book.content, BACKGROUND, db)
+        except SummarizationBusyError:
+            # The summary can still be generated on demand
+            logger.warning(f"Skipped summary for book ID: {book_id}, queue is full")
+            return
         book.summary = summary
         db.commit()
         logger.info(f"Summary generated and updated for book ID: {book_id}")
@@ -89,6 +102,39 @@ def read_book(
     return db_book
 
 
+@router.get(
+    "/{book_id}/similar",
+    response_model=list[schemas.BookCard],
+    tags=["Book Management", "Recommendations"],
+)
+def read_similar_books(
+    book_id: int,
+    db: Session = Depends(database.get_db),
+    current_user: schemas.User = Depends(auth.get_current_user),
+):
+    """
+    Retrieve the precomputed most similar books of a book.
+
+    Args:
+        book_id (int): The ID of the book.
+        db (Session): Database session dependency.
+        current_user (schemas.User): The currently authenticated user.
+
+    Returns:
+        list[schemas.BookCard]: The similar books, most similar first.
+
+    Raises:
+        HTTPException: If similar books have not been computed for the book.
+    """
+    logger.info(f"Fetching similar books for book ID: {book_id}")
+    similar = get_similar_books(db, book_id)
+    if similar is None:
+        logger.warning(f"Similar books not computed for book ID: {book_id}")
+        raise HTTPException(status_code=404, detail="Similar books not found")
+    similar_book_ids, scores = similar
+    return fetch_book_cards(db, similar_book_ids, scores)
+
+
 @router.get("/", response_model=list[schemas.Book], tags=["Book Management"])
 def find_books(
     genre: str = None,
@@ -128,6 +174,7 @@ def find_books(
 def update_book(
     book_id: int,
     book: schemas.BookCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(database.get_db),
     current_user: schemas.User = Depends(auth.get_current_active_user),
 ):
@@ -137,6 +184,7 @@ def update_book(
     Args:
         book_id (int): The ID of the book to update.
         book (schemas.BookCreate): The new book details.
+        background_tasks (BackgroundTasks): To handle asynchronous tasks.
         db (Session): Database session dependency.
         current_user (schemas.User): The currently authenticated user.
 
@@ -156,6 +204,7 @@ def update_book(
 
     db.commit()
     db.refresh(db_book)
+    background_tasks.add_task(index_book, db, db_book.id)
     logger.info(f"Book with ID: {book_id} updated successfully")
     return db_book
 
@@ -165,6 +214,7 @@ def update_book(
 )
 def delete_book(
     book_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(database.get_db),
     current_user: schemas.User = Depends(auth.get_current_active_user),
 ):
@@ -173,6 +223,7 @@ def delete_book(
 
     Args:
         book_id (int): The ID of the book to delete.
+        background_tasks (BackgroundTasks): To handle asynchronous tasks.
         db (Session): Database session dependency.
         current_user (schemas.User): The currently authenticated user.
 
@@ -187,5 +238,6 @@ def delete_book(
         raise HTTPException(status_code=404, detail="Book not found")
     db.delete(db_book)
     db.commit()
+    background_tasks.add_task(unindex_book, db, book_id)
     logger.info(f"Book with ID: {book_id} deleted successfully")
     return db_book
@@ -1,4 +1,5 @@
 import logging
+from typing import Literal
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
@@ -6,9 +7,13 @@ from sqlalchemy.orm import Session
 from app.services.user_service import fetch_user_preferences
 
 from .. import database
+from ..services.fallback_service import get_fallback_recommendations
 from ..services.recommendation_service import (
     compute_recommendation,
+    get_cached_recommendations,
+    get_precomputed_recommendations,
     get_recommendations,
+    hydrate_recommendations,
 )
 
 # Setup logger
@@ -47,25 +52,54 @@ def calculate_recommendation(user_id: int, db: Session = Depends(database.get_db
 
 
 @router.get("/{user_id}", tags=["Recommendations"])
-def fetch_recommendations(user_id: int, db: Session = Depends(database.get_db)):
+def fetch_recommendations(
+    user_id: int,
+    engine: Literal["content", "collaborative", "hybrid"] = "content",
+    full: bool = False,
+    db: Session = Depends(database.get_db),
+):
     """
     Fetch personalized book recommendations for a given user based on their preferences.
 
     Args:
         user_id (int): The ID of the user to fetch recommendations for.
+        engine (str): The recommendation engine: "content" matches preferences
+                      against book text, "collaborative" uses review ratings and
+                      "hybrid" blends both.
+        full (bool): Return full books instead of lightweight cards.
         db (Session): Database session dependency.
 
     Returns:
-        list[schemas.Book]: A list of recommended books.
+        list[schemas.BookCard] | list[schemas.Book]: The recommended books, best
+                                                     first.
 
     Raises:
         HTTPException: If no recommendations could be found for the user.
     """
     logger.info(f"Fetching recommendations for user ID: {user_id}")
+    if engine == "content":
+        # Serve the precomputed row first, then the shared cache; compute online
+        # only when neither is fresh.
+        ranking = get_precomputed_recommendations(db, user_id)
+        if ranking is None:
+            ranking = get_cached_recommendations(user_id)
+        if ranking is not None:
+            logger.info(f"Recommendations served from storage for user ID: {user_id}")
+            return hydrate_recommendations(db, *ranking, full=full)
+
     try:
         user_preferences = fetch_user_preferences(db, user_id)
-        recommended_books = get_recommendations(db, user_preferences)
+    except HTTPException as e:
+        # Users without preferences get the top-rated books
+        logger.info(f"Serving fallback recommendations for user ID: {user_id}")
+        return _fallback_or_404(db, None, full, e)
+
+    try:
+        recommended_books = get_recommendations(db, user_preferences, engine, full)
         logger.info(f"Recommendations fetched successfully for user ID: {user_id}")
+    except FileNotFoundError as e:
+        logger.warning(f"Recommendation model unavailable for user ID: {user_id}")
+        return _fallback_or_404(db, user_preferences.preferred_genres, full, e)
     except Exception as e:
         logger.error(
             f"Failed to fetch recommendations for user ID: {user_id}. Exception: {e}"
@@ -73,4 +107,32 @@ def fetch_recommendations(user_id: int, db: Session = Depends(database.get_db)):
         raise HTTPException(
             status_code=404, detail=f"Could not find recommendation. Exception: {e}"
         )
+    if not recommended_books:
+        return _fallback_or_404(db, user_preferences.preferred_genres, full, None)
     return recommended_books
+
+
+def _fallback_or_404(db: Session, preferred_genres, full: bool, error):
+    """
+    Serve the top-rated books, or a 404 if no book has been rated yet.
+
+    Args:
+        db (Session): Database session.
+        preferred_genres (str | None): Comma-separated genres to favour.
+        full (bool): Return full books instead of lightweight cards.
+        error (Exception | None): Why the recommendations are unavailable.
+
+    Returns:
+        list[schemas.BookCard] | list[schemas.Book]: The fallback books.
+
+    Raises:
+        HTTPException: If there are no rated books to fall back on.
+    """
+    books = get_fallback_recommendations(db, preferred_genres, full=full)
+    if books:
+        return books
+    if isinstance(error, HTTPException):
+        raise error
+    raise HTTPException(
+        status_code=404, detail=f"Could not find recommendation. Exception: {error}"
+    )
@@ -5,6 +5,7 @@ from sqlalchemy.future import select
 from sqlalchemy.orm import Session
 
 from .. import auth, database, models, schemas
+from ..services.review_summary_service import bump_review_version
 
 # Setup logger
 logger = logging.getLogger("app.reviews")
@@ -40,6 +41,7 @@ def create_review(
             **review.dict(), book_id=book_id, user_id=current_user.id
         )
         db.add(db_review)
+        bump_review_version(db, book_id)
         db.commit()
         db.refresh(db_review)
         logger.info(f"Review created successfully for book ID: {book_id}")
@@ -114,6 +116,7 @@ def update_review(
 
     db_review.review_text = review_update.review_text
     db_review.rating = review_update.rating
+    bump_review_version(db, db_review.book_id)
     db.commit()
     db.refresh(db_review)
     logger.info(f"Review ID: {review_id} updated successfully")
@@ -152,6 +155,7 @@ def delete_review(
         raise HTTPException(status_code=404, detail="Review not found")
 
     db.delete(db_review)
+    bump_review_version(db, db_review.book_id)
     db.commit()
     logger.info(f"Review ID: {review_id} deleted successfully")
     return {"detail": "Review deleted"}
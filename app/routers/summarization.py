@@ -1,13 +1,19 @@
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models import Book, Review
+from app.models import Book
+from app.services.review_summary_service import (
+    get_review_summary,
+    needs_refresh,
+    refresh_review_summary,
+    refresh_review_summary_task,
+)
 from app.services.summarization_service import (
+    SummarizationBusyError,
     generate_summary_for_content,
-    generate_summary_for_reviews,
 )
 
 # Setup logger
@@ -16,6 +22,14 @@ logger = logging.getLogger("app.summarization")
 router = APIRouter()
 
 
+def _busy(e: SummarizationBusyError) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Summarization is busy, please retry later",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
 @router.post("/books/{book_id}/summary", tags=["Book Summarization"])
 async def generate_book_summary(book_id: int, db: Session = Depends(get_db)):
     """
@@ -29,7 +43,8 @@ async def generate_book_summary(book_id: int, db: Session = Depends(get_db)):
         dict: A dictionary containing the generated summary.
 
     Raises:
-        HTTPException: If the book is not found.
+        HTTPException: If the book is not found, or with status 503 if the
+                       summarization queue is full.
     """
     logger.info(f"Generating summary for book ID: {book_id}")
     book = db.query(Book).filter(Book.id == book_id).first()
@@ -38,10 +53,12 @@ async def generate_book_summary(book_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Book not found")
 
     try:
-        summary = await generate_summary_for_content(book.content)
+        summary = await generate_summary_for_content(book.content, db=db)
         book.summary = summary
         db.commit()
         logger.info(f"Summary generated successfully for book ID: {book_id}")
+    except SummarizationBusyError as e:
+        raise _busy(e)
     except Exception as e:
         logger.error(
             f"Failed to generate summary for book ID: {book_id}. Exception: {e}"
@@ -52,38 +69,62 @@ async def generate_book_summary(book_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("/books/{book_id}/reviews/summary", tags=["Book Summarization"])
-def generate_review_summary(book_id: int, db: Session = Depends(get_db)):
+async def generate_review_summary(
+    book_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)
+):
     """
-    Generate a summary for the reviews of a specific book.
+    Get the summary of the reviews of a specific book.
+
+    The stored summary is served as is while fresh. Once enough reviews changed,
+    it is still served, marked stale, while a refresh runs in the background.
+    The first summary of a book is generated on request.
 
     Args:
         book_id (int): The ID of the book for which the review summary is to be
                        generated.
+        background_tasks (BackgroundTasks): To refresh stale summaries.
         db (Session): Database session dependency.
 
     Returns:
-        dict: A dictionary containing the review texts and the generated summary.
+        dict: A dictionary containing the summary, the number of reviews it
+              covers and whether newer reviews are not covered yet.
 
     Raises:
-        HTTPException: If no reviews are found for the specified book.
+        HTTPException: If the book or its reviews are not found, or with status
+                       503 if the summarization queue is full.
     """
-    logger.info(f"Generating review summary for book ID: {book_id}")
-    reviews = db.query(Review).filter(Review.book_id == book_id).all()
-    if not reviews:
-        logger.warning(f"No reviews found for book ID: {book_id}")
-        raise HTTPException(status_code=404, detail="No reviews found for this book")
-
-    try:
-        review_texts = [
-            f"User Review: {review.review_text} || User Rating: {review.rating}"
-            for review in reviews
-        ]
-        summary = generate_summary_for_reviews(review_texts)
+    logger.info(f"Fetching review summary for book ID: {book_id}")
+    stored = get_review_summary(db, book_id)
+    if stored is None:
+        logger.warning(f"Book ID: {book_id} not found")
+        raise HTTPException(status_code=404, detail="Book not found")
+    review_version, review_summary = stored
+
+    if review_summary is None:
+        try:
+            review_summary = await refresh_review_summary(db, book_id)
+        except SummarizationBusyError as e:
+            raise _busy(e)
+        except Exception as e:
+            logger.error(
+                f"Failed to generate review summary for book ID: {book_id}. "
+                f"Exception: {e}"
+            )
+            raise HTTPException(
+                status_code=500, detail="Failed to generate review summary"
+            )
+        if review_summary is None:
+            logger.warning(f"No reviews found for book ID: {book_id}")
+            raise HTTPException(
+                status_code=404, detail="No reviews found for this book"
+            )
         logger.info(f"Review summary generated successfully for book ID: {book_id}")
-    except Exception as e:
-        logger.error(
-            f"Failed to generate review summary for book ID: {book_id}. Exception: {e}"
-        )
-        raise HTTPException(status_code=500, detail="Failed to generate review summary")
-
-    return {"reviews": review_texts, "summary": summary}
+    elif needs_refresh(review_summary, review_version):
+        logger.info(f"Refreshing stale review summary for book ID: {book_id}")
+        background_tasks.add_task(refresh_review_summary_task, book_id, db)
+
+    return {
+        "summary": review_summary.summary,
+        "review_count": review_summary.review_count,
+        "stale": review_summary.review_version < review_version,
+    }
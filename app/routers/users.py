@@ -5,6 +5,11 @@ from sqlalchemy.orm import Session
 
 from .. import database, models, schemas
 from ..auth import get_current_user, get_password_hash
+from ..services.dirty_user_service import mark_users_dirty
+from ..services.recommendation_service import (
+    expire_precomputed_recommendations,
+    invalidate_user_recommendations,
+)
 
 router = APIRouter()
 
@@ -109,8 +114,11 @@ def set_user_preferences(
         db.add(db_preferences)
         logger.info(f"Created new preferences for user ID: {current_user.id}")
 
+    expire_precomputed_recommendations(db, current_user.id)
+    mark_users_dirty(db, [current_user.id])
     db.commit()
     db.refresh(db_preferences)
+    invalidate_user_recommendations(current_user.id)
     return db_preferences
 
 
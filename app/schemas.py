@@ -1,3 +1,4 @@
+import datetime
 from typing import List, Optional
 
 from fastapi import Form
@@ -77,6 +78,18 @@ class Book(BookBase):
         from_attributes = True
 
 
+class BookCard(BaseModel):
+    """
+    Schema representing a lightweight book listing with a relevance score.
+    """
+
+    id: int
+    title: str
+    author: str
+    genre: str
+    score: float
+
+
 class ReviewBase(BaseModel):
     """
     Base schema for Review, containing common fields.
@@ -106,6 +119,7 @@ class Review(ReviewBase):
 
     class Config:
         orm_mode = True
+        from_attributes = True
 
 
 class OAuth2PasswordRequestFormCustom:
@@ -197,3 +211,22 @@ class Recommendation(RecommendationBase):
 
     class Config:
         orm_mode = True
+
+
+class BackgroundJob(BaseModel):
+    """
+    Schema representing the status of a background job.
+    """
+
+    id: int
+    kind: str
+    status: str
+    progress: float
+    detail: Optional[str] = None
+    created_at: datetime.datetime
+    started_at: Optional[datetime.datetime] = None
+    finished_at: Optional[datetime.datetime] = None
+
+    class Config:
+        orm_mode = True
+        from_attributes = True
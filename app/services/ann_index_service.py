@@ -0,0 +1,275 @@
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+
+# Set up logger
+logger = logging.getLogger("app.ann_index_service")
+
+BRUTE_FORCE = "brute"
+LSH = "lsh"
+BUILD_BLOCK_SIZE = 8192
+
+
+class BruteForceIndex:
+    """
+    Exact search: every book is a candidate for every query.
+    """
+
+    name = BRUTE_FORCE
+
+    def candidates(self, X_query) -> Optional[np.ndarray]:
+        """
+        Select the matrix rows to score for a query.
+
+        Args:
+            X_query (scipy.sparse.csr_matrix): A single encoded query.
+
+        Returns:
+            Optional[np.ndarray]: None, meaning all rows are scored.
+        """
+        return None
+
+    def meta(self) -> dict:
+        """
+        Describe the index for the model metadata.
+
+        Returns:
+            dict: The index backend.
+        """
+        return {"backend": self.name}
+
+
+class LSHIndex:
+    """
+    Approximate search with random-hyperplane locality sensitive hashing.
+
+    Each book is hashed into one bucket per table by the signs of its
+    projections on n_bits random hyperplanes, so books with a high cosine
+    similarity tend to share buckets. A query only scores the books found in
+    its buckets, plus the neighbouring buckets reached by flipping its
+    least-confident bits (multi-probe).
+
+    Recall/latency knobs:
+        n_tables: More tables raise recall and build/query cost.
+        n_bits: More bits make buckets smaller, lowering recall and latency.
+        n_probes: Extra buckets probed per table, raising recall and latency.
+        max_candidates: Upper bound on the books scored per query.
+
+    Attributes:
+        planes (np.ndarray): Hyperplanes, shape (n_features, n_tables * n_bits).
+        order (np.ndarray): Row indices sorted by bucket code, one row per table.
+        sorted_codes (np.ndarray): Bucket codes matching order, one row per table.
+    """
+
+    name = LSH
+
+    def __init__(
+        self,
+        planes,
+        order,
+        sorted_codes,
+        n_tables: int,
+        n_bits: int,
+        n_probes: int = 2,
+        max_candidates: int = 20000,
+    ):
+        self.planes = planes
+        self.order = order
+        self.sorted_codes = sorted_codes
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.n_probes = min(n_probes, n_bits)
+        self.max_candidates = max_candidates
+        self._weights = np.left_shift(np.uint64(1), np.arange(n_bits, dtype=np.uint64))
+
+    @classmethod
+    def build(
+        cls, matrix, n_tables: int = 24, n_bits: int = 8, seed: int = 0, **knobs
+    ) -> "LSHIndex":
+        """
+        Hash every row of a TF-IDF matrix into the LSH tables.
+
+        Args:
+            matrix (scipy.sparse.csr_matrix): One TF-IDF row per book.
+            n_tables (int): Number of hash tables.
+            n_bits (int): Hyperplanes per table, at most 63.
+            seed (int): Seed for the random hyperplanes.
+            **knobs: Query-time settings passed to the index.
+
+        Returns:
+            LSHIndex: The built index.
+        """
+        if not 0 < n_bits < 64:
+            raise ValueError("n_bits must be between 1 and 63")
+        rng = np.random.default_rng(seed)
+        planes = rng.standard_normal(
+            (matrix.shape[1], n_tables * n_bits), dtype=np.float32
+        )
+        index = cls(planes, None, None, n_tables, n_bits, **knobs)
+
+        codes = np.empty((n_tables, matrix.shape[0]), dtype=np.uint64)
+        for start in range(0, matrix.shape[0], BUILD_BLOCK_SIZE):
+            stop = min(start + BUILD_BLOCK_SIZE, matrix.shape[0])
+            codes[:, start:stop] = index._hash(matrix[start:stop]).T
+
+        index.order = np.argsort(codes, axis=1, kind="stable").astype(np.int32)
+        index.sorted_codes = np.take_along_axis(codes, index.order, axis=1)
+        logger.info(
+            f"Built LSH index over {matrix.shape[0]} rows "
+            f"({n_tables} tables x {n_bits} bits)"
+        )
+        return index
+
+    def _project(self, X):
+        # Cast the sparse side so the dense hyperplanes are never copied
+        X = X.astype(self.planes.dtype, copy=False)
+        return np.asarray(X @ self.planes).reshape(
+            X.shape[0], self.n_tables, self.n_bits
+        )
+
+    def _hash(self, X, projections=None) -> np.ndarray:
+        if projections is None:
+            projections = self._project(X)
+        bits = (projections > 0).astype(np.uint64)
+        return (bits * self._weights).sum(axis=2, dtype=np.uint64)
+
+    def candidates(self, X_query) -> Optional[np.ndarray]:
+        """
+        Select the matrix rows to score for a query.
+
+        Args:
+            X_query (scipy.sparse.csr_matrix): A single encoded query.
+
+        Returns:
+            Optional[np.ndarray]: Candidate row indices, or None to score all rows
+                                  when the query has no known terms.
+        """
+        if X_query.nnz == 0:
+            return None
+        projections = self._project(X_query)
+        codes = self._hash(X_query, projections)[0]
+        # Multi-probe: flip the bits whose projections were closest to zero
+        flips = np.argsort(np.abs(projections[0]), axis=1)[:, : self.n_probes]
+
+        found = []
+        for table in range(self.n_tables):
+            probes = [codes[table]]
+            probes.extend(codes[table] ^ self._weights[bit] for bit in flips[table])
+            table_codes = self.sorted_codes[table]
+            for code in probes:
+                lo = np.searchsorted(table_codes, code, side="left")
+                hi = np.searchsorted(table_codes, code, side="right")
+                if hi > lo:
+                    found.append(self.order[table, lo:hi])
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        rows, collisions = np.unique(np.concatenate(found), return_counts=True)
+        if len(rows) > self.max_candidates:
+            # Books sharing buckets with the query in more tables are likelier
+            # to be similar, so they are kept first.
+            keep = np.argpartition(-collisions, self.max_candidates - 1)
+            rows = np.sort(rows[keep[: self.max_candidates]])
+        return rows
+
+    def save(self, version_dir: str):
+        """
+        Write the index arrays next to the model artifact.
+
+        Args:
+            version_dir (str): Directory of the model version.
+        """
+        self.planes.astype(np.float32).tofile(
+            os.path.join(version_dir, "lsh_planes.bin")
+        )
+        self.order.astype(np.int32).tofile(os.path.join(version_dir, "lsh_order.bin"))
+        self.sorted_codes.astype(np.uint64).tofile(
+            os.path.join(version_dir, "lsh_codes.bin")
+        )
+
+    def meta(self) -> dict:
+        """
+        Describe the index for the model metadata.
+
+        Returns:
+            dict: The index backend and its build settings.
+        """
+        return {"backend": self.name, "n_tables": self.n_tables, "n_bits": self.n_bits}
+
+    @classmethod
+    def load(cls, version_dir: str, meta: dict, n_rows: int, n_features: int, **knobs):
+        """
+        Memory-map a saved index.
+
+        Args:
+            version_dir (str): Directory of the model version.
+            meta (dict): Index metadata saved with the model.
+            n_rows (int): Number of matrix rows.
+            n_features (int): Vocabulary size of the model.
+            **knobs: Query-time settings passed to the index.
+
+        Returns:
+            LSHIndex: The loaded index.
+        """
+        n_tables, n_bits = meta["n_tables"], meta["n_bits"]
+        planes = np.memmap(
+            os.path.join(version_dir, "lsh_planes.bin"),
+            dtype=np.float32,
+            mode="r",
+            shape=(n_features, n_tables * n_bits),
+        )
+        order = np.memmap(
+            os.path.join(version_dir, "lsh_order.bin"),
+            dtype=np.int32,
+            mode="r",
+            shape=(n_tables, n_rows),
+        )
+        sorted_codes = np.memmap(
+            os.path.join(version_dir, "lsh_codes.bin"),
+            dtype=np.uint64,
+            mode="r",
+            shape=(n_tables, n_rows),
+        )
+        return cls(planes, order, sorted_codes, n_tables, n_bits, **knobs)
+
+
+def build_index(backend: str, matrix, version_dir: str, **params) -> dict:
+    """
+    Build and save the search index for a model version.
+
+    Args:
+        backend (str): The index backend, "brute" or "lsh".
+        matrix (scipy.sparse.csr_matrix): One TF-IDF row per book.
+        version_dir (str): Directory of the model version.
+        **params: Build settings for the backend.
+
+    Returns:
+        dict: Index metadata to store with the model.
+    """
+    if backend == BRUTE_FORCE or matrix.shape[0] == 0 or matrix.shape[1] == 0:
+        return BruteForceIndex().meta()
+    if backend == LSH:
+        index = LSHIndex.build(matrix, **params)
+        index.save(version_dir)
+        return index.meta()
+    raise ValueError(f"Unknown recommendation index backend '{backend}'")
+
+
+def load_index(version_dir: str, meta: dict, n_rows: int, n_features: int, **knobs):
+    """
+    Load the search index saved with a model version.
+
+    Args:
+        version_dir (str): Directory of the model version.
+        meta (dict): Index metadata saved with the model.
+        n_rows (int): Number of matrix rows.
+        n_features (int): Vocabulary size of the model.
+        **knobs: Query-time settings for the backend.
+
+    Returns:
+        BruteForceIndex | LSHIndex: The loaded index.
+    """
+    if meta.get("backend") == LSH:
+        return LSHIndex.load(version_dir, meta, n_rows, n_features, **knobs)
+    return BruteForceIndex()
@@ -0,0 +1,82 @@
+import logging
+from typing import List, Optional
+
+from sqlalchemy.orm import Session, selectinload
+
+from app import models, schemas
+
+# Set up logger
+logger = logging.getLogger("app.book_service")
+
+
+def fetch_book_cards(
+    db: Session, book_ids: List[int], scores: Optional[List[float]] = None
+) -> List[schemas.BookCard]:
+    """
+    Fetch lightweight cards for a ranked list of books in a single query.
+
+    Only the listing columns are loaded, so book content is never read. Books
+    that no longer exist are skipped and the input order is preserved.
+
+    Args:
+        db (Session): SQLAlchemy session to interact with the database.
+        book_ids (List[int]): The book IDs, in rank order.
+        scores (Optional[List[float]]): The score of each book.
+
+    Returns:
+        List[schemas.BookCard]: The book cards, in rank order.
+    """
+    if not book_ids:
+        return []
+    scores = scores or [0.0] * len(book_ids)
+
+    rows = (
+        db.query(
+            models.Book.id, models.Book.title, models.Book.author, models.Book.genre
+        )
+        .filter(models.Book.id.in_(book_ids))
+        .all()
+    )
+    books_by_id = {row.id: row for row in rows}
+    logger.debug(f"Fetched {len(rows)} of {len(book_ids)} book cards")
+
+    cards = []
+    for book_id, score in zip(book_ids, scores):
+        book = books_by_id.get(book_id)
+        if book is None:
+            continue
+        cards.append(
+            schemas.BookCard(
+                id=book.id,
+                title=book.title,
+                author=book.author,
+                genre=book.genre,
+                score=score,
+            )
+        )
+    return cards
+
+
+def fetch_books(db: Session, book_ids: List[int]) -> List[models.Book]:
+    """
+    Fetch full books for a ranked list of IDs, preserving the input order.
+
+    The books are loaded with one IN query and their reviews with one more.
+
+    Args:
+        db (Session): SQLAlchemy session to interact with the database.
+        book_ids (List[int]): The book IDs, in rank order.
+
+    Returns:
+        List[models.Book]: The books that still exist, in rank order.
+    """
+    if not book_ids:
+        return []
+    books = (
+        db.query(models.Book)
+        .options(selectinload(models.Book.reviews))
+        .filter(models.Book.id.in_(book_ids))
+        .all()
+    )
+    books_by_id = {book.id: book for book in books}
+    return [books_by_id[book_id] for book_id in book_ids if book_id in books_by_id]
@@ -0,0 +1,431 @@
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy.orm import Session
+
+from app.models import Review
+
+from ..config import (
+    COLLABORATIVE_FACTORS,
+    COLLABORATIVE_ITERATIONS,
+    COLLABORATIVE_MODEL_DIR,
+    COLLABORATIVE_REGULARIZATION,
+)
+from .model_store_service import current_version, new_version, publish_version
+
+# Set up logger
+logger = logging.getLogger("app.collaborative_service")
+
+MODEL_FORMAT = 1
+# Upper bound on the rows whose normal equations are solved in one batch
+MAX_BLOCK_ROWS = 2048
+
+_registry = {"key": None, "model": None}
+_registry_lock = threading.Lock()
+
+
+class CollaborativeModel:
+    """
+    A matrix-factorization model trained from review ratings.
+
+    The predicted affinity of a user for a book is the dot product of their
+    factors, so serving a user is one matrix-vector product plus a top-K
+    selection.
+
+    Attributes:
+        version (str): The model version.
+        user_ids (np.ndarray): Sorted user IDs, one per row of user_factors.
+        book_ids (np.ndarray): Book ID for each row of item_factors.
+        user_factors (np.ndarray): Latent factors of each user.
+        item_factors (np.ndarray): Latent factors of each book.
+        rated (scipy.sparse.csr_matrix): Books each user has already rated.
+    """
+
+    def __init__(self, version, user_ids, book_ids, user_factors, item_factors, rated):
+        self.version = version
+        self.user_ids = user_ids
+        self.book_ids = book_ids
+        self.user_factors = user_factors
+        self.item_factors = item_factors
+        self.rated = rated
+
+    def _user_row(self, user_id: int) -> Optional[int]:
+        row = int(np.searchsorted(self.user_ids, user_id))
+        if row < len(self.user_ids) and self.user_ids[row] == user_id:
+            return row
+        return None
+
+    def recommend(self, user_id: int, n: int = 10) -> Optional[Tuple[list, list]]:
+        """
+        Recommend the books with the highest predicted affinity for a user.
+
+        Books the user has already rated are excluded.
+
+        Args:
+            user_id (int): ID of the user.
+            n (int): Number of books to return.
+
+        Returns:
+            Optional[Tuple[list, list]]: The book IDs and scores, best first, or
+                                         None if the user has no ratings.
+        """
+        row = self._user_row(user_id)
+        if row is None:
+            return None
+        scores = self.item_factors @ self.user_factors[row]
+        start, stop = self.rated.indptr[row], self.rated.indptr[row + 1]
+        scores[self.rated.indices[start:stop]] = -np.inf
+
+        n = min(n, len(scores))
+        if n == 0:
+            return [], []
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        top = top[np.isfinite(scores[top])]
+        return self.book_ids[top].tolist(), scores[top].tolist()
+
+
+def _row_groups(indptr, max_rows: int):
+    """
+    Group matrix rows by their number of ratings, in bounded chunks.
+
+    Rows with the same number of ratings gather into dense tensors of equal
+    shape, so their normal equations are built with one batched matmul.
+
+    Args:
+        indptr (np.ndarray): Row pointers of a CSR matrix.
+        max_rows (int): Upper bound on the rows per chunk.
+
+    Yields:
+        np.ndarray: The rows of each chunk, which all have the same count.
+    """
+    counts = np.diff(indptr)
+    order = np.argsort(counts, kind="stable")
+    boundaries = np.flatnonzero(np.diff(counts[order])) + 1
+    for group in np.split(order, boundaries):
+        if len(group) == 0 or counts[group[0]] == 0:
+            continue
+        yield from np.array_split(group, -(-len(group) // max_rows))
+
+
+def _solve_rows(ratings, fixed, regularization, rows, out):
+    """
+    Solve the regularized least squares problems of rows with equal counts.
+
+    Args:
+        ratings (scipy.sparse.csr_matrix): Centered ratings, one row per entity.
+        fixed (np.ndarray): Factors of the other side, held fixed.
+        regularization (float): Weighted-lambda regularization strength.
+        rows (np.ndarray): Rows to solve, all with the same number of ratings.
+        out (np.ndarray): Factors to update in place.
+    """
+    n_ratings = ratings.indptr[rows[0] + 1] - ratings.indptr[rows[0]]
+    positions = ratings.indptr[rows][:, None] + np.arange(n_ratings)
+    F = fixed[ratings.indices[positions]]
+    A = np.matmul(F.transpose(0, 2, 1), F)
+    A += regularization * n_ratings * np.eye(F.shape[2])
+    b = np.matmul(ratings.data[positions][:, None, :], F)[:, 0]
+    out[rows] = np.linalg.solve(A, b[..., None])[..., 0]
+
+
+def _solve_factors(ratings, fixed, regularization, executor):
+    """
+    Recompute the factors of one side of the factorization.
+
+    Args:
+        ratings (scipy.sparse.csr_matrix): Centered ratings, one row per entity.
+        fixed (np.ndarray): Factors of the other side, held fixed.
+        regularization (float): Weighted-lambda regularization strength.
+        executor (ThreadPoolExecutor): Pool solving the row chunks in parallel.
+
+    Returns:
+        np.ndarray: The new factors, one row per entity.
+    """
+    out = np.zeros((ratings.shape[0], fixed.shape[1]))
+    # NumPy releases the GIL in the batched matmuls and solves, so threads
+    # spread the chunks over all cores.
+    futures = [
+        executor.submit(_solve_rows, ratings, fixed, regularization, rows, out)
+        for rows in _row_groups(ratings.indptr, MAX_BLOCK_ROWS)
+    ]
+    for future in futures:
+        future.result()
+    return out
+
+
+def factorize(
+    ratings,
+    factors: int = 32,
+    regularization: float = 0.1,
+    iterations: int = 10,
+    seed: int = 0,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[float], None]] = None,
+):
+    """
+    Factorize an explicit rating matrix with alternating least squares.
+
+    Args:
+        ratings (scipy.sparse.csr_matrix): Centered ratings, users by books.
+        factors (int): Number of latent factors.
+        regularization (float): Weighted-lambda regularization strength.
+        iterations (int): Number of ALS sweeps.
+        seed (int): Seed for the initial item factors.
+        workers (Optional[int]): Threads used to solve the row chunks.
+        progress (Optional[Callable[[float], None]]): Called with the completed
+                                                      fraction of the sweeps.
+
+    Returns:
+        tuple: The user factors and the item factors.
+    """
+    rng = np.random.default_rng(seed)
+    ratings = sp.csr_matrix(ratings, dtype=np.float64)
+    ratings_by_item = ratings.T.tocsr()
+    item_factors = rng.normal(scale=0.1, size=(ratings.shape[1], factors))
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for iteration in range(iterations):
+            user_factors = _solve_factors(
+                ratings, item_factors, regularization, executor
+            )
+            item_factors = _solve_factors(
+                ratings_by_item, user_factors, regularization, executor
+            )
+            logger.debug(f"ALS iteration {iteration + 1}/{iterations} completed")
+            if progress:
+                progress((iteration + 1) / iterations)
+    return user_factors, item_factors
+
+
+def train_collaborative_model(
+    db: Session,
+    model_dir: Optional[str] = None,
+    progress: Optional[Callable[[float], None]] = None,
+) -> dict:
+    """
+    Train the collaborative-filtering model from review ratings and save it.
+
+    Args:
+        db (Session): Database session.
+        model_dir (Optional[str]): Root directory of the model artifacts.
+        progress (Optional[Callable[[float], None]]): Called with the completed
+                                                      fraction of the training.
+
+    Returns:
+        dict: The model version and the number of users, books and ratings.
+
+    Raises:
+        ValueError: If there are no rated reviews to train on.
+    """
+    logger.info("Starting collaborative model training")
+    rows = (
+        db.query(Review.user_id, Review.book_id, Review.rating)
+        .filter(Review.rating.isnot(None))
+        .all()
+    )
+    if not rows:
+        logger.error("No ratings found for training the collaborative model")
+        raise ValueError("No ratings found for training the collaborative model")
+
+    user_column, book_column, rating_column = (np.array(c) for c in zip(*rows))
+    user_ids, user_rows = np.unique(user_column, return_inverse=True)
+    book_ids, book_rows = np.unique(book_column, return_inverse=True)
+    shape = (len(user_ids), len(book_ids))
+
+    # Repeated reviews of a book by one user are averaged
+    totals = sp.csr_matrix(
+        (rating_column.astype(np.float64), (user_rows, book_rows)), shape=shape
+    )
+    counts = sp.csr_matrix((np.ones(len(rows)), (user_rows, book_rows)), shape=shape)
+    totals.sort_indices()
+    counts.sort_indices()
+    mean_rating = float(rating_column.mean())
+    ratings = totals.copy()
+    ratings.data = totals.data / counts.data - mean_rating
+
+    user_factors, item_factors = factorize(
+        ratings,
+        factors=COLLABORATIVE_FACTORS,
+        regularization=COLLABORATIVE_REGULARIZATION,
+        iterations=COLLABORATIVE_ITERATIONS,
+        progress=progress and (lambda fraction: progress(0.95 * fraction)),
+    )
+    version = save_collaborative_model(
+        user_ids, book_ids, user_factors, item_factors, ratings, model_dir
+    )
+    logger.info(
+        f"Collaborative model {version} trained on {len(rows)} ratings "
+        f"from {len(user_ids)} users"
+    )
+    return {
+        "version": version,
+        "users": len(user_ids),
+        "books": len(book_ids),
+        "ratings": len(rows),
+    }
+
+
+def save_collaborative_model(
+    user_ids,
+    book_ids,
+    user_factors,
+    item_factors,
+    ratings,
+    model_dir: Optional[str] = None,
+) -> str:
+    """
+    Save the factors as flat files and make them the active version.
+
+    Args:
+        user_ids (np.ndarray): Sorted user IDs, one per row of user_factors.
+        book_ids (np.ndarray): Book ID for each row of item_factors.
+        user_factors (np.ndarray): Latent factors of each user.
+        item_factors (np.ndarray): Latent factors of each book.
+        ratings (scipy.sparse.csr_matrix): The training ratings, users by books.
+        model_dir (Optional[str]): Root directory of the model artifacts.
+
+    Returns:
+        str: The version of the saved model.
+    """
+    model_dir = model_dir or COLLABORATIVE_MODEL_DIR
+    version = new_version()
+    staging_dir = os.path.join(model_dir, f"{version}.tmp")
+    os.makedirs(staging_dir, exist_ok=True)
+
+    arrays = {
+        "user_ids.bin": (user_ids, np.int64),
+        "book_ids.bin": (book_ids, np.int64),
+        "user_factors.bin": (user_factors, np.float32),
+        "item_factors.bin": (item_factors, np.float32),
+        "rated_indptr.bin": (ratings.indptr, np.int64),
+        "rated_indices.bin": (ratings.indices, np.int32),
+    }
+    for name, (array, dtype) in arrays.items():
+        np.ascontiguousarray(array, dtype=dtype).tofile(os.path.join(staging_dir, name))
+    meta = {
+        "format": MODEL_FORMAT,
+        "version": version,
+        "users": len(user_ids),
+        "books": len(book_ids),
+        "factors": int(user_factors.shape[1]),
+        "ratings": int(ratings.nnz),
+    }
+    with open(os.path.join(staging_dir, "meta.json"), "w") as meta_file:
+        json.dump(meta, meta_file)
+
+    publish_version(model_dir, version)
+    return version
+
+
+def load_collaborative_model(
+    version: str, model_dir: Optional[str] = None
+) -> CollaborativeModel:
+    """
+    Load a saved collaborative model version by memory-mapping its arrays.
+
+    Args:
+        version (str): The model version to load.
+        model_dir (Optional[str]): Root directory of the model artifacts.
+
+    Returns:
+        CollaborativeModel: The loaded model.
+    """
+    model_dir = model_dir or COLLABORATIVE_MODEL_DIR
+    version_dir = os.path.join(model_dir, version)
+    with open(os.path.join(version_dir, "meta.json")) as meta_file:
+        meta = json.load(meta_file)
+    if meta["format"] != MODEL_FORMAT:
+        raise ValueError(f"Unsupported collaborative model format {meta['format']}")
+
+    def read(name, dtype, shape):
+        return np.memmap(
+            os.path.join(version_dir, name), dtype=dtype, mode="r", shape=shape
+        )
+
+    n_users, n_books, k = meta["users"], meta["books"], meta["factors"]
+    rated = sp.csr_matrix(
+        (
+            np.ones(meta["ratings"], dtype=np.int8),
+            read("rated_indices.bin", np.int32, (meta["ratings"],)),
+            read("rated_indptr.bin", np.int64, (n_users + 1,)),
+        ),
+        shape=(n_users, n_books),
+    )
+    return CollaborativeModel(
+        version,
+        read("user_ids.bin", np.int64, (n_users,)),
+        read("book_ids.bin", np.int64, (n_books,)),
+        read("user_factors.bin", np.float32, (n_users, k)),
+        read("item_factors.bin", np.float32, (n_books, k)),
+        rated,
+    )
+
+
+def get_collaborative_model(
+    model_dir: Optional[str] = None,
+) -> Optional[CollaborativeModel]:
+    """
+    Get the active collaborative model, reloading it when a new version is saved.
+
+    Args:
+        model_dir (Optional[str]): Root directory of the model artifacts.
+
+    Returns:
+        Optional[CollaborativeModel]: The active model, or None if none is trained.
+    """
+    model_dir = model_dir or COLLABORATIVE_MODEL_DIR
+    version = current_version(model_dir)
+    if version is None:
+        return None
+    key = (model_dir, version)
+    if _registry["key"] != key:
+        with _registry_lock:
+            if _registry["key"] != key:
+                _registry["model"] = load_collaborative_model(version, model_dir)
+                _registry["key"] = key
+    return _registry["model"]
+
+
+def blend_scores(
+    content: Tuple[list, list], collaborative: Tuple[list, list], weight: float, n: int
+) -> Tuple[List[int], List[float]]:
+    """
+    Blend content-based and collaborative results into one ranking.
+
+    Each engine's scores are min-max scaled to [0, 1] over its own results, so
+    cosine similarities and predicted ratings can be mixed; a book missing
+    from one engine's results scores 0 there.
+
+    Args:
+        content (Tuple[list, list]): Book IDs and scores from the content model.
+        collaborative (Tuple[list, list]): Book IDs and scores from the
+                                           collaborative model.
+        weight (float): Weight of the content scores, between 0 and 1.
+        n (int): Number of books to return.
+
+    Returns:
+        Tuple[List[int], List[float]]: The blended book IDs and scores, best first.
+    """
+
+    def scaled(result):
+        book_ids, scores = result
+        scores = np.asarray(scores, dtype=np.float64)
+        if len(scores) == 0:
+            return {}
+        span = scores.max() - scores.min()
+        scores = (scores - scores.min()) / span if span > 0 else np.ones_like(scores)
+        return dict(zip(book_ids, scores))
+
+    content_scores, collaborative_scores = scaled(content), scaled(collaborative)
+    blended = {
+        book_id: weight * content_scores.get(book_id, 0.0)
+        + (1 - weight) * collaborative_scores.get(book_id, 0.0)
+        for book_id in content_scores.keys() | collaborative_scores.keys()
+    }
+    ranked = sorted(blended.items(), key=lambda item: (-item[1], item[0]))[:n]
+    return [book_id for book_id, _ in ranked], [score for _, score in ranked]
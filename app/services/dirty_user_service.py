@@ -0,0 +1,150 @@
+import logging
+from datetime import datetime
+from typing import Iterable, List
+
+from sqlalchemy import insert, literal, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import DirtyUser, UserPreferences
+
+# Set up logger
+logger = logging.getLogger("app.dirty_user_service")
+
+# Reasons users are marked dirty
+PREFERENCES = "preferences"
+MODEL = "model"
+CATALOG = "catalog"
+
+
+def _upsert(db: Session):
+    """
+    Build an INSERT into dirty_users that refreshes the mark of existing rows.
+
+    Re-marking a user moves its marked_at forward, so a precompute run that
+    started before the change does not clear it.
+
+    Args:
+        db (Session): Database session.
+
+    Returns:
+        The dialect-specific insert statement, or None if the database has no
+        INSERT ... ON CONFLICT.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert(DirtyUser)
+
+
+def _mark_portably(db: Session, user_ids: List[int], reason: str, marked_at):
+    """
+    Mark users with plain statements, on databases without INSERT ... ON CONFLICT.
+
+    Existing marks are refreshed and the others inserted. A mark inserted by
+    a concurrent writer in between is refreshed instead.
+
+    Args:
+        db (Session): Database session.
+        user_ids (List[int]): IDs of the users, without duplicates.
+        reason (str): Why the users are marked.
+        marked_at (datetime): The time of the mark.
+    """
+    values = {"reason": reason, "marked_at": marked_at}
+    existing = {
+        user_id
+        for (user_id,) in db.query(DirtyUser.user_id).filter(
+            DirtyUser.user_id.in_(user_ids)
+        )
+    }
+    if existing:
+        db.query(DirtyUser).filter(DirtyUser.user_id.in_(existing)).update(
+            values, synchronize_session=False
+        )
+    for user_id in user_ids:
+        if user_id in existing:
+            continue
+        try:
+            with db.begin_nested():
+                db.execute(insert(DirtyUser).values(user_id=user_id, **values))
+        except IntegrityError:
+            db.query(DirtyUser).filter(DirtyUser.user_id == user_id).update(
+                values, synchronize_session=False
+            )
+
+
+def _on_conflict_refresh(statement):
+    return statement.on_conflict_do_update(
+        index_elements=[DirtyUser.user_id],
+        set_={
+            "reason": statement.excluded.reason,
+            "marked_at": statement.excluded.marked_at,
+        },
+    )
+
+
+def mark_users_dirty(db: Session, user_ids: Iterable[int], reason: str = PREFERENCES):
+    """
+    Mark users whose recommendations must be recomputed. The caller commits.
+
+    Args:
+        db (Session): Database session.
+        user_ids (Iterable[int]): IDs of the users.
+        reason (str): Why the users are marked.
+    """
+    marked_at = datetime.utcnow()
+    rows = [
+        {"user_id": user_id, "reason": reason, "marked_at": marked_at}
+        for user_id in user_ids
+    ]
+    if not rows:
+        return
+    statement = _upsert(db)
+    if statement is None:
+        user_ids = list(dict.fromkeys(row["user_id"] for row in rows))
+        _mark_portably(db, user_ids, reason, marked_at)
+    else:
+        db.execute(_on_conflict_refresh(statement.values(rows)))
+    logger.debug(f"Marked {len(rows)} users dirty ({reason})")
+
+
+def mark_all_users_dirty(db: Session, reason: str = MODEL) -> int:
+    """
+    Mark every user with preferences dirty, with a single INSERT ... SELECT
+    where the database supports ON CONFLICT.
+
+    Args:
+        db (Session): Database session.
+        reason (str): Why the users are marked.
+
+    Returns:
+        int: Number of users marked.
+    """
+    marked_at = datetime.utcnow()
+    statement = _upsert(db)
+    if statement is None:
+        user_ids = [
+            user_id
+            for (user_id,) in db.query(UserPreferences.user_id)
+            .filter(UserPreferences.user_id.isnot(None))
+            .distinct()
+        ]
+        _mark_portably(db, user_ids, reason, marked_at)
+        marked = len(user_ids)
+    else:
+        statement = statement.from_select(
+            ["user_id", "reason", "marked_at"],
+            select(
+                UserPreferences.user_id, literal(reason), literal(marked_at)
+            ).distinct()
+            # SQLite needs a WHERE clause to parse ON CONFLICT after a SELECT
+            .where(UserPreferences.user_id.isnot(None)),
+        )
+        marked = db.execute(_on_conflict_refresh(statement)).rowcount
+    db.commit()
+    logger.info(f"Marked {marked} users dirty ({reason})")
+    return marked
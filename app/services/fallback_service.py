@@ -0,0 +1,207 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import schemas
+from app.models import Book, Review
+
+from ..config import (
+    FALLBACK_PRIOR_REVIEWS,
+    FALLBACK_REFRESH_SECONDS,
+    FALLBACK_TOP_N,
+)
+from .book_service import fetch_books
+
+# Set up logger
+logger = logging.getLogger("app.fallback_service")
+
+# Key of the list ranking books of every genre
+GLOBAL = ""
+
+# Fallback lists of this process, rebuilt once they are older than the
+# refresh interval. Only one rebuild runs at a time.
+_lists_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_lists = {"built_at": None, "cards": {}}
+
+
+def _genre_key(genre: Optional[str]) -> str:
+    return " ".join((genre or "").split()).lower()
+
+
+def build_fallback_lists(
+    db: Session, top_n: Optional[int] = None
+) -> Dict[str, List[schemas.BookCard]]:
+    """
+    Build the top-rated books overall and per genre from review aggregates.
+
+    Books are ranked by their average rating shrunk towards the catalog mean,
+    so a single five-star review does not outrank a well-reviewed book.
+
+    Args:
+        db (Session): Database session.
+        top_n (Optional[int]): Number of books kept per list.
+
+    Returns:
+        Dict[str, List[schemas.BookCard]]: The ranked cards, keyed by
+                                           normalized genre, with the global
+                                           list under "".
+    """
+    top_n = top_n or FALLBACK_TOP_N
+    rows = (
+        db.query(
+            Book.id,
+            Book.title,
+            Book.author,
+            Book.genre,
+            func.sum(Review.rating).label("total"),
+            func.count(Review.rating).label("reviews"),
+        )
+        .join(Review, Review.book_id == Book.id)
+        .filter(Review.rating.isnot(None))
+        .group_by(Book.id)
+        .all()
+    )
+    n_reviews = sum(row.reviews for row in rows)
+    if not n_reviews:
+        return {GLOBAL: []}
+
+    mean = sum(row.total for row in rows) / n_reviews
+    cards = sorted(
+        (
+            schemas.BookCard(
+                id=row.id,
+                title=row.title,
+                author=row.author,
+                genre=row.genre,
+                score=(row.total + FALLBACK_PRIOR_REVIEWS * mean)
+                / (row.reviews + FALLBACK_PRIOR_REVIEWS),
+            )
+            for row in rows
+        ),
+        key=lambda card: (-card.score, card.id),
+    )
+    lists = {GLOBAL: cards[:top_n]}
+    for card in cards:
+        genre = _genre_key(card.genre)
+        if not genre:
+            continue
+        genre_cards = lists.setdefault(genre, [])
+        if len(genre_cards) < top_n:
+            genre_cards.append(card)
+    return lists
+
+
+def refresh_fallback_lists(db: Session) -> Dict[str, List[schemas.BookCard]]:
+    """
+    Rebuild the fallback lists of this process.
+
+    Args:
+        db (Session): Database session.
+
+    Returns:
+        Dict[str, List[schemas.BookCard]]: The rebuilt lists.
+    """
+    cards = build_fallback_lists(db)
+    with _lists_lock:
+        _lists["cards"] = cards
+        _lists["built_at"] = time.monotonic()
+    logger.info(f"Fallback recommendations refreshed for {len(cards) - 1} genres")
+    return cards
+
+
+def _refresh_in_background(bind):
+    db = Session(bind=bind)
+    try:
+        refresh_fallback_lists(db)
+    except Exception as e:
+        logger.error(f"Failed to refresh fallback recommendations. Exception: {e}")
+    finally:
+        db.close()
+        _refresh_lock.release()
+
+
+def _current_lists(db: Session) -> Dict[str, List[schemas.BookCard]]:
+    """
+    Get the fallback lists of this process, refreshing them when stale.
+
+    Stale lists are served while a single background thread rebuilds them.
+    Only the first request of the process waits for the lists to be built.
+
+    Args:
+        db (Session): Database session.
+
+    Returns:
+        Dict[str, List[schemas.BookCard]]: The ranked cards.
+    """
+    built_at = _lists["built_at"]
+    if built_at is not None and time.monotonic() - built_at < FALLBACK_REFRESH_SECONDS:
+        return _lists["cards"]
+    if built_at is not None:
+        if _refresh_lock.acquire(blocking=False):
+            threading.Thread(
+                target=_refresh_in_background,
+                args=(db.get_bind(),),
+                name="fallback-refresh",
+                daemon=True,
+            ).start()
+        return _lists["cards"]
+    with _refresh_lock:
+        if _lists["built_at"] is not None:
+            return _lists["cards"]
+        return refresh_fallback_lists(db)
+
+
+def get_fallback_recommendations(
+    db: Session,
+    preferred_genres: Optional[str] = None,
+    n: int = 10,
+    full: bool = False,
+):
+    """
+    Get top-rated books for users the recommendation model cannot serve.
+
+    Books from the preferred genres come first, and the global top-rated books
+    fill the remaining places. The lists are served from memory and only
+    rebuilt once they are older than the refresh interval; books deleted
+    since they were built are skipped.
+
+    Args:
+        db (Session): Database session.
+        preferred_genres (Optional[str]): Comma-separated preferred genres.
+        n (int): Number of books to return.
+        full (bool): Return full books instead of lightweight cards.
+
+    Returns:
+        list[schemas.BookCard] | list[schemas.Book]: The books, best first.
+    """
+    lists = _current_lists(db)
+    candidates = []
+    for genre in (preferred_genres or "").split(","):
+        genre = _genre_key(genre)
+        if genre:
+            candidates.extend(lists.get(genre, []))
+    candidates.sort(key=lambda card: -card.score)
+    candidates.extend(lists[GLOBAL])
+
+    existing = {
+        book_id
+        for (book_id,) in db.query(Book.id).filter(
+            Book.id.in_({card.id for card in candidates})
+        )
+    }
+    cards, seen = [], set()
+    for card in candidates:
+        if card.id in existing and card.id not in seen:
+            seen.add(card.id)
+            cards.append(card)
+        if len(cards) == n:
+            break
+    if full:
+        book_ids = [card.id for card in cards]
+        return [schemas.Book.from_orm(book) for book in fetch_books(db, book_ids)]
+    return cards
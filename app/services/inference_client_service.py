@@ -0,0 +1,547 @@
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import List, Optional, Tuple
+
+import boto3
+import httpx
+from botocore.config import Config as BotoConfig
+from botocore.exceptions import BotoCoreError, ClientError
+
+from ..config import (
+    AWS_REGION,
+    RECOMMENDATION_BACKEND,
+    RECOMMENDATION_REMOTE_BATCH_SIZE,
+    RECOMMENDATION_REMOTE_BATCH_WAIT_MS,
+    RECOMMENDATION_REMOTE_BREAKER_FAILURES,
+    RECOMMENDATION_REMOTE_BREAKER_RESET_SECONDS,
+    RECOMMENDATION_REMOTE_POOL_SIZE,
+    RECOMMENDATION_REMOTE_RETRIES,
+    RECOMMENDATION_REMOTE_TIMEOUT_SECONDS,
+    RECOMMENDATION_REMOTE_URL,
+    SAGEMAKER_ENDPOINT,
+)
+
+# Set up logger
+logger = logging.getLogger("app.inference_client_service")
+
+# Recommendation backends
+LOCAL = "local"
+HTTP = "http"
+SAGEMAKER = "sagemaker"
+
+# Status codes worth retrying: throttling and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+BACKOFF_SECONDS = 0.05
+
+# Granularity of the per-attempt read timeouts of SageMaker clients
+TIMEOUT_STEP_SECONDS = 0.25
+
+
+class InferenceError(Exception):
+    """
+    Raised when the remote recommendation backend cannot answer in time.
+    """
+
+
+class CircuitOpenError(InferenceError):
+    """
+    Raised without calling the backend while the circuit breaker is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Stop calling a failing backend for a while, then let one trial call through.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    fail immediately. Once reset_seconds have passed a single trial call is
+    allowed; its success closes the circuit and its failure reopens it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may go to the backend.
+
+        Returns:
+            bool: True if the circuit is closed or a trial call is due.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_running:
+                return False
+            if time.monotonic() - self._opened_at < self.reset_seconds:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def release_trial(self):
+        """
+        Give back a trial call that never reached the backend, without
+        counting it as a failure.
+        """
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("Remote recommendation backend circuit opened")
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class InferenceClient:
+    """
+    Base class of remote recommendation backends.
+
+    The request body is {"instances": [...]} with one preference set per
+    instance, and the response is {"predictions": [...]} with one ranked list
+    of {"book_id", "score"} objects per instance.
+    """
+
+    def __init__(self, timeout: float, retries: int):
+        self.timeout = timeout
+        self.retries = retries
+
+    def _invoke(self, body: bytes, timeout: float) -> bytes:
+        raise NotImplementedError
+
+    def _is_retryable(self, error: Exception) -> bool:
+        raise NotImplementedError
+
+    def predict(
+        self, instances: List[dict], deadline: Optional[float] = None
+    ) -> List[list]:
+        """
+        Get the predictions for a batch of instances in one call.
+
+        Failed attempts are retried with jittered exponential backoff while
+        the deadline allows.
+
+        Args:
+            instances (List[dict]): The request instances.
+            deadline (Optional[float]): time.monotonic() value to finish by.
+
+        Returns:
+            List[list]: One prediction per instance.
+
+        Raises:
+            InferenceError: If every attempt failed or the deadline passed.
+        """
+        deadline = deadline or time.monotonic() + self.timeout
+        body = json.dumps({"instances": instances}).encode("utf-8")
+        for attempt in range(self.retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise InferenceError("Deadline exceeded before the backend answered")
+            try:
+                payload = json.loads(self._invoke(body, remaining))
+            except Exception as e:
+                if attempt == self.retries or not self._is_retryable(e):
+                    raise InferenceError(f"Remote inference failed: {e}") from e
+                logger.warning(f"Remote inference attempt {attempt + 1} failed: {e}")
+                time.sleep(
+                    min(
+                        BACKOFF_SECONDS * 2**attempt * random.uniform(0.5, 1.5),
+                        max(deadline - time.monotonic(), 0),
+                    )
+                )
+                continue
+            predictions = (
+                payload.get("predictions") if isinstance(payload, dict) else None
+            )
+            if not isinstance(predictions, list) or len(predictions) != len(instances):
+                raise InferenceError("Malformed response from the remote backend")
+            return predictions
+        raise InferenceError("Remote inference failed")
+
+
+class HttpInferenceClient(InferenceClient):
+    """
+    Remote backend reached over HTTP with a pooled keep-alive client.
+    """
+
+    def __init__(self, url: str, timeout: float, retries: int, pool_size: int):
+        super().__init__(timeout, retries)
+        self.url = url
+        self._client = httpx.Client(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+            headers={"Content-Type": "application/json"},
+        )
+
+    def _invoke(self, body: bytes, timeout: float) -> bytes:
+        response = self._client.post(self.url, content=body, timeout=timeout)
+        response.raise_for_status()
+        return response.content
+
+    def _is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in RETRYABLE_STATUS_CODES
+        return isinstance(error, httpx.TransportError)
+
+    def close(self):
+        self._client.close()
+
+
+class SageMakerInferenceClient(InferenceClient):
+    """
+    Remote backend deployed as a SageMaker endpoint.
+
+    Retries are handled by predict, so the boto3 client's own are disabled.
+    boto3 clients have a fixed read timeout, so each attempt uses a client
+    whose timeout is the time left, rounded down to TIMEOUT_STEP_SECONDS.
+    """
+
+    def __init__(
+        self,
+        endpoint_name: str,
+        region: Optional[str],
+        timeout: float,
+        retries: int,
+        pool_size: int,
+    ):
+        super().__init__(timeout, retries)
+        self.endpoint_name = endpoint_name
+        self.region = region
+        self.pool_size = pool_size
+        self._runtimes_lock = threading.Lock()
+        self._runtimes = {}
+
+    def _runtime(self, timeout: float):
+        timeout = min(
+            max(timeout // TIMEOUT_STEP_SECONDS, 1) * TIMEOUT_STEP_SECONDS,
+            self.timeout,
+        )
+        with self._runtimes_lock:
+            runtime = self._runtimes.get(timeout)
+            if runtime is None:
+                runtime = self._runtimes[timeout] = boto3.client(
+                    "sagemaker-runtime",
+                    region_name=self.region,
+                    config=BotoConfig(
+                        connect_timeout=timeout,
+                        read_timeout=timeout,
+                        retries={"max_attempts": 0},
+                        max_pool_connections=self.pool_size,
+                    ),
+                )
+        return runtime
+
+    def _invoke(self, body: bytes, timeout: float) -> bytes:
+        response = self._runtime(timeout).invoke_endpoint(
+            EndpointName=self.endpoint_name,
+            ContentType="application/json",
+            Accept="application/json",
+            Body=body,
+        )
+        return response["Body"].read()
+
+    def _is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, ClientError):
+            status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+            return status in RETRYABLE_STATUS_CODES
+        return isinstance(error, BotoCoreError)
+
+
+class MicroBatcher:
+    """
+    Merge concurrent single-instance requests into batched backend calls.
+
+    A background thread waits up to max_wait_seconds after the first queued
+    request for others to arrive, then sends up to max_batch_size instances
+    in one call and hands each caller its own prediction. Up to workers
+    calls, one per pooled connection, are in flight at once; while all of
+    them are busy, queued requests accumulate into the next batch.
+    """
+
+    def __init__(
+        self,
+        client: InferenceClient,
+        max_batch_size: int,
+        max_wait_seconds: float,
+        workers: int = 1,
+    ):
+        self.client = client
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._condition = threading.Condition()
+        self._queue: List[Tuple[dict, float, Future]] = []
+        self._slots = threading.Semaphore(workers)
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="inference-call"
+        )
+        self._thread = threading.Thread(
+            target=self._run, name="inference-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, instance: dict, deadline: float) -> Future:
+        """
+        Queue an instance for the next batch.
+
+        Args:
+            instance (dict): The request instance.
+            deadline (float): time.monotonic() value the caller waits until.
+
+        Returns:
+            Future: Resolves to the prediction of the instance.
+        """
+        future = Future()
+        with self._condition:
+            self._queue.append((instance, deadline, future))
+            self._condition.notify()
+        return future
+
+    def _next_batch(self) -> List[Tuple[dict, float, Future]]:
+        with self._condition:
+            while not self._queue:
+                self._condition.wait()
+            flush_at = time.monotonic() + self.max_wait_seconds
+            while len(self._queue) < self.max_batch_size:
+                remaining = flush_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = self._queue[: self.max_batch_size]
+            del self._queue[: len(batch)]
+            return batch
+
+    def _run(self):
+        while True:
+            self._slots.acquire()
+            batch = [
+                (instance, deadline, future)
+                for instance, deadline, future in self._next_batch()
+                if future.set_running_or_notify_cancel()
+            ]
+            if not batch:
+                self._slots.release()
+                continue
+            self._pool.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch: List[Tuple[dict, float, Future]]):
+        try:
+            # Answer as long as any caller of the batch is still waiting
+            predictions = self.client.predict(
+                [instance for instance, _, _ in batch],
+                max(deadline for _, deadline, _ in batch),
+            )
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+        else:
+            for (_, _, future), prediction in zip(batch, predictions):
+                future.set_result(prediction)
+        finally:
+            self._slots.release()
+
+
+def parse_prediction(prediction: list) -> Tuple[list, list]:
+    """
+    Split a ranked prediction into book IDs and scores.
+
+    Args:
+        prediction (list): {"book_id", "score"} objects, or plain book IDs.
+
+    Returns:
+        Tuple[list, list]: The book IDs and their scores, best first.
+
+    Raises:
+        InferenceError: If the prediction is malformed.
+    """
+    book_ids, scores = [], []
+    try:
+        for item in prediction:
+            if isinstance(item, dict):
+                book_ids.append(int(item["book_id"]))
+                scores.append(float(item.get("score", 0.0)))
+            else:
+                book_ids.append(int(item))
+                scores.append(0.0)
+    except (KeyError, ValueError, TypeError) as e:
+        raise InferenceError(f"Malformed prediction from the remote backend: {e}")
+    return book_ids, scores
+
+
+class RemoteRecommender:
+    """
+    Remote recommendation backend guarded by a deadline and a circuit breaker.
+    """
+
+    def __init__(
+        self,
+        client: InferenceClient,
+        breaker: CircuitBreaker,
+        max_batch_size: int,
+        max_wait_seconds: float,
+        workers: int = 1,
+    ):
+        self.client = client
+        self.breaker = breaker
+        self.batcher = MicroBatcher(client, max_batch_size, max_wait_seconds, workers)
+
+    def _guard(self) -> bool:
+        # Calls let through while the circuit is open are its trial call
+        if not self.breaker.allow():
+            raise CircuitOpenError("Remote recommendation backend is unavailable")
+        return self.breaker.is_open
+
+    def recommend(self, instance: dict) -> Tuple[list, list]:
+        """
+        Rank books for one preference set, batched with concurrent requests.
+
+        A request that times out before its batch was sent is not counted as
+        a backend failure, since the backend never saw it; if it was the
+        circuit's trial call, the next call is let through instead.
+
+        Args:
+            instance (dict): The preference set.
+
+        Returns:
+            Tuple[list, list]: The recommended book IDs and their scores.
+
+        Raises:
+            InferenceError: If the backend is unavailable or too slow.
+        """
+        trial = self._guard()
+        future = self.batcher.submit(instance, time.monotonic() + self.client.timeout)
+        try:
+            result = parse_prediction(future.result(timeout=self.client.timeout))
+        except FutureTimeoutError:
+            if future.cancel():
+                if trial:
+                    self.breaker.release_trial()
+                raise InferenceError("Deadline exceeded waiting to reach the backend")
+            self.breaker.record_failure()
+            raise InferenceError("Deadline exceeded waiting for the remote backend")
+        except InferenceError:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def recommend_many(self, instances: List[dict]) -> List[Tuple[list, list]]:
+        """
+        Rank books for many preference sets in one backend call.
+
+        Args:
+            instances (List[dict]): The preference sets.
+
+        Returns:
+            List[Tuple[list, list]]: The book IDs and scores of each set.
+
+        Raises:
+            InferenceError: If the backend is unavailable or too slow.
+        """
+        self._guard()
+        try:
+            results = [
+                parse_prediction(prediction)
+                for prediction in self.client.predict(instances)
+            ]
+        except InferenceError:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return results
+
+
+_recommender_lock = threading.Lock()
+_recommender = {"backend": None, "instance": None}
+
+
+def build_inference_client(backend: str) -> InferenceClient:
+    """
+    Build the client of a remote recommendation backend.
+
+    Args:
+        backend (str): "http" or "sagemaker".
+
+    Returns:
+        InferenceClient: The client.
+
+    Raises:
+        ValueError: If the backend is unknown or not configured.
+    """
+    if backend == HTTP:
+        if not RECOMMENDATION_REMOTE_URL:
+            raise ValueError("RECOMMENDATION_REMOTE_URL is not set")
+        return HttpInferenceClient(
+            RECOMMENDATION_REMOTE_URL,
+            RECOMMENDATION_REMOTE_TIMEOUT_SECONDS,
+            RECOMMENDATION_REMOTE_RETRIES,
+            RECOMMENDATION_REMOTE_POOL_SIZE,
+        )
+    if backend == SAGEMAKER:
+        if not SAGEMAKER_ENDPOINT:
+            raise ValueError("SAGEMAKER_ENDPOINT is not set")
+        return SageMakerInferenceClient(
+            SAGEMAKER_ENDPOINT,
+            AWS_REGION,
+            RECOMMENDATION_REMOTE_TIMEOUT_SECONDS,
+            RECOMMENDATION_REMOTE_RETRIES,
+            RECOMMENDATION_REMOTE_POOL_SIZE,
+        )
+    raise ValueError(f"Unknown remote recommendation backend '{backend}'")
+
+
+def get_remote_recommender(
+    backend: Optional[str] = None,
+) -> Optional[RemoteRecommender]:
+    """
+    Get the shared remote recommender of the configured backend.
+
+    Args:
+        backend (Optional[str]): Overrides RECOMMENDATION_BACKEND.
+
+    Returns:
+        Optional[RemoteRecommender]: The recommender, or None for the local
+                                     backend.
+    """
+    backend = backend or RECOMMENDATION_BACKEND
+    if backend == LOCAL:
+        return None
+    with _recommender_lock:
+        if _recommender["backend"] != backend:
+            _recommender["instance"] = RemoteRecommender(
+                build_inference_client(backend),
+                CircuitBreaker(
+                    RECOMMENDATION_REMOTE_BREAKER_FAILURES,
+                    RECOMMENDATION_REMOTE_BREAKER_RESET_SECONDS,
+                ),
+                RECOMMENDATION_REMOTE_BATCH_SIZE,
+                RECOMMENDATION_REMOTE_BATCH_WAIT_MS / 1000,
+                RECOMMENDATION_REMOTE_POOL_SIZE,
+            )
+            _recommender["backend"] = backend
+            logger.info(f"Using the {backend} backend for recommendations")
+        return _recommender["instance"]
@@ -0,0 +1,229 @@
+import json
+import logging
+import multiprocessing
+import os
+from datetime import datetime
+from functools import partial
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.models import BackgroundJob
+
+from ..config import TRAINING_SNAPSHOT_DIR
+from . import collaborative_service, model_store_service
+
+# Set up logger
+logger = logging.getLogger("app.job_service")
+
+# Job kinds
+RECOMMENDATION = "recommendation"
+COLLABORATIVE = "collaborative"
+PRECOMPUTE = "precompute"
+SNAPSHOT = "snapshot"
+SNAPSHOT_INCREMENTAL = "snapshot-incremental"
+SIMILAR_BOOKS = "similar-books"
+
+# Job statuses
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# Only report progress steps of at least this size, to limit database writes
+PROGRESS_STEP = 0.01
+
+# Jobs run in fresh interpreters, so they never inherit the server's threads,
+# sockets or database connections.
+_context = multiprocessing.get_context("spawn")
+
+
+def _default_model_dir(kind: str) -> str:
+    if kind == COLLABORATIVE:
+        return collaborative_service.COLLABORATIVE_MODEL_DIR
+    if kind in (SNAPSHOT, SNAPSHOT_INCREMENTAL):
+        return TRAINING_SNAPSHOT_DIR
+    return model_store_service.RECOMMENDATION_MODEL_DIR
+
+
+def _process_alive(pid: Optional[int]) -> bool:
+    # Reap finished children so they do not linger as zombies
+    multiprocessing.active_children()
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _check_alive(db: Session, job: BackgroundJob) -> BackgroundJob:
+    """
+    Mark an active job as failed if its process is gone.
+
+    Args:
+        db (Session): Database session.
+        job (BackgroundJob): The job to check.
+
+    Returns:
+        BackgroundJob: The job with its current status.
+    """
+    if job.status in (PENDING, RUNNING) and job.pid and not _process_alive(job.pid):
+        db.refresh(job)
+        if job.status in (PENDING, RUNNING):
+            logger.error(f"Job {job.id} process {job.pid} exited unexpectedly")
+            job.status = FAILED
+            job.detail = json.dumps({"error": "Job process exited unexpectedly"})
+            job.finished_at = datetime.utcnow()
+            db.commit()
+    return job
+
+
+def start_training_job(
+    db: Session,
+    kind: str = RECOMMENDATION,
+    model_dir: Optional[str] = None,
+    options: Optional[dict] = None,
+) -> BackgroundJob:
+    """
+    Start training a model in a separate process.
+
+    Only one job of each kind runs at a time; if one is already active it is
+    returned instead of starting another. Workers pick up the new model
+    version as soon as the job replaces the CURRENT pointer.
+
+    Args:
+        db (Session): Database session.
+        kind (str): The model to train, "recommendation" or "collaborative";
+                    "precompute" to recompute every user's recommendations; or
+                    "snapshot" or "snapshot-incremental" to export training
+                    data; or "similar-books" to precompute similar books.
+        model_dir (Optional[str]): Root directory of the job's artifacts.
+        options (Optional[dict]): Keyword arguments of the job function.
+
+    Returns:
+        BackgroundJob: The started or already active job.
+
+    Raises:
+        ValueError: If the job kind is unknown.
+    """
+    if kind not in (
+        RECOMMENDATION,
+        COLLABORATIVE,
+        PRECOMPUTE,
+        SNAPSHOT,
+        SNAPSHOT_INCREMENTAL,
+        SIMILAR_BOOKS,
+    ):
+        raise ValueError(f"Unknown job kind '{kind}'")
+
+    active_jobs = (
+        db.query(BackgroundJob)
+        .filter(
+            BackgroundJob.kind == kind, BackgroundJob.status.in_([PENDING, RUNNING])
+        )
+        .all()
+    )
+    for job in active_jobs:
+        if _check_alive(db, job).status in (PENDING, RUNNING):
+            logger.info(f"A {kind} training job is already active: {job.id}")
+            return job
+
+    job = BackgroundJob(kind=kind, status=PENDING, progress=0.0)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    process = _context.Process(
+        target=run_job,
+        args=(job.id, kind, model_dir or _default_model_dir(kind), options),
+        name=f"{kind}-training-{job.id}",
+    )
+    process.start()
+    job.pid = process.pid
+    db.commit()
+    logger.info(f"Started {kind} training job {job.id} in process {process.pid}")
+    return job
+
+
+def get_job(db: Session, job_id: int) -> Optional[BackgroundJob]:
+    """
+    Get a background job and its progress.
+
+    Args:
+        db (Session): Database session.
+        job_id (int): ID of the job.
+
+    Returns:
+        Optional[BackgroundJob]: The job, or None if it does not exist.
+    """
+    job = db.get(BackgroundJob, job_id)
+    if job is None:
+        return None
+    return _check_alive(db, job)
+
+
+def run_job(
+    job_id: int,
+    kind: str,
+    model_dir: Optional[str] = None,
+    options: Optional[dict] = None,
+):
+    """
+    Run a training job and record its status, progress and result.
+
+    This is the entry point of the job process, but it can also run in the
+    calling process.
+
+    Args:
+        job_id (int): ID of the job.
+        kind (str): The job kind, as passed to start_training_job.
+        model_dir (Optional[str]): Root directory of the model artifacts.
+        options (Optional[dict]): Keyword arguments of the job function.
+    """
+    from ..database import SessionLocal
+    from .precompute_service import precompute_recommendations_for_all_users
+    from .recommendation_service import train_recommendation_model
+    from .similarity_service import compute_similar_books
+    from .snapshot_service import export_training_snapshot
+
+    trainers = {
+        RECOMMENDATION: train_recommendation_model,
+        COLLABORATIVE: collaborative_service.train_collaborative_model,
+        PRECOMPUTE: precompute_recommendations_for_all_users,
+        SNAPSHOT: export_training_snapshot,
+        SNAPSHOT_INCREMENTAL: partial(export_training_snapshot, incremental=True),
+        SIMILAR_BOOKS: compute_similar_books,
+    }
+    db = SessionLocal()
+    try:
+        job = db.get(BackgroundJob, job_id)
+        job.status = RUNNING
+        job.pid = os.getpid()
+        job.started_at = datetime.utcnow()
+        db.commit()
+
+        def report_progress(fraction: float):
+            if fraction - job.progress >= PROGRESS_STEP:
+                job.progress = min(fraction, 1.0)
+                db.commit()
+
+        try:
+            result = trainers[kind](
+                db, model_dir=model_dir, progress=report_progress, **(options or {})
+            )
+        except Exception as e:
+            logger.exception(f"Job {job_id} failed")
+            db.rollback()
+            job.status = FAILED
+            job.detail = json.dumps({"error": str(e)})
+        else:
+            logger.info(f"Job {job_id} succeeded")
+            job.status = SUCCEEDED
+            job.progress = 1.0
+            job.detail = json.dumps(result)
+        job.finished_at = datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
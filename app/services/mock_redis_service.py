@@ -20,18 +20,18 @@ class MockRedisClientWithTTL:
         self.store = {}
         logger.debug("Initialized MockRedisClientWithTTL.")
 
-    def setex(self, key, time, value):
+    def setex(self, key, ttl, value):
         """
         Set a key with an expiration time.
 
         Args:
             key (str): The key to set.
-            time (int): Time to live in seconds.
+            ttl (int): Time to live in seconds.
             value (str): The value to store.
         """
-        expire_at = time.time() + time
+        expire_at = time.time() + ttl
         self.store[key] = (value, expire_at)
-        logger.debug(f"Set key {key} with TTL of {time} seconds.")
+        logger.debug(f"Set key {key} with TTL of {ttl} seconds.")
 
     def get(self, key):
         """
@@ -54,6 +54,23 @@ class MockRedisClientWithTTL:
                 logger.debug(f"Key {key} expired and was removed.")
             return None
 
+    def delete(self, *keys):
+        """
+        Delete one or more keys.
+
+        Args:
+            keys (str): The keys to delete.
+
+        Returns:
+            int: The number of keys that were removed.
+        """
+        removed = 0
+        for key in keys:
+            if self.store.pop(key, None) is not None:
+                removed += 1
+        logger.debug(f"Deleted {removed} key(s) from mock Redis.")
+        return removed
+
 
 if USE_MOCK_REDIS:
     logger.info("Using MockRedisClientWithTTL as the Redis client.")
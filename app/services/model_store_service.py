@@ -0,0 +1,895 @@
+import json
+import logging
+import os
+import shutil
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from ..config import (
+    RECOMMENDATION_INDEX_BACKEND,
+    RECOMMENDATION_LSH_BITS,
+    RECOMMENDATION_LSH_MAX_CANDIDATES,
+    RECOMMENDATION_LSH_PROBES,
+    RECOMMENDATION_LSH_TABLES,
+    RECOMMENDATION_MODEL_DIR,
+)
+from .ann_index_service import BRUTE_FORCE, BruteForceIndex, build_index, load_index
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no advisory file locks
+    fcntl = None
+
+# Set up logger
+logger = logging.getLogger("app.model_store_service")
+
+MODEL_FORMAT = 1
+CURRENT_POINTER = "CURRENT"
+OVERLAY_FILE = "overlay.npz"
+OVERLAY_LOCK = "overlay.lock"
+KEEP_VERSIONS = 2
+# Upper bound on the dense query-by-book scores computed at once
+SEARCH_BLOCK_CELLS = 16_000_000
+
+# Vectorizer settings persisted with the artifact so queries are tokenized the
+# same way the catalog was.
+VECTORIZER_PARAMS = [
+    "lowercase",
+    "stop_words",
+    "token_pattern",
+    "ngram_range",
+    "norm",
+    "use_idf",
+    "smooth_idf",
+    "sublinear_tf",
+]
+
+_registry_lock = threading.Lock()
+_registry = {"key": None, "model": None}
+_overlay_lock = threading.Lock()
+
+
+class ModelOverlay:
+    """
+    Book changes applied to a model version since it was trained.
+
+    Attributes:
+        matrix (scipy.sparse.csr_matrix): Vectors of added or updated books.
+        book_ids (np.ndarray): Book ID for each overlay row.
+        removed_ids (np.ndarray): IDs of trained books that were deleted or
+                                  replaced by an overlay row.
+        oov_tokens (int): Tokens of changed books missing from the vocabulary.
+        total_tokens (int): Total tokens of changed books.
+        changes (int): Number of book changes applied.
+    """
+
+    def __init__(
+        self,
+        matrix,
+        book_ids,
+        removed_ids,
+        oov_tokens: int = 0,
+        total_tokens: int = 0,
+        changes: int = 0,
+    ):
+        self.matrix = matrix
+        self.book_ids = book_ids
+        self.removed_ids = removed_ids
+        self.oov_tokens = oov_tokens
+        self.total_tokens = total_tokens
+        self.changes = changes
+
+    @classmethod
+    def empty(cls, n_features: int) -> "ModelOverlay":
+        """
+        Create an overlay without any changes.
+
+        Args:
+            n_features (int): Vocabulary size of the model.
+
+        Returns:
+            ModelOverlay: The empty overlay.
+        """
+        return cls(
+            sp.csr_matrix((0, n_features), dtype=np.float32),
+            np.zeros(0, dtype=np.int64),
+            np.zeros(0, dtype=np.int64),
+        )
+
+    @property
+    def drift(self) -> float:
+        """
+        Share of changed books' tokens that the vocabulary does not cover.
+        """
+        if not self.total_tokens:
+            return 0.0
+        return self.oov_tokens / self.total_tokens
+
+
+class RecommendationModel:
+    """
+    A trained TF-IDF recommendation model.
+
+    The TF-IDF matrix rows are L2-normalized, so ranking books by cosine
+    similarity (a sparse dot product) gives the same order as the euclidean
+    nearest neighbours the model used to be queried with.
+
+    Books changed since training are served from an overlay: their trained
+    rows are masked out and their new vectors are scored alongside the matrix.
+
+    Attributes:
+        version (str): The artifact version the model was loaded from.
+        vectorizer (TfidfVectorizer): Vectorizer used to encode queries.
+        matrix (scipy.sparse.csr_matrix): One TF-IDF row per trained book.
+        book_ids (np.ndarray): Book ID for each matrix row.
+        overlay (ModelOverlay): Book changes applied since training.
+        generation (str): Identifies the model version and overlay state.
+        index (BruteForceIndex | LSHIndex): Selects the books scored per query.
+    """
+
+    def __init__(
+        self,
+        version,
+        vectorizer,
+        matrix,
+        book_ids,
+        overlay=None,
+        generation=None,
+        index=None,
+    ):
+        self.version = version
+        self.vectorizer = vectorizer
+        self.matrix = matrix
+        self.book_ids = book_ids
+        self.index = index or BruteForceIndex()
+        self.overlay = overlay or ModelOverlay.empty(matrix.shape[1])
+        self.generation = generation or version
+
+        self._removed = None
+        if self.overlay.removed_ids.size:
+            self._removed = np.isin(book_ids, self.overlay.removed_ids)
+        self._all_book_ids = book_ids
+        if self.overlay.book_ids.size:
+            self._all_book_ids = np.concatenate([book_ids, self.overlay.book_ids])
+
+    def with_overlay(self, overlay, generation) -> "RecommendationModel":
+        """
+        Create a model sharing this model's arrays with a different overlay.
+
+        Args:
+            overlay (ModelOverlay): The overlay to apply.
+            generation (str): Identifies the model version and overlay state.
+
+        Returns:
+            RecommendationModel: The model with the overlay applied.
+        """
+        return RecommendationModel(
+            self.version,
+            self.vectorizer,
+            self.matrix,
+            self.book_ids,
+            overlay=overlay,
+            generation=generation,
+            index=self.index,
+        )
+
+    def active_matrix(self):
+        """
+        Combine the trained rows that are still current with the overlay rows.
+
+        Returns:
+            Tuple[scipy.sparse.csr_matrix, np.ndarray]: One row per current book
+                                                        and the matching book IDs.
+        """
+        matrix, book_ids = self.matrix, np.asarray(self.book_ids)
+        if self._removed is not None:
+            keep = np.flatnonzero(~self._removed)
+            matrix, book_ids = matrix[keep], book_ids[keep]
+        if self.overlay.book_ids.size:
+            matrix = sp.vstack([matrix, self.overlay.matrix]).tocsr()
+            book_ids = np.concatenate([book_ids, self.overlay.book_ids])
+        return matrix, book_ids
+
+    def transform(self, texts: List[str]):
+        """
+        Encode texts into TF-IDF vectors using the model's vocabulary.
+
+        Args:
+            texts (List[str]): Texts to encode.
+
+        Returns:
+            scipy.sparse.csr_matrix: One row per text.
+        """
+        return self.vectorizer.transform(texts)
+
+    def search(self, X_query, n_neighbors: int = 10) -> List[Tuple[list, list]]:
+        """
+        Find the most similar books for each query row.
+
+        Args:
+            X_query (scipy.sparse.csr_matrix): Encoded queries.
+            n_neighbors (int): Number of books to return per query.
+
+        Returns:
+            List[Tuple[list, list]]: For each query, the ranked book IDs and their
+                                     cosine similarity scores.
+        """
+        if self.index.name == BRUTE_FORCE:
+            return self._search_all(X_query, n_neighbors)
+        return [
+            self._search_candidates(X_query[row], n_neighbors)
+            for row in range(X_query.shape[0])
+        ]
+
+    def _search_all(self, X_query, n_neighbors):
+        # Score query blocks so the dense score matrix stays bounded
+        n_rows = self.matrix.shape[0] + self.overlay.book_ids.size
+        step = max(1, SEARCH_BLOCK_CELLS // max(n_rows, 1))
+        results = []
+        for start in range(0, X_query.shape[0], step):
+            stop = start + step
+            results.extend(self._search_block(X_query[start:stop], n_neighbors))
+        return results
+
+    def _search_block(self, X_query, n_neighbors):
+        scores = np.asarray((self.matrix @ X_query.T).todense()).T
+        if self._removed is not None:
+            scores[:, self._removed] = -np.inf
+        if self.overlay.book_ids.size:
+            overlay_scores = np.asarray((self.overlay.matrix @ X_query.T).todense()).T
+            scores = np.hstack([scores, overlay_scores])
+        return [_top_k(self._all_book_ids, row, n_neighbors) for row in scores]
+
+    def _search_candidates(self, X_row, n_neighbors):
+        rows = self.index.candidates(X_row)
+        if rows is None:
+            return self._search_all(X_row, n_neighbors)[0]
+
+        scores = np.asarray((self.matrix[rows] @ X_row.T).todense()).ravel()
+        if self._removed is not None:
+            scores[self._removed[rows]] = -np.inf
+        book_ids = np.asarray(self.book_ids[rows])
+        # Books changed since training are few, so they are always scored
+        if self.overlay.book_ids.size:
+            overlay_scores = np.asarray((self.overlay.matrix @ X_row.T).todense())
+            scores = np.concatenate([scores, overlay_scores.ravel()])
+            book_ids = np.concatenate([book_ids, self.overlay.book_ids])
+        return _top_k(book_ids, scores, n_neighbors)
+
+
+def _top_k(book_ids, scores, k):
+    """
+    Select the k highest scoring books in descending order.
+
+    Args:
+        book_ids (np.ndarray): Book ID for each score.
+        scores (np.ndarray): Similarity score for each book.
+        k (int): Number of books to select.
+
+    Returns:
+        Tuple[list, list]: The ranked book IDs and their scores.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return [], []
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    top = top[np.isfinite(scores[top])]
+    return [int(book_ids[i]) for i in top], [float(scores[i]) for i in top]
+
+
+def _write_array(path, array, dtype):
+    # Accepts a path or an open binary file, to which the array is appended
+    np.ascontiguousarray(array, dtype=dtype).tofile(path)
+
+
+def _convert_array(path, src_dtype, dst_dtype, chunk_size=1 << 22):
+    """
+    Rewrite a flat array file with another dtype, one chunk at a time.
+
+    Args:
+        path (str): Path of the array file.
+        src_dtype (np.dtype): Current dtype of the file.
+        dst_dtype (np.dtype): Dtype to convert to.
+        chunk_size (int): Number of elements converted at once.
+    """
+    source = np.memmap(path, dtype=src_dtype, mode="r")
+    with open(f"{path}.tmp", "wb") as target:
+        for start in range(0, len(source), chunk_size):
+            stop = start + chunk_size
+            _write_array(target, source[start:stop], dst_dtype)
+    del source
+    os.replace(f"{path}.tmp", path)
+
+
+def _read_array(path, dtype, count):
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+def _file_stamp(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def current_version(model_dir: Optional[str] = None) -> Optional[str]:
+    """
+    Read the version of the model artifact that is currently active.
+
+    Args:
+        model_dir (Optional[str]): Root directory of the model artifacts.
+
+    Returns:
+        Optional[str]: The active version, or None if no model has been saved.
+    """
+    model_dir = model_dir or RECOMMENDATION_MODEL_DIR
+    try:
+        with open(os.path.join(model_dir, CURRENT_POINTER)) as pointer:
+            return pointer.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class ModelWriter:
+    """
+    Write a model version block by block, so the matrix never has to fit in
+    memory.
+
+    Rows are appended to the flat files as they are produced. On commit the
+    search index is built from the memory-mapped matrix and the version is
+    activated; leaving the context without committing discards it.
+
+    Attributes:
+        version (str): The version being written.
+        n_rows (int): Number of rows appended so far.
+        nnz (int): Number of stored matrix entries appended so far.
+    """
+
+    def __init__(self, vectorizer: TfidfVectorizer, model_dir: Optional[str] = None):
+        self.vectorizer = vectorizer
+        self.model_dir = model_dir or RECOMMENDATION_MODEL_DIR
+        self.version = new_version()
+        self.staging_dir = os.path.join(self.model_dir, f"{self.version}.tmp")
+        self.n_rows = 0
+        self.nnz = 0
+        self._committed = False
+        os.makedirs(self.staging_dir, exist_ok=True)
+        self._files = {
+            name: open(self._path(name), "wb")
+            for name in ("data.bin", "indices.bin", "indptr.bin", "book_ids.bin")
+        }
+        # Row pointers are written as int64 and narrowed on commit if possible
+        _write_array(self._files["indptr.bin"], [0], np.int64)
+
+    def __enter__(self) -> "ModelWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self._committed:
+            self._close_files()
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.staging_dir, name)
+
+    def _close_files(self):
+        for file in self._files.values():
+            file.close()
+
+    def append(self, matrix, book_ids):
+        """
+        Append a block of matrix rows.
+
+        Args:
+            matrix (scipy.sparse.spmatrix): TF-IDF rows of the block.
+            book_ids (list): Book ID for each row of the block.
+        """
+        matrix = sp.csr_matrix(matrix)
+        _write_array(self._files["data.bin"], matrix.data, np.float32)
+        _write_array(self._files["indices.bin"], matrix.indices, np.int32)
+        _write_array(
+            self._files["indptr.bin"],
+            np.asarray(matrix.indptr[1:], dtype=np.int64) + self.nnz,
+            np.int64,
+        )
+        _write_array(self._files["book_ids.bin"], book_ids, np.int64)
+        self.n_rows += matrix.shape[0]
+        self.nnz += int(matrix.nnz)
+
+    def commit(
+        self,
+        pending_changes: Optional[
+            Callable[[], Tuple[Dict[int, str], Iterable[int]]]
+        ] = None,
+    ) -> str:
+        """
+        Finish the artifact, build its search index and make it the active version.
+
+        Book changes applied to the previous version while this one was being
+        trained would be lost on activation, so pending_changes is called with
+        the previous version's overlay locked, and the changes it returns are
+        written to the new version's overlay before the pointer is swapped.
+
+        Args:
+            pending_changes (Optional[Callable]): Returns the text of each book
+                                                  added or updated since
+                                                  training started, keyed by
+                                                  book ID, and the IDs of the
+                                                  books deleted since.
+
+        Returns:
+            str: The version of the saved model.
+        """
+        self._close_files()
+        terms = self.vectorizer.get_feature_names_out()
+        n_features = len(terms)
+
+        # Both index arrays share one dtype so the matrix is mapped without copies
+        if self.nnz < np.iinfo(np.int32).max:
+            index_dtype = np.int32
+            _convert_array(self._path("indptr.bin"), np.int64, index_dtype)
+        else:
+            index_dtype = np.int64
+            _convert_array(self._path("indices.bin"), np.int32, index_dtype)
+
+        _write_array(self._path("idf.bin"), self.vectorizer.idf_, np.float64)
+        with open(self._path("vocabulary.txt"), "w") as vocabulary_file:
+            vocabulary_file.write("\n".join(terms))
+
+        matrix = sp.csr_matrix(
+            (
+                _read_array(self._path("data.bin"), np.float32, self.nnz),
+                _read_array(self._path("indices.bin"), index_dtype, self.nnz),
+                _read_array(self._path("indptr.bin"), index_dtype, self.n_rows + 1),
+            ),
+            shape=(self.n_rows, n_features),
+        )
+        params = self.vectorizer.get_params()
+        meta = {
+            "format": MODEL_FORMAT,
+            "version": self.version,
+            "shape": [self.n_rows, n_features],
+            "nnz": self.nnz,
+            "index_dtype": np.dtype(index_dtype).name,
+            "vectorizer": {name: params[name] for name in VECTORIZER_PARAMS},
+            "index": build_index(
+                RECOMMENDATION_INDEX_BACKEND,
+                matrix,
+                self.staging_dir,
+                n_tables=RECOMMENDATION_LSH_TABLES,
+                n_bits=RECOMMENDATION_LSH_BITS,
+            ),
+        }
+        del matrix
+        with open(self._path("meta.json"), "w") as meta_file:
+            json.dump(meta, meta_file)
+
+        previous = current_version(self.model_dir)
+        with (
+            _locked_overlay(os.path.join(self.model_dir, previous))
+            if previous is not None
+            else nullcontext()
+        ):
+            if pending_changes is not None:
+                upserts, removed_ids = pending_changes()
+                if upserts or removed_ids:
+                    overlay = _merge_changes(
+                        self.vectorizer,
+                        ModelOverlay.empty(n_features),
+                        upserts,
+                        removed_ids,
+                    )
+                    _save_overlay(self._path(OVERLAY_FILE), overlay)
+                    logger.info(
+                        f"Carried {overlay.changes} book change(s) made during "
+                        f"training over to version {self.version}"
+                    )
+            publish_version(self.model_dir, self.version)
+        self._committed = True
+        logger.info(
+            f"Recommendation model version {self.version} saved to "
+            f"{os.path.join(self.model_dir, self.version)}"
+        )
+        return self.version
+
+
+def save_recommendation_model(
+    vectorizer: TfidfVectorizer,
+    matrix,
+    book_ids,
+    model_dir: Optional[str] = None,
+) -> str:
+    """
+    Save a trained model as flat files and make it the active version.
+
+    The sparse matrix arrays, book IDs and IDF weights are written as raw
+    binary files that workers memory-map, so every process shares one copy of
+    the model through the page cache. The search index selected by
+    RECOMMENDATION_INDEX_BACKEND is built and saved alongside them. The new
+    version is written to its own directory and activated by atomically
+    replacing the CURRENT pointer.
+
+    Args:
+        vectorizer (TfidfVectorizer): The fitted vectorizer.
+        matrix (scipy.sparse.spmatrix): The TF-IDF matrix, one row per book.
+        book_ids (list): Book ID for each matrix row.
+        model_dir (Optional[str]): Root directory of the model artifacts.
+
+    Returns:
+        str: The version of the saved model.
+    """
+    with ModelWriter(vectorizer, model_dir) as writer:
+        writer.append(matrix, book_ids)
+        return writer.commit()
+
+
+def new_version() -> str:
+    """
+    Generate a sortable version name for a model artifact.
+
+    Returns:
+        str: The version, a UTC timestamp.
+    """
+    return datetime.utcnow().strftime("%Y%m%d%H%M%S%f")
+
+
+def publish_version(model_dir: str, version: str):
+    """
+    Activate a model version written to its staging directory.
+
+    The staging directory is renamed into place, the CURRENT pointer is
+    atomically replaced and old versions are pruned.
+
+    Args:
+        model_dir (str): Root directory of the model artifacts.
+        version (str): The version whose "<version>.tmp" directory is complete.
+    """
+    version_dir = os.path.join(model_dir, version)
+    os.replace(f"{version_dir}.tmp", version_dir)
+    pointer_path = os.path.join(model_dir, CURRENT_POINTER)
+    with open(f"{pointer_path}.tmp", "w") as pointer:
+        pointer.write(version)
+    os.replace(f"{pointer_path}.tmp", pointer_path)
+    _prune_versions(model_dir, keep=version)
+
+
+def _prune_versions(model_dir: str, keep: str):
+    """
+    Remove old model versions, keeping the most recent ones.
+
+    Workers that still have an old version mapped keep reading it safely, as
+    the files are only unlinked.
+
+    Args:
+        model_dir (str): Root directory of the model artifacts.
+        keep (str): The active version, which is never removed.
+    """
+    versions = sorted(
+        name
+        for name in os.listdir(model_dir)
+        if os.path.isdir(os.path.join(model_dir, name)) and not name.endswith(".tmp")
+    )
+    for name in versions[:-KEEP_VERSIONS]:
+        if name != keep:
+            shutil.rmtree(os.path.join(model_dir, name), ignore_errors=True)
+            logger.debug(f"Removed old recommendation model version {name}")
+
+
+def load_recommendation_model(
+    version: str, model_dir: Optional[str] = None
+) -> RecommendationModel:
+    """
+    Load a saved model version by memory-mapping its arrays.
+
+    Args:
+        version (str): The model version to load.
+        model_dir (Optional[str]): Root directory of the model artifacts.
+
+    Returns:
+        RecommendationModel: The loaded model.
+    """
+    model_dir = model_dir or RECOMMENDATION_MODEL_DIR
+    version_dir = os.path.join(model_dir, version)
+    with open(os.path.join(version_dir, "meta.json")) as meta_file:
+        meta = json.load(meta_file)
+    if meta["format"] != MODEL_FORMAT:
+        raise ValueError(f"Unsupported recommendation model format {meta['format']}")
+
+    n_books, n_features = meta["shape"]
+    index_dtype = np.dtype(meta["index_dtype"])
+    data = _read_array(os.path.join(version_dir, "data.bin"), np.float32, meta["nnz"])
+    indices = _read_array(
+        os.path.join(version_dir, "indices.bin"), index_dtype, meta["nnz"]
+    )
+    indptr = _read_array(
+        os.path.join(version_dir, "indptr.bin"), index_dtype, n_books + 1
+    )
+    matrix = sp.csr_matrix((data, indices, indptr), shape=(n_books, n_features))
+    book_ids = _read_array(os.path.join(version_dir, "book_ids.bin"), np.int64, n_books)
+    idf = _read_array(os.path.join(version_dir, "idf.bin"), np.float64, n_features)
+
+    with open(os.path.join(version_dir, "vocabulary.txt")) as vocabulary_file:
+        terms = vocabulary_file.read().split("\n") if n_features else []
+    vectorizer_params = dict(meta["vectorizer"])
+    vectorizer_params["ngram_range"] = tuple(vectorizer_params["ngram_range"])
+    vectorizer = TfidfVectorizer(
+        vocabulary={term: index for index, term in enumerate(terms)},
+        **vectorizer_params,
+    )
+    vectorizer.idf_ = np.asarray(idf)
+
+    index_meta = meta.get("index", {})
+    if RECOMMENDATION_INDEX_BACKEND == BRUTE_FORCE:
+        index = BruteForceIndex()
+    elif index_meta.get("backend") != RECOMMENDATION_INDEX_BACKEND:
+        logger.warning(
+            f"Recommendation model version {version} has no "
+            f"'{RECOMMENDATION_INDEX_BACKEND}' index, using exact search"
+        )
+        index = BruteForceIndex()
+    else:
+        index = load_index(
+            version_dir,
+            index_meta,
+            n_books,
+            n_features,
+            n_probes=RECOMMENDATION_LSH_PROBES,
+            max_candidates=RECOMMENDATION_LSH_MAX_CANDIDATES,
+        )
+
+    logger.info(f"Recommendation model version {version} loaded from {version_dir}")
+    return RecommendationModel(version, vectorizer, matrix, book_ids, index=index)
+
+
+def get_recommendation_model(model_dir: Optional[str] = None) -> RecommendationModel:
+    """
+    Get the active recommendation model, reloading it when a new version is saved.
+
+    Args:
+        model_dir (Optional[str]): Root directory of the model artifacts.
+
+    Returns:
+        RecommendationModel: The active model.
+
+    Raises:
+        FileNotFoundError: If no model has been trained yet.
+    """
+    model_dir = model_dir or RECOMMENDATION_MODEL_DIR
+    version = current_version(model_dir)
+    if version is None:
+        raise FileNotFoundError("Recommendation model has not been trained")
+
+    overlay_path = os.path.join(model_dir, version, OVERLAY_FILE)
+    key = (model_dir, version, _file_stamp(overlay_path))
+    model = _registry["model"]
+    if _registry["key"] == key and model is not None:
+        return model
+
+    with _registry_lock:
+        if _registry["key"] != key:
+            # Only the overlay is re-read when the trained version is unchanged
+            base = _registry["model"]
+            if base is None or _registry["key"][:2] != key[:2]:
+                base = load_recommendation_model(version, model_dir)
+            overlay = _load_overlay(overlay_path, base.matrix.shape[1])
+            _registry["model"] = base.with_overlay(
+                overlay, generation=f"{version}.{key[2] or 0}"
+            )
+            _registry["key"] = key
+        return _registry["model"]
+
+
+def _load_overlay(path: str, n_features: int) -> ModelOverlay:
+    """
+    Read a model overlay from disk.
+
+    Args:
+        path (str): Path of the overlay file.
+        n_features (int): Vocabulary size of the model.
+
+    Returns:
+        ModelOverlay: The overlay, or an empty one if none was written.
+    """
+    try:
+        with np.load(path) as arrays:
+            matrix = sp.csr_matrix(
+                (arrays["data"], arrays["indices"], arrays["indptr"]),
+                shape=(len(arrays["book_ids"]), n_features),
+            )
+            counters = arrays["counters"]
+            return ModelOverlay(
+                matrix,
+                arrays["book_ids"],
+                arrays["removed_ids"],
+                oov_tokens=int(counters[0]),
+                total_tokens=int(counters[1]),
+                changes=int(counters[2]),
+            )
+    except FileNotFoundError:
+        return ModelOverlay.empty(n_features)
+
+
+def _save_overlay(path: str, overlay: ModelOverlay):
+    """
+    Atomically write a model overlay to disk.
+
+    Args:
+        path (str): Path of the overlay file.
+        overlay (ModelOverlay): The overlay to write.
+    """
+    matrix = sp.csr_matrix(overlay.matrix, dtype=np.float32)
+    with open(f"{path}.tmp", "wb") as overlay_file:
+        np.savez(
+            overlay_file,
+            data=matrix.data,
+            indices=matrix.indices,
+            indptr=matrix.indptr,
+            book_ids=np.asarray(overlay.book_ids, dtype=np.int64),
+            removed_ids=np.asarray(overlay.removed_ids, dtype=np.int64),
+            counters=np.array(
+                [overlay.oov_tokens, overlay.total_tokens, overlay.changes],
+                dtype=np.int64,
+            ),
+        )
+    os.replace(f"{path}.tmp", path)
+
+
+@contextmanager
+def _locked_overlay(version_dir: str):
+    """
+    Serialize overlay updates across threads and worker processes.
+
+    Args:
+        version_dir (str): Directory of the model version being updated.
+    """
+    with _overlay_lock:
+        with open(os.path.join(version_dir, OVERLAY_LOCK), "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _count_oov_tokens(vectorizer: TfidfVectorizer, texts: Iterable[str]):
+    """
+    Count the tokens of texts that fall outside the model vocabulary.
+
+    Args:
+        vectorizer (TfidfVectorizer): The model vectorizer.
+        texts (Iterable[str]): Texts to tokenize.
+
+    Returns:
+        Tuple[int, int]: The out-of-vocabulary and total token counts.
+    """
+    analyzer = vectorizer.build_analyzer()
+    vocabulary = vectorizer.vocabulary_
+    oov_tokens = total_tokens = 0
+    for text in texts:
+        tokens = analyzer(text)
+        total_tokens += len(tokens)
+        oov_tokens += sum(1 for token in tokens if token not in vocabulary)
+    return oov_tokens, total_tokens
+
+
+def _merge_changes(
+    vectorizer: TfidfVectorizer,
+    overlay: ModelOverlay,
+    upserts: Dict[int, str],
+    removed_ids: Iterable[int],
+) -> ModelOverlay:
+    """
+    Apply book changes to an overlay.
+
+    Args:
+        vectorizer (TfidfVectorizer): The vectorizer of the overlay's version.
+        overlay (ModelOverlay): The overlay to update.
+        upserts (Dict[int, str]): Text of each added or updated book.
+        removed_ids (Iterable[int]): IDs of deleted books.
+
+    Returns:
+        ModelOverlay: The updated overlay.
+    """
+    upsert_ids = list(upserts)
+    changed_ids = np.array(upsert_ids + list(removed_ids), dtype=np.int64)
+    oov_tokens, total_tokens = _count_oov_tokens(vectorizer, upserts.values())
+    keep = ~np.isin(overlay.book_ids, changed_ids)
+    matrix = overlay.matrix[keep]
+    book_ids = overlay.book_ids[keep]
+    if upsert_ids:
+        vectors = vectorizer.transform([upserts[book_id] for book_id in upsert_ids])
+        matrix = sp.vstack([matrix, vectors.astype(np.float32)]).tocsr()
+        book_ids = np.concatenate([book_ids, upsert_ids])
+
+    return ModelOverlay(
+        matrix,
+        book_ids,
+        np.union1d(overlay.removed_ids, changed_ids),
+        oov_tokens=overlay.oov_tokens + oov_tokens,
+        total_tokens=overlay.total_tokens + total_tokens,
+        changes=overlay.changes + len(changed_ids),
+    )
+
+
+def overlay_removed_ids(model_dir: Optional[str] = None) -> np.ndarray:
+    """
+    Read the IDs of the books removed or replaced in the active version's overlay.
+
+    Args:
+        model_dir (Optional[str]): Root directory of the model artifacts.
+
+    Returns:
+        np.ndarray: The IDs, empty if no model or overlay has been saved.
+    """
+    model_dir = model_dir or RECOMMENDATION_MODEL_DIR
+    version = current_version(model_dir)
+    if version is None:
+        return np.zeros(0, dtype=np.int64)
+    try:
+        with np.load(os.path.join(model_dir, version, OVERLAY_FILE)) as arrays:
+            return arrays["removed_ids"]
+    except FileNotFoundError:
+        return np.zeros(0, dtype=np.int64)
+
+
+def apply_book_changes(
+    upserts: Optional[Dict[int, str]] = None,
+    removed_ids: Iterable[int] = (),
+    model_dir: Optional[str] = None,
+) -> ModelOverlay:
+    """
+    Add, replace or remove book vectors in the active model without retraining.
+
+    Books are encoded with the existing vocabulary and written to the active
+    version's overlay, which every worker picks up on its next lookup.
+
+    Args:
+        upserts (Optional[Dict[int, str]]): Text of each added or updated book,
+                                            keyed by book ID.
+        removed_ids (Iterable[int]): IDs of deleted books.
+        model_dir (Optional[str]): Root directory of the model artifacts.
+
+    Returns:
+        ModelOverlay: The updated overlay.
+
+    Raises:
+        FileNotFoundError: If no model has been trained yet.
+    """
+    model_dir = model_dir or RECOMMENDATION_MODEL_DIR
+    upserts = upserts or {}
+    removed_ids = list(removed_ids)
+    while True:
+        model = get_recommendation_model(model_dir)
+        version_dir = os.path.join(model_dir, model.version)
+        overlay_path = os.path.join(version_dir, OVERLAY_FILE)
+        with _locked_overlay(version_dir):
+            # A retrain may have activated a new version while waiting for the
+            # lock; the change then belongs to the new version
+            if current_version(model_dir) != model.version:
+                continue
+            overlay = _merge_changes(
+                model.vectorizer,
+                _load_overlay(overlay_path, model.matrix.shape[1]),
+                upserts,
+                removed_ids,
+            )
+            _save_overlay(overlay_path, overlay)
+            break
+
+    logger.info(
+        f"Applied {len(upserts) + len(removed_ids)} book change(s) to "
+        f"recommendation model "
+        f"{model.version}, drift {overlay.drift:.3f}"
+    )
+    return overlay
@@ -0,0 +1,234 @@
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import DirtyUser, PrecomputeChunk, UserPreferences
+
+from ..config import (
+    RECOMMENDATION_PRECOMPUTE_BATCH_SIZE,
+    RECOMMENDATION_PRECOMPUTE_CHUNK_SIZE,
+    RECOMMENDATION_PRECOMPUTE_WORKERS,
+)
+from . import model_store_service
+from .recommendation_service import (
+    rank_recommendations_batch,
+    store_recommendations_batch,
+)
+
+# Set up logger
+logger = logging.getLogger("app.precompute_service")
+
+
+def plan_chunks(
+    db: Session, model_version: str, chunk_size: int
+) -> List[Tuple[int, int]]:
+    """
+    Partition the users with preferences into user ID ranges.
+
+    Ranges are aligned to multiples of the chunk size, so a resumed run
+    produces the same chunks and skips those already checkpointed for the
+    model version. Checkpoints that cannot be resumed, those of another model
+    version or chunk size, are dropped. The caller commits.
+
+    Args:
+        db (Session): Database session.
+        model_version (str): The recommendation model version.
+        chunk_size (int): Number of user IDs per chunk.
+
+    Returns:
+        List[Tuple[int, int]]: The start and stop user IDs of each chunk left.
+    """
+    min_user_id, max_user_id = db.query(
+        func.min(UserPreferences.user_id), func.max(UserPreferences.user_id)
+    ).one()
+    if min_user_id is None:
+        return []
+    db.query(PrecomputeChunk).filter(
+        (PrecomputeChunk.model_version != model_version)
+        | (PrecomputeChunk.stop_user_id - PrecomputeChunk.start_user_id != chunk_size)
+    ).delete(synchronize_session=False)
+    completed = set(
+        db.query(PrecomputeChunk.start_user_id, PrecomputeChunk.stop_user_id)
+        .filter(PrecomputeChunk.model_version == model_version)
+        .all()
+    )
+    first = min_user_id - min_user_id % chunk_size
+    chunks = []
+    for start in range(first, max_user_id + 1, chunk_size):
+        chunk = (start, start + chunk_size)
+        if chunk not in completed:
+            chunks.append(chunk)
+    return chunks
+
+
+def precompute_chunk(
+    db: Session,
+    start_user_id: int,
+    stop_user_id: int,
+    model_version: str,
+    run_started: datetime,
+) -> int:
+    """
+    Recompute the recommendations of one chunk of users and checkpoint it.
+
+    The recommendations, the cleared dirty marks and the checkpoint are
+    committed in one transaction, so a chunk is either done or redone.
+
+    Args:
+        db (Session): Database session.
+        start_user_id (int): The first user ID of the chunk.
+        stop_user_id (int): The user ID the chunk stops before.
+        model_version (str): The recommendation model version.
+        run_started (datetime): When the run started; later dirty marks are kept.
+
+    Returns:
+        int: Number of users recomputed.
+    """
+    started = time.perf_counter()
+    preferences = (
+        db.query(UserPreferences)
+        .filter(
+            UserPreferences.user_id >= start_user_id,
+            UserPreferences.user_id < stop_user_id,
+        )
+        .order_by(UserPreferences.user_id)
+        .all()
+    )
+    for start in range(0, len(preferences), RECOMMENDATION_PRECOMPUTE_BATCH_SIZE):
+        stop = start + RECOMMENDATION_PRECOMPUTE_BATCH_SIZE
+        store_recommendations_batch(
+            db, rank_recommendations_batch(preferences[start:stop])
+        )
+    db.query(DirtyUser).filter(
+        DirtyUser.user_id >= start_user_id,
+        DirtyUser.user_id < stop_user_id,
+        DirtyUser.marked_at <= run_started,
+    ).delete(synchronize_session=False)
+    db.add(
+        PrecomputeChunk(
+            model_version=model_version,
+            start_user_id=start_user_id,
+            stop_user_id=stop_user_id,
+            users=len(preferences),
+            seconds=time.perf_counter() - started,
+        )
+    )
+    db.commit()
+    return len(preferences)
+
+
+def _init_precompute_worker(model_dir: str):
+    # Spawned workers do not inherit a model directory set at runtime
+    model_store_service.RECOMMENDATION_MODEL_DIR = model_dir
+
+
+def _run_chunk(
+    start_user_id: int, stop_user_id: int, model_version: str, run_started: datetime
+) -> int:
+    from ..database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return precompute_chunk(
+            db, start_user_id, stop_user_id, model_version, run_started
+        )
+    finally:
+        db.close()
+
+
+def precompute_recommendations_for_all_users(
+    db: Session,
+    model_dir: Optional[str] = None,
+    progress: Optional[Callable[[float], None]] = None,
+    chunk_size: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> dict:
+    """
+    Precompute recommendations for all users and store them in the database.
+
+    Users are partitioned into user ID ranges that are processed on a pool of
+    worker processes. Each completed chunk is checkpointed with the model
+    version, so a run that crashes resumes from the chunks left. The
+    checkpoints are cleared once the run completes. A run on a single worker
+    uses the model directory already configured in this process.
+
+    Args:
+        db (Session): Database session.
+        model_dir (Optional[str]): Root directory of the model artifacts.
+        progress (Optional[Callable[[float], None]]): Called with the completed
+                                                      fraction of the chunks.
+        chunk_size (Optional[int]): Number of user IDs per chunk.
+        workers (Optional[int]): Number of worker processes.
+
+    Returns:
+        dict: The model version, the chunks and users processed, and the
+              throughput in users per second.
+
+    Raises:
+        FileNotFoundError: If no recommendation model has been trained.
+    """
+    progress = progress or (lambda fraction: None)
+    chunk_size = chunk_size or RECOMMENDATION_PRECOMPUTE_CHUNK_SIZE
+    model_dir = model_dir or model_store_service.RECOMMENDATION_MODEL_DIR
+    model_version = model_store_service.current_version(model_dir)
+    if model_version is None:
+        raise FileNotFoundError("Recommendation model has not been trained")
+
+    run_started = datetime.utcnow()
+    chunks = plan_chunks(db, model_version, chunk_size)
+    db.commit()
+    workers = workers or RECOMMENDATION_PRECOMPUTE_WORKERS or os.cpu_count() or 1
+    workers = max(1, min(workers, len(chunks)))
+    logger.info(
+        f"Precomputing recommendations for model {model_version}: "
+        f"{len(chunks)} chunks left on {workers} workers"
+    )
+
+    users, done = 0, 0
+    started = time.perf_counter()
+    if workers == 1:
+        for chunk in chunks:
+            users += precompute_chunk(db, *chunk, model_version, run_started)
+            done += 1
+            progress(done / len(chunks))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_precompute_worker,
+            initargs=(model_dir,),
+        ) as pool:
+            futures = [
+                pool.submit(_run_chunk, *chunk, model_version, run_started)
+                for chunk in chunks
+            ]
+            for future in as_completed(futures):
+                users += future.result()
+                done += 1
+                progress(done / len(chunks))
+    seconds = time.perf_counter() - started
+
+    # The run is complete, so the next one starts over
+    db.query(PrecomputeChunk).delete(synchronize_session=False)
+    db.commit()
+
+    users_per_second = users / seconds if seconds else 0.0
+    logger.info(
+        f"Precomputed recommendations for {users} users in {seconds:.1f}s "
+        f"({users_per_second:.0f} users/s)"
+    )
+    return {
+        "version": model_version,
+        "chunks": done,
+        "users": users,
+        "workers": workers,
+        "seconds": round(seconds, 3),
+        "users_per_second": round(users_per_second, 1),
+    }
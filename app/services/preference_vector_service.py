@@ -0,0 +1,188 @@
+import hashlib
+import json
+import logging
+from typing import List, Optional
+
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy.orm import Session
+
+from app.models import UserPreferences
+
+from .model_store_service import RecommendationModel
+
+# Set up logger
+logger = logging.getLogger("app.preference_vector_service")
+
+
+def _normalize_preference_list(value: str) -> list:
+    """
+    Normalize a comma-separated preference string into a sorted list.
+
+    Args:
+        value (str): Comma-separated genres or authors.
+
+    Returns:
+        list: Lower-cased, whitespace-collapsed and sorted entries.
+    """
+    entries = [" ".join(entry.split()).lower() for entry in (value or "").split(",")]
+    return sorted(entry for entry in entries if entry)
+
+
+def preference_signature(user_preferences: UserPreferences) -> str:
+    """
+    Build a normalized signature for a user's preferences.
+
+    Preferences that only differ in ordering, casing or whitespace produce the
+    same signature, so users with identical tastes share one cache entry.
+
+    Args:
+        user_preferences (UserPreferences): User preferences for genres and authors.
+
+    Returns:
+        str: Hex digest identifying the preference set.
+    """
+    payload = json.dumps(
+        {
+            "genres": _normalize_preference_list(user_preferences.preferred_genres),
+            "authors": _normalize_preference_list(user_preferences.preferred_authors),
+        }
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def preference_text(user_preferences: UserPreferences) -> str:
+    """
+    Build the text used to vectorize a user's preferences.
+
+    The text is derived from the normalized preference lists so every user
+    sharing a signature is scored on exactly the same input.
+
+    Args:
+        user_preferences (UserPreferences): User preferences for genres and authors.
+
+    Returns:
+        str: The preference text.
+    """
+    genres = _normalize_preference_list(user_preferences.preferred_genres)
+    authors = _normalize_preference_list(user_preferences.preferred_authors)
+    return f"{', '.join(genres)} {', '.join(authors)}"
+
+
+def encode_vector(X_row) -> bytes:
+    """
+    Serialize a one-row sparse vector as its term indices followed by weights.
+
+    Args:
+        X_row (scipy.sparse.csr_matrix): The vector.
+
+    Returns:
+        bytes: The int32 indices and float32 weights.
+    """
+    return (
+        X_row.indices.astype(np.int32).tobytes()
+        + X_row.data.astype(np.float32).tobytes()
+    )
+
+
+def decode_vectors(blobs: List[bytes], n_features: int) -> sp.csr_matrix:
+    """
+    Stack serialized vectors into a sparse matrix, one row per vector.
+
+    Args:
+        blobs (List[bytes]): Vectors serialized with encode_vector.
+        n_features (int): Size of the vocabulary.
+
+    Returns:
+        scipy.sparse.csr_matrix: The vectors.
+    """
+    indptr = np.zeros(len(blobs) + 1, dtype=np.int64)
+    indices, data = [], []
+    for row, blob in enumerate(blobs):
+        nnz = len(blob) // 8
+        indices.append(np.frombuffer(blob, dtype=np.int32, count=nnz))
+        data.append(np.frombuffer(blob, dtype=np.float32, offset=4 * nnz))
+        indptr[row + 1] = indptr[row] + nnz
+    return sp.csr_matrix(
+        (
+            np.concatenate(data) if data else np.zeros(0, dtype=np.float32),
+            np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32),
+            indptr,
+        ),
+        shape=(len(blobs), n_features),
+    )
+
+
+def _vector_version(model: RecommendationModel, user_preferences) -> str:
+    return f"{model.version}:{preference_signature(user_preferences)}"
+
+
+def preference_vectors(
+    model: RecommendationModel, preferences: List[UserPreferences]
+) -> sp.csr_matrix:
+    """
+    Get the preference vectors of users, vectorizing only the stale ones.
+
+    A stored vector is reused while it was computed by the model's vectorizer
+    for the user's current preferences. Stale and missing vectors are
+    vectorized with one call, once per distinct preference set, and stored on
+    the rows; the caller commits.
+
+    Args:
+        model (RecommendationModel): The active recommendation model.
+        preferences (List[UserPreferences]): The preference rows.
+
+    Returns:
+        scipy.sparse.csr_matrix: One preference vector per row.
+    """
+    versions = [_vector_version(model, row) for row in preferences]
+    stale = {}
+    for row, version in zip(preferences, versions):
+        if row.vector_version != version or row.preference_vector is None:
+            stale.setdefault(version, preference_text(row))
+
+    if stale:
+        X_stale = model.transform(list(stale.values()))
+        encoded = {
+            version: encode_vector(X_stale[index])
+            for index, version in enumerate(stale)
+        }
+        for row, version in zip(preferences, versions):
+            if version in encoded:
+                row.preference_vector = encoded[version]
+                row.vector_version = version
+        logger.debug(f"Vectorized {len(stale)} stale preference sets")
+
+    return decode_vectors(
+        [row.preference_vector for row in preferences], model.matrix.shape[1]
+    )
+
+
+def get_preference_vector(
+    db: Session, model: RecommendationModel, user_preferences
+) -> sp.csr_matrix:
+    """
+    Get the preference vector of one user from the store. The caller commits.
+
+    Args:
+        db (Session): Database session.
+        model (RecommendationModel): The active recommendation model.
+        user_preferences (UserPreferences): The user's preferences, as a row or
+                                            a schema.
+
+    Returns:
+        scipy.sparse.csr_matrix: The one-row preference vector.
+    """
+    row: Optional[UserPreferences] = user_preferences
+    if not isinstance(row, UserPreferences):
+        row = (
+            db.query(UserPreferences)
+            .filter(UserPreferences.user_id == user_preferences.user_id)
+            .first()
+        )
+    if row is None or preference_signature(row) != preference_signature(
+        user_preferences
+    ):
+        # Preferences that are not stored are vectorized on the fly
+        return model.transform([preference_text(user_preferences)])
+    return preference_vectors(model, [row])
@@ -1,106 +1,349 @@
 import json
 import logging
-import os
-import pickle
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
 
-import boto3
+import redis
 from fastapi import HTTPException
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.neighbors import NearestNeighbors
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.models import Book, Recommendation, User, UserPreferences
-
-from ..config import REDIS_CACHE_TTL
+from app import schemas
+from app.models import Book, DirtyUser, Recommendation, UserPreferences
+
+from ..config import (
+    RECOMMENDATION_DRIFT_THRESHOLD,
+    RECOMMENDATION_HYBRID_WEIGHT,
+    RECOMMENDATION_MAX_AGE,
+    RECOMMENDATION_PRECOMPUTE_BATCH_SIZE,
+    RECOMMENDATION_RETRAIN_CHANGES,
+    REDIS_CACHE_TTL,
+)
+from .book_service import fetch_book_cards, fetch_books
+from .collaborative_service import blend_scores, get_collaborative_model
+from .dirty_user_service import CATALOG, mark_all_users_dirty, mark_users_dirty
+from .inference_client_service import (
+    InferenceError,
+    RemoteRecommender,
+    get_remote_recommender,
+)
+from .job_service import RECOMMENDATION, start_training_job
 from .mock_redis_service import redis_client
+from .model_store_service import (
+    apply_book_changes,
+    current_version,
+    get_recommendation_model,
+)
+from .preference_vector_service import (
+    get_preference_vector,
+    preference_signature,
+    preference_vectors,
+)
+from .training_service import book_text, train_tfidf_model
 
 # Set up logger
 logger = logging.getLogger("app.recommendation_service")
 
-CACHE_TTL = REDIS_CACHE_TTL  # Cache Time-To-Live in seconds
-
-# Use an environment variable to switch between local and AWS SageMaker
-USE_SAGEMAKER = os.getenv("USE_SAGEMAKER", "false").lower() == "true"
+CACHE_TTL = int(REDIS_CACHE_TTL or 3600)  # Cache Time-To-Live in seconds
 
-if USE_SAGEMAKER:
-    sagemaker_runtime = boto3.client("sagemaker-runtime", region_name="your-region")
-    sagemaker_endpoint_name = "your-sagemaker-endpoint-name"
-    logger.info("Using SageMaker for recommendations")
-else:
-    logger.info("Using local model for recommendations")
+# Recommendation engines selectable per request
+CONTENT = "content"
+COLLABORATIVE = "collaborative"
+HYBRID = "hybrid"
+# Each engine returns this many times the requested books before blending
+HYBRID_CANDIDATE_FACTOR = 5
+# Number of books stored per user
+N_RECOMMENDATIONS = 10
 
 
-def train_recommendation_model(db: Session):
+def train_recommendation_model(
+    db: Session,
+    model_dir: Optional[str] = None,
+    progress: Optional[Callable[[float], None]] = None,
+):
     """
-    Train the recommendation model using TF-IDF and Nearest Neighbors.
+    Train the recommendation model using TF-IDF and save it as a memory-mapped
+    artifact.
+
+    Books are streamed from the database in batches, so catalogs larger than
+    memory can be trained on.
 
     Args:
         db (Session): Database session.
+        model_dir (Optional[str]): Root directory of the model artifacts.
+        progress (Optional[Callable[[float], None]]): Called with the completed
+                                                      fraction of the training.
 
     Returns:
         dict: A message indicating the model was trained successfully.
     """
     logger.info("Starting model training")
-    books = db.query(Book).all()
-    if not books:
-        logger.error("No books found for training the model")
-        raise ValueError("No books found for training the model")
+    result = train_tfidf_model(db, model_dir, progress)
+    logger.info(f"Model trained and saved successfully: {result['timings']}")
 
-    # Prepare the data
-    book_data = [
-        f"{book.genre} {book.author} {book.summary} {book.content}" for book in books
-    ]
+    # Every precomputed row was ranked by the previous model
+    mark_all_users_dirty(db)
 
-    # Train a simple model using TF-IDF and Nearest Neighbors
-    vectorizer = TfidfVectorizer(stop_words="english")
-    X = vectorizer.fit_transform(book_data)
+    return {"detail": "Model trained successfully", **result}
 
-    model = NearestNeighbors(n_neighbors=10, algorithm="auto").fit(X)
 
-    # Save the model and vectorizer to a file
-    with open("recommendation_model.pkl", "wb") as model_file:
-        pickle.dump((model, vectorizer, [book.id for book in books]), model_file)
-    logger.info("Model trained and saved successfully")
+def index_book(db: Session, book_id: int):
+    """
+    Add or replace a single book's vector in the active recommendation model.
 
-    return {"detail": "Model trained successfully"}
+    The book is encoded with the existing vocabulary, so it shows up in
+    recommendations without a retrain. Once the share of out-of-vocabulary
+    tokens across changed books crosses RECOMMENDATION_DRIFT_THRESHOLD, or
+    RECOMMENDATION_RETRAIN_CHANGES books have changed since the last fit, a
+    background job re-trains the model.
 
+    Args:
+        db (Session): Database session.
+        book_id (int): ID of the added or updated book.
+    """
+    book = db.query(Book).filter(Book.id == book_id).first()
+    if not book:
+        logger.warning(f"Book {book_id} not found, skipping index update")
+        return
+    _apply_catalog_change(db, upserts={book.id: book_text(book)})
 
-def get_recommendations(db: Session, user_preferences: UserPreferences):
+
+def unindex_book(db: Session, book_id: int):
     """
-    Get book recommendations for a user based on their preferences.
+    Remove a deleted book from the active recommendation model.
+
+    Args:
+        db (Session): Database session.
+        book_id (int): ID of the deleted book.
+    """
+    _apply_catalog_change(db, removed_ids=[book_id])
+
+
+def _apply_catalog_change(db: Session, upserts=None, removed_ids=()):
+    """
+    Apply book changes to the model and re-train once vocabulary drift is high.
+
+    Stored recommendations that the change alters are expired.
+
+    Args:
+        db (Session): Database session.
+        upserts (dict): Text of each added or updated book, keyed by book ID.
+        removed_ids (list): IDs of deleted books.
+    """
+    try:
+        overlay = apply_book_changes(upserts, removed_ids)
+    except FileNotFoundError:
+        logger.debug("Recommendation model not trained yet, skipping index update")
+        return
+    expire_affected_recommendations(db, upserts or {}, removed_ids)
+
+    if overlay.drift > RECOMMENDATION_DRIFT_THRESHOLD:
+        logger.info(
+            f"Vocabulary drift {overlay.drift:.3f} exceeds "
+            f"{RECOMMENDATION_DRIFT_THRESHOLD}, re-training recommendation model"
+        )
+        start_training_job(db, RECOMMENDATION)
+    elif overlay.changes >= RECOMMENDATION_RETRAIN_CHANGES:
+        logger.info(
+            f"{overlay.changes} books changed since the last fit, "
+            "re-training recommendation model"
+        )
+        start_training_job(db, RECOMMENDATION)
+
+
+def _user_cache_key(user_id: int) -> str:
+    return f"recommendations:{user_id}"
+
+
+def _signature_cache_key(signature: str) -> str:
+    return f"recommendations:signature:{signature}"
+
+
+def _version_prefix() -> str:
+    # Cached results are scoped to the model version; catalog changes between
+    # versions expire the affected entries instead
+    return f"{current_version() or 'untrained'}:"
+
+
+def _model_signature(signature: str) -> str:
+    return f"{_version_prefix()}{signature}"
+
+
+def _encode_ranking(book_ids: list, scores: list) -> str:
+    return json.dumps({"book_ids": list(book_ids), "scores": list(scores)})
+
+
+def _decode_ranking(payload) -> Tuple[list, list]:
+    ranking = json.loads(payload)
+    if isinstance(ranking, list):
+        # Entries cached before scores were stored only hold book IDs
+        return ranking, [0.0] * len(ranking)
+    return ranking["book_ids"], ranking["scores"]
+
+
+def get_cached_recommendations(user_id: int) -> Optional[Tuple[list, list]]:
+    """
+    Get cached recommendations for a user without loading their preferences.
+
+    The per-user key only stores the user's preference signature; the
+    recommendations themselves live under the shared signature key.
+
+    Args:
+        user_id (int): ID of the user.
+
+    Returns:
+        Optional[Tuple[list, list]]: Cached recommended book IDs and their
+                                     scores, or None on a cache miss.
+    """
+    signature = redis_client.get(_user_cache_key(user_id))
+    if not signature:
+        return None
+    if isinstance(signature, bytes):
+        signature = signature.decode("utf-8")
+    if not signature.startswith(_version_prefix()):
+        logger.debug(f"Cached recommendations for user_id {user_id} are outdated")
+        return None
+
+    cached_recommendations = redis_client.get(_signature_cache_key(signature))
+    if not cached_recommendations:
+        return None
+    logger.debug(f"Recommendations for user_id {user_id} fetched from cache")
+    return _decode_ranking(cached_recommendations)
+
+
+def invalidate_user_recommendations(user_id: int):
+    """
+    Drop the per-user cache pointer after a user's preferences change.
+
+    The shared signature entry is left untouched as other users may still
+    point at it.
+
+    Args:
+        user_id (int): ID of the user.
+    """
+    try:
+        redis_client.delete(_user_cache_key(user_id))
+    except redis.RedisError as e:
+        logger.warning(f"Could not clear recommendation cache for {user_id}: {e}")
+        return
+    logger.debug(f"Recommendation cache pointer cleared for user_id {user_id}")
+
+
+def rank_recommendations(
+    db: Session, user_preferences: UserPreferences, engine: str = CONTENT
+) -> Tuple[list, list]:
+    """
+    Rank book recommendations for a user based on their preferences.
+
+    Content results are cached per preference signature, so identical
+    preference sets are computed once. The per-user key points at the
+    signature entry. Collaborative and hybrid results are personal and cheap
+    to score, so they are computed on every request.
 
     Args:
         db (Session): Database session.
         user_preferences (UserPreferences): User preferences for genres and authors.
+        engine (str): The engine to use, "content", "collaborative" or "hybrid".
 
     Returns:
-        list: List of recommended books.
+        Tuple[list, list]: The recommended book IDs and their scores, best first.
     """
-    logger.info(f"Fetching recommendations for user_id {user_preferences.user_id}")
-    cache_key = f"recommendations:{user_preferences.user_id}"
+    logger.info(f"Ranking recommendations for user_id {user_preferences.user_id}")
+    if engine != CONTENT:
+        return rank_books(db, user_preferences, engine)
+
+    signature = _model_signature(preference_signature(user_preferences))
+    cache_key = _signature_cache_key(signature)
 
-    # Check if recommendations are already in the cache
+    # Check if recommendations for this preference set are already in the cache
     cached_recommendations = redis_client.get(cache_key)
     if cached_recommendations:
         logger.debug("Recommendations fetched from cache")
-        return json.loads(cached_recommendations)
-
-    if USE_SAGEMAKER:
-        recommended_books = get_recommendations_from_sagemaker(user_preferences)
-    else:
-        recommended_books = get_recommendations_locally(db, user_preferences)
+        redis_client.setex(
+            _user_cache_key(user_preferences.user_id), CACHE_TTL, signature
+        )
+        return _decode_ranking(cached_recommendations)
+
+    recommender = get_remote_recommender()
+    book_ids = None
+    if recommender is not None:
+        try:
+            book_ids, scores = get_recommendations_remotely(
+                recommender, user_preferences
+            )
+        except InferenceError as e:
+            logger.warning(f"Remote recommendations unavailable, using local: {e}")
+    if book_ids is None:
+        book_ids, scores = get_recommendations_locally(db, user_preferences)
 
     # Cache the recommendations with an expiration time
-    redis_client.setex(
-        cache_key, CACHE_TTL, json.dumps([book.id for book in recommended_books])
-    )
+    redis_client.setex(cache_key, CACHE_TTL, _encode_ranking(book_ids, scores))
+    redis_client.setex(_user_cache_key(user_preferences.user_id), CACHE_TTL, signature)
     logger.debug("Recommendations cached")
 
-    return recommended_books
+    return book_ids, scores
 
 
-def get_recommendations_locally(db: Session, user_preferences: UserPreferences):
+def hydrate_recommendations(
+    db: Session, book_ids: list, scores: list, full: bool = False
+) -> list:
+    """
+    Load ranked recommendations from the database in a single query.
+
+    Args:
+        db (Session): Database session.
+        book_ids (list): The recommended book IDs, best first.
+        scores (list): The score of each book.
+        full (bool): Return full books instead of lightweight cards.
+
+    Returns:
+        list: The book cards, or the full books, in rank order.
+    """
+    if full:
+        return [schemas.Book.from_orm(book) for book in fetch_books(db, book_ids)]
+    return fetch_book_cards(db, book_ids, scores)
+
+
+def get_recommendations(
+    db: Session,
+    user_preferences: UserPreferences,
+    engine: str = CONTENT,
+    full: bool = False,
+) -> list:
+    """
+    Get book recommendations for a user based on their preferences.
+
+    Content results computed online are stored in the Recommendation table,
+    so the next request for the user is served from there, along with any
+    refreshed preference vector. A concurrent request that stored the user's
+    row first wins.
+
+    Args:
+        db (Session): Database session.
+        user_preferences (UserPreferences): User preferences for genres and authors.
+        engine (str): The engine to use, "content", "collaborative" or "hybrid".
+        full (bool): Return full books instead of lightweight cards.
+
+    Returns:
+        list: The recommended book cards, or full books, best first.
+    """
+    book_ids, scores = rank_recommendations(db, user_preferences, engine)
+    if engine == CONTENT:
+        store_recommendations(db, user_preferences.user_id, book_ids, scores)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        logger.debug(
+            f"Recommendations for user_id {user_preferences.user_id} "
+            "were stored by a concurrent request"
+        )
+    return hydrate_recommendations(db, book_ids, scores, full)
+
+
+def get_recommendations_locally(
+    db: Session, user_preferences: UserPreferences
+) -> Tuple[list, list]:
     """
     Get recommendations locally using the trained model.
 
@@ -109,99 +352,433 @@ def get_recommendations_locally(db: Session, user_preferences: UserPreferences):
         user_preferences (UserPreferences): User preferences for genres and authors.
 
     Returns:
-        list: List of recommended books.
+        Tuple[list, list]: The recommended book IDs and their scores, best first.
     """
     logger.info("Fetching recommendations locally")
-    with open("recommendation_model.pkl", "rb") as model_file:
-        model, vectorizer, book_ids = pickle.load(model_file)
+    model = get_recommendation_model()
+    X_user = get_preference_vector(db, model, user_preferences)
+    book_ids, scores = model.search(X_user, n_neighbors=N_RECOMMENDATIONS)[0]
+    logger.debug(f"Recommendations generated for user_id {user_preferences.user_id}")
+    return book_ids, scores
 
-    # Prepare the user's preference data for recommendation
-    preference_text = (
-        f"{user_preferences.preferred_genres} {user_preferences.preferred_authors}"
-    )
-    X_user = vectorizer.transform([preference_text])
 
-    # Get recommendations
-    distances, indices = model.kneighbors(X_user)
+def rank_books(
+    db: Session, user_preferences: UserPreferences, engine: str, n: int = 10
+):
+    """
+    Rank books for a user with the selected recommendation engine.
+
+    Users without ratings in the collaborative model, or any user while no
+    collaborative model has been trained, are ranked by the content model.
+    Content scores use the stored preference vector; the caller commits.
 
-    # Retrieve recommended books from the database
-    recommended_books = [db.query(Book).get(book_ids[i]) for i in indices[0]]
-    logger.debug(f"Recommendations generated for user_id {user_preferences.user_id}")
+    Args:
+        db (Session): Database session.
+        user_preferences (UserPreferences): User preferences for genres and authors.
+        engine (str): The engine to use, "content", "collaborative" or "hybrid".
+        n (int): Number of books to return.
+
+    Returns:
+        Tuple[list, list]: The recommended book IDs and their scores, best first.
+
+    Raises:
+        ValueError: If the engine is unknown.
+    """
+    if engine not in (CONTENT, COLLABORATIVE, HYBRID):
+        raise ValueError(f"Unknown recommendation engine '{engine}'")
+
+    collaborative = None
+    if engine != CONTENT:
+        collaborative_model = get_collaborative_model()
+        if collaborative_model is not None:
+            collaborative = collaborative_model.recommend(
+                user_preferences.user_id, n * HYBRID_CANDIDATE_FACTOR
+            )
+        if collaborative is None:
+            logger.debug(
+                f"No ratings for user_id {user_preferences.user_id}, "
+                "falling back to the content model"
+            )
+            engine = CONTENT
+    if engine == COLLABORATIVE:
+        book_ids, scores = collaborative
+        return book_ids[:n], scores[:n]
 
-    return recommended_books
+    model = get_recommendation_model()
+    X_user = get_preference_vector(db, model, user_preferences)
+    if engine == CONTENT:
+        return model.search(X_user, n_neighbors=n)[0]
+    content = model.search(X_user, n_neighbors=n * HYBRID_CANDIDATE_FACTOR)[0]
+    return blend_scores(content, collaborative, RECOMMENDATION_HYBRID_WEIGHT, n)
 
 
-def get_recommendations_from_sagemaker(user_preferences: UserPreferences):
+def preference_instance(user_preferences: UserPreferences) -> dict:
     """
-    Get recommendations using AWS SageMaker.
+    Build the request instance of a user's preferences for a remote backend.
 
     Args:
         user_preferences (UserPreferences): User preferences for genres and authors.
 
     Returns:
-        list: List of recommended books.
-    """
-    logger.info("Fetching recommendations from SageMaker")
-    payload = json.dumps(
-        {
-            "preferred_genres": user_preferences.preferred_genres,
-            "preferred_authors": user_preferences.preferred_authors,
-        }
-    )
+        dict: The preferred genres and authors.
+    """
+    return {
+        "preferred_genres": user_preferences.preferred_genres,
+        "preferred_authors": user_preferences.preferred_authors,
+    }
 
-    response = sagemaker_runtime.invoke_endpoint(
-        EndpointName=sagemaker_endpoint_name,
-        ContentType="application/json",
-        Body=payload,
-    )
 
-    recommendations = json.loads(response["Body"].read().decode())
+def get_recommendations_remotely(
+    recommender: RemoteRecommender, user_preferences: UserPreferences
+) -> Tuple[list, list]:
+    """
+    Get recommendations from the remote backend.
+
+    Concurrent requests are merged into batched calls, bounded by a deadline
+    and guarded by the backend's circuit breaker.
+
+    Args:
+        recommender (RemoteRecommender): The remote backend.
+        user_preferences (UserPreferences): User preferences for genres and authors.
+
+    Returns:
+        Tuple[list, list]: The recommended book IDs and their scores, best first.
+
+    Raises:
+        InferenceError: If the backend is unavailable or too slow.
+    """
+    logger.info("Fetching recommendations from the remote backend")
+    book_ids, scores = recommender.recommend(preference_instance(user_preferences))
     logger.debug(
-        "Received recommendations from SageMaker for ",
-        f"user_id {user_preferences.user_id}",
+        f"Received remote recommendations for user_id {user_preferences.user_id}"
     )
+    return book_ids, scores
 
-    return recommendations
+
+def store_recommendations(db: Session, user_id: int, book_ids: list, scores: list):
+    """
+    Store a user's ranked recommendations in the Recommendation table.
+
+    The row is tagged with the active model version; the caller commits.
+
+    Args:
+        db (Session): Database session.
+        user_id (int): ID of the user.
+        book_ids (list): The recommended book IDs, best first.
+        scores (list): The score of each book.
+    """
+    recommended_books_serialized = json.dumps(list(book_ids))
+    scores_serialized = json.dumps([float(score) for score in scores])
+    model_version = current_version()
+
+    existing_recommendation = (
+        db.query(Recommendation).filter(Recommendation.user_id == user_id).first()
+    )
+    if existing_recommendation:
+        existing_recommendation.recommended_books = recommended_books_serialized
+        existing_recommendation.scores = scores_serialized
+        existing_recommendation.model_version = model_version
+        existing_recommendation.updated_at = datetime.utcnow()
+    else:
+        db.add(
+            Recommendation(
+                user_id=user_id,
+                recommended_books=recommended_books_serialized,
+                scores=scores_serialized,
+                model_version=model_version,
+            )
+        )
 
 
-def precompute_recommendations_for_all_users(db: Session):
+def get_precomputed_recommendations(
+    db: Session, user_id: int
+) -> Optional[Tuple[list, list]]:
     """
-    Precompute recommendations for all users and store them in the database.
+    Get a user's precomputed recommendations if they are still fresh.
+
+    A row is fresh when it was computed with the active model version and is
+    younger than RECOMMENDATION_MAX_AGE. Rows that book changes since then
+    alter are expired by expire_affected_recommendations.
 
     Args:
         db (Session): Database session.
+        user_id (int): ID of the user.
+
+    Returns:
+        Optional[Tuple[list, list]]: The recommended book IDs and their scores,
+                                     or None if no fresh row exists.
     """
-    logger.info("Precomputing recommendations for all users")
-    users = db.query(User).all()
-    for user in users:
-        user_preferences = (
-            db.query(UserPreferences).filter(UserPreferences.user_id == user.id).first()
+    row = (
+        db.query(
+            Recommendation.recommended_books,
+            Recommendation.scores,
+            Recommendation.model_version,
+            Recommendation.updated_at,
         )
+        .filter(Recommendation.user_id == user_id)
+        .first()
+    )
+    if row is None:
+        return None
+    if row.model_version is None or row.model_version != current_version():
+        logger.debug(f"Precomputed recommendations for user_id {user_id} are outdated")
+        return None
+    if row.updated_at < datetime.utcnow() - timedelta(seconds=RECOMMENDATION_MAX_AGE):
+        logger.debug(f"Precomputed recommendations for user_id {user_id} expired")
+        return None
+
+    book_ids = json.loads(row.recommended_books)
+    scores = json.loads(row.scores) if row.scores else [0.0] * len(book_ids)
+    logger.debug(f"Recommendations for user_id {user_id} served from precompute")
+    return book_ids, scores
+
+
+def expire_precomputed_recommendations(db: Session, user_id: int):
+    """
+    Delete a user's precomputed recommendations, e.g. after their preferences
+    change. The caller commits.
 
-        if not user_preferences:
-            logger.debug(f"No preferences found for user_id {user.id}")
+    Args:
+        db (Session): Database session.
+        user_id (int): ID of the user.
+    """
+    db.query(Recommendation).filter(Recommendation.user_id == user_id).delete(
+        synchronize_session=False
+    )
+
+
+def expire_affected_recommendations(
+    db: Session, upserts: Dict[int, str], removed_ids=()
+) -> int:
+    """
+    Expire the stored recommendations that a catalog change alters.
+
+    A user is affected when a changed book is in their list, or when an added
+    or updated book scores above the last book of their list. Affected users
+    lose their stored row and cache entries and are marked dirty; everyone
+    else keeps being served from the table.
+
+    Args:
+        db (Session): Database session.
+        upserts (Dict[int, str]): Text of each added or updated book, keyed
+                                  by book ID.
+        removed_ids (list): IDs of deleted books.
+
+    Returns:
+        int: Number of users whose recommendations were expired.
+    """
+    changed_ids = set(upserts) | set(removed_ids)
+    if not changed_ids:
+        return 0
+    model = get_recommendation_model()
+    X_books = model.transform(list(upserts.values())).T if upserts else None
+
+    affected, last_user_id = [], None
+    while True:
+        query = (
+            db.query(Recommendation, UserPreferences)
+            .join(UserPreferences, UserPreferences.user_id == Recommendation.user_id)
+            .filter(Recommendation.model_version == model.version)
+        )
+        if last_user_id is not None:
+            query = query.filter(Recommendation.user_id > last_user_id)
+        rows = (
+            query.order_by(Recommendation.user_id)
+            .limit(RECOMMENDATION_PRECOMPUTE_BATCH_SIZE)
+            .all()
+        )
+        if not rows:
+            break
+        last_user_id = rows[-1][0].user_id
+
+        candidates = []
+        for recommendation, user_preferences in rows:
+            if changed_ids.intersection(json.loads(recommendation.recommended_books)):
+                affected.append(user_preferences)
+            else:
+                candidates.append((recommendation, user_preferences))
+        if X_books is None or not candidates:
             continue
+        best_scores = (
+            (preference_vectors(model, [row for _, row in candidates]) @ X_books)
+            .max(axis=1)
+            .toarray()
+            .ravel()
+        )
+        for (recommendation, user_preferences), best in zip(candidates, best_scores):
+            scores = json.loads(recommendation.scores or "[]")
+            # A list shorter than usual takes in any new book
+            if len(scores) < N_RECOMMENDATIONS or best > scores[-1]:
+                affected.append(user_preferences)
+
+    user_ids = [row.user_id for row in affected]
+    for start in range(0, len(user_ids), RECOMMENDATION_PRECOMPUTE_BATCH_SIZE):
+        stop = start + RECOMMENDATION_PRECOMPUTE_BATCH_SIZE
+        db.query(Recommendation).filter(
+            Recommendation.user_id.in_(user_ids[start:stop])
+        ).delete(synchronize_session=False)
+    mark_users_dirty(db, user_ids, CATALOG)
+    db.commit()
+    for user_preferences in affected:
+        _invalidate_cached_ranking(user_preferences)
+    if affected:
+        logger.info(
+            f"Book changes expired the recommendations of {len(affected)} users"
+        )
+    return len(affected)
 
-        # Get personalized recommendations based on the model
-        recommended_books_ids = get_recommendations(db, user_preferences)
-        recommended_books_serialized = json.dumps(recommended_books_ids)
 
-        existing_recommendation = (
-            db.query(Recommendation).filter(Recommendation.user_id == user.id).first()
+def _invalidate_cached_ranking(user_preferences: UserPreferences):
+    signature = _model_signature(preference_signature(user_preferences))
+    try:
+        redis_client.delete(
+            _signature_cache_key(signature),
+            _user_cache_key(user_preferences.user_id),
+        )
+    except redis.RedisError as e:
+        logger.warning(
+            f"Could not clear recommendation cache for {user_preferences.user_id}: {e}"
         )
 
-        if existing_recommendation:
-            existing_recommendation.recommended_books = recommended_books_serialized
-            existing_recommendation.updated_at = datetime.utcnow()
-        else:
-            new_recommendation = Recommendation(
-                user_id=user.id,
-                recommended_books=recommended_books_serialized,
+
+def rank_recommendations_batch(
+    preferences: List[UserPreferences],
+) -> Dict[int, Tuple[list, list]]:
+    """
+    Rank content recommendations for many users at once.
+
+    Users sharing a preference signature are scored once. A remote backend
+    gets all distinct preference sets in one call; the local model scores
+    them with one batched search. Preference
+    vectors come from the vector store and are refreshed on the rows; the
+    caller commits.
+
+    Args:
+        preferences (List[UserPreferences]): The preferences of each user.
+
+    Returns:
+        Dict[int, Tuple[list, list]]: The recommended book IDs and their scores,
+                                      keyed by user ID.
+    """
+    by_signature = {}
+    for index, user_preferences in enumerate(preferences):
+        signature = preference_signature(user_preferences)
+        by_signature.setdefault(signature, []).append(index)
+    first_rows = [indices[0] for indices in by_signature.values()]
+
+    recommender = get_remote_recommender()
+    if recommender is not None:
+        try:
+            remote_rankings = recommender.recommend_many(
+                [preference_instance(preferences[row]) for row in first_rows]
             )
-            db.add(new_recommendation)
+        except InferenceError as e:
+            logger.warning(f"Remote recommendations unavailable, using local: {e}")
+        else:
+            return {
+                preferences[index].user_id: ranking
+                for indices, ranking in zip(by_signature.values(), remote_rankings)
+                for index in indices
+            }
+
+    model = get_recommendation_model()
+    X_users = preference_vectors(model, preferences)
+    rankings = {}
+    for indices, ranking in zip(
+        by_signature.values(), model.search(X_users[first_rows], N_RECOMMENDATIONS)
+    ):
+        for index in indices:
+            rankings[preferences[index].user_id] = ranking
+    return rankings
+
+
+def store_recommendations_batch(db: Session, rankings: Dict[int, Tuple[list, list]]):
+    """
+    Store the ranked recommendations of many users. The caller commits.
+
+    Existing rows are loaded with a single query.
 
+    Args:
+        db (Session): Database session.
+        rankings (Dict[int, Tuple[list, list]]): The recommended book IDs and
+                                                 their scores, keyed by user ID.
+    """
+    model_version = current_version()
+    now = datetime.utcnow()
+    existing = {
+        recommendation.user_id: recommendation
+        for recommendation in db.query(Recommendation).filter(
+            Recommendation.user_id.in_(list(rankings))
+        )
+    }
+    for user_id, (book_ids, scores) in rankings.items():
+        recommendation = existing.get(user_id)
+        if recommendation is None:
+            recommendation = Recommendation(user_id=user_id)
+            db.add(recommendation)
+        recommendation.recommended_books = json.dumps(list(book_ids))
+        recommendation.scores = json.dumps([float(score) for score in scores])
+        recommendation.model_version = model_version
+        recommendation.updated_at = now
+
+
+def precompute_dirty_recommendations(
+    db: Session, batch_size: Optional[int] = None
+) -> dict:
+    """
+    Recompute recommendations only for users marked dirty.
+
+    Dirty users are processed in batches. Each batch's recommendations are
+    stored and its marks are cleared in one transaction, so an interrupted run
+    resumes where it stopped. Users re-marked while the run is in progress
+    keep their mark for the next run.
+
+    Args:
+        db (Session): Database session.
+        batch_size (Optional[int]): Number of users per batch.
+
+    Returns:
+        dict: The number of users recomputed and of marks cleared.
+    """
+    batch_size = batch_size or RECOMMENDATION_PRECOMPUTE_BATCH_SIZE
+    run_started = datetime.utcnow()
+    recomputed, cleared, last_user_id = 0, 0, None
+    logger.info("Precomputing recommendations for dirty users")
+    while True:
+        query = db.query(DirtyUser.user_id).filter(DirtyUser.marked_at <= run_started)
+        if last_user_id is not None:
+            query = query.filter(DirtyUser.user_id > last_user_id)
+        user_ids = [
+            row.user_id
+            for row in query.order_by(DirtyUser.user_id).limit(batch_size).all()
+        ]
+        if not user_ids:
+            break
+        last_user_id = user_ids[-1]
+
+        preferences = (
+            db.query(UserPreferences)
+            .filter(UserPreferences.user_id.in_(user_ids))
+            .all()
+        )
+        if preferences:
+            rankings = rank_recommendations_batch(preferences)
+            store_recommendations_batch(db, rankings)
+            recomputed += len(rankings)
+        # Users without preferences have nothing to recompute; their mark goes
+        cleared += (
+            db.query(DirtyUser)
+            .filter(
+                DirtyUser.user_id.in_(user_ids),
+                DirtyUser.marked_at <= run_started,
+            )
+            .delete(synchronize_session=False)
+        )
         db.commit()
-    logger.info("Precomputed recommendations for all users")
+        logger.debug(f"Precomputed recommendations up to user_id {last_user_id}")
+
+    logger.info(f"Precomputed recommendations for {recomputed} dirty users")
+    return {"recomputed": recomputed, "cleared": cleared}
 
 
 def compute_recommendation(db: Session, user_id: int):
@@ -228,22 +805,7 @@ def compute_recommendation(db: Session, user_id: int):
         raise HTTPException(status_code=404, detail="User preference not set")
 
     # Get personalized recommendations based on the model
-    recommended_books_ids = get_recommendations(db, user_preferences)
-    recommended_books_serialized = json.dumps(recommended_books_ids)
-
-    existing_recommendation = (
-        db.query(Recommendation).filter(Recommendation.user_id == user_id).first()
-    )
-
-    if existing_recommendation:
-        existing_recommendation.recommended_books = recommended_books_serialized
-        existing_recommendation.updated_at = datetime.utcnow()
-    else:
-        new_recommendation = Recommendation(
-            user_id=user_id,
-            recommended_books=recommended_books_serialized,
-        )
-        db.add(new_recommendation)
-
+    book_ids, scores = rank_recommendations(db, user_preferences)
+    store_recommendations(db, user_id, book_ids, scores)
     db.commit()
     logger.info(f"Recommendation computed and stored for user_id {user_id}")
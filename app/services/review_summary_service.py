@@ -0,0 +1,230 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import Book, Review, ReviewSummary
+
+from ..config import (
+    REVIEW_SUMMARY_MAX_AGE_SECONDS,
+    REVIEW_SUMMARY_MAX_FOLDS,
+    REVIEW_SUMMARY_REFRESH_REVIEWS,
+)
+from .summarization_service import (
+    BACKGROUND,
+    INTERACTIVE,
+    SummarizationBusyError,
+    generate_summary_for_reviews,
+)
+
+# Set up logger
+logger = logging.getLogger("app.review_summary_service")
+
+# Books whose review summary is being refreshed in this process
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def bump_review_version(db: Session, book_id: int):
+    """
+    Record that a review of a book changed. The caller commits.
+
+    Args:
+        db (Session): Database session.
+        book_id (int): The ID of the reviewed book.
+    """
+    # Keep updated_at, so review changes do not re-export the book itself
+    db.query(Book).filter(Book.id == book_id).update(
+        {
+            Book.review_version: Book.review_version + 1,
+            Book.updated_at: Book.updated_at,
+        },
+        synchronize_session=False,
+    )
+
+
+def get_review_summary(
+    db: Session, book_id: int
+) -> Optional[Tuple[int, Optional[ReviewSummary]]]:
+    """
+    Read the stored review summary of a book along with its review version.
+
+    Args:
+        db (Session): Database session.
+        book_id (int): The ID of the book.
+
+    Returns:
+        Optional[Tuple[int, Optional[ReviewSummary]]]: The current review version
+        of the book and its stored summary, if any, or None if the book does
+        not exist.
+    """
+    return (
+        db.query(Book.review_version, ReviewSummary)
+        .outerjoin(ReviewSummary, ReviewSummary.book_id == Book.id)
+        .filter(Book.id == book_id)
+        .first()
+    )
+
+
+def needs_refresh(review_summary: ReviewSummary, review_version: int) -> bool:
+    """
+    Check whether enough reviews changed since a summary was computed.
+
+    Args:
+        review_summary (ReviewSummary): The stored summary.
+        review_version (int): The current review version of the book.
+
+    Returns:
+        bool: True once REVIEW_SUMMARY_REFRESH_REVIEWS changes accumulated, or
+        after REVIEW_SUMMARY_MAX_AGE_SECONDS if anything changed.
+    """
+    changes = review_version - review_summary.review_version
+    if changes <= 0:
+        return False
+    age = datetime.utcnow() - review_summary.updated_at
+    return changes >= REVIEW_SUMMARY_REFRESH_REVIEWS or age > timedelta(
+        seconds=REVIEW_SUMMARY_MAX_AGE_SECONDS
+    )
+
+
+def _can_fold(db: Session, book_id: int, review_summary: ReviewSummary) -> bool:
+    """
+    Check whether new reviews can be folded into a stored summary.
+
+    Edits of summarized reviews are only reflected by a full summary, which is
+    computed every REVIEW_SUMMARY_MAX_FOLDS folds, and deletions force one.
+
+    Args:
+        db (Session): Database session.
+        book_id (int): The ID of the book.
+        review_summary (ReviewSummary): The stored summary.
+
+    Returns:
+        bool: True if the summarized reviews are all still there.
+    """
+    if review_summary.folds >= REVIEW_SUMMARY_MAX_FOLDS:
+        return False
+    summarized = (
+        db.query(func.count(Review.id))
+        .filter(Review.book_id == book_id, Review.id <= review_summary.last_review_id)
+        .scalar()
+    )
+    return summarized == review_summary.review_count
+
+
+def _review_texts(rows) -> List[str]:
+    return [
+        f"User Review: {review_text} || User Rating: {rating}"
+        for _, review_text, rating in rows
+    ]
+
+
+async def refresh_review_summary(
+    db: Session, book_id: int, priority: int = INTERACTIVE
+) -> Optional[ReviewSummary]:
+    """
+    Summarize the reviews of a book and store the summary.
+
+    When possible, only the reviews added since the stored summary are
+    summarized and folded into it, so the cost of a refresh is proportional to
+    the new reviews rather than to all of them.
+
+    Args:
+        db (Session): Database session.
+        book_id (int): The ID of the book.
+        priority (int): INTERACTIVE or BACKGROUND.
+
+    Returns:
+        Optional[ReviewSummary]: The stored summary, or None if the book has
+        no reviews.
+
+    Raises:
+        SummarizationBusyError: If the summarization queue is full.
+    """
+    # Read the version first: reviews added meanwhile leave the summary stale
+    review_version = (
+        db.query(Book.review_version).filter(Book.id == book_id).scalar() or 0
+    )
+    previous = db.get(ReviewSummary, book_id)
+    query = (
+        db.query(Review.id, Review.review_text, Review.rating)
+        .filter(Review.book_id == book_id)
+        .order_by(Review.id)
+    )
+
+    if previous is not None and _can_fold(db, book_id, previous):
+        rows = query.filter(Review.id > previous.last_review_id).all()
+        if rows:
+            summary = await generate_summary_for_reviews(
+                _review_texts(rows), priority, db, previous.summary
+            )
+            review_count = previous.review_count + len(rows)
+            folds = previous.folds + 1
+        elif review_version > previous.review_version:
+            # Nothing to fold: the changes were edits of summarized reviews
+            rows = None
+        else:
+            return previous
+    else:
+        rows = None
+
+    if rows is None:
+        rows = query.all()
+        if not rows:
+            db.query(ReviewSummary).filter(ReviewSummary.book_id == book_id).delete()
+            db.commit()
+            return None
+        summary = await generate_summary_for_reviews(_review_texts(rows), priority, db)
+        review_count = len(rows)
+        folds = 0
+
+    review_summary = db.merge(
+        ReviewSummary(
+            book_id=book_id,
+            summary=summary,
+            review_version=review_version,
+            review_count=review_count,
+            last_review_id=rows[-1][0],
+            folds=folds,
+            updated_at=datetime.utcnow(),
+        )
+    )
+    db.commit()
+    logger.info(
+        f"Stored summary of {review_count} reviews for book ID: {book_id} at "
+        f"review version {review_version}, {len(rows)} reviews summarized"
+    )
+    return review_summary
+
+
+async def refresh_review_summary_task(book_id: int, db: Session):
+    """
+    Background task to refresh the review summary of a book.
+
+    Refreshes already running in this process for the book are not repeated.
+
+    Args:
+        book_id (int): The ID of the book.
+        db (Session): Database session dependency.
+    """
+    with _refreshing_lock:
+        if book_id in _refreshing:
+            return
+        _refreshing.add(book_id)
+    try:
+        await refresh_review_summary(db, book_id, BACKGROUND)
+    except SummarizationBusyError:
+        # The stale summary is served until a later request refreshes it
+        logger.warning(
+            f"Skipped review summary refresh for book ID: {book_id}, queue is full"
+        )
+    except Exception as e:
+        logger.error(
+            f"Failed to refresh review summary for book ID: {book_id}. Exception: {e}"
+        )
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(book_id)
@@ -0,0 +1,120 @@
+import json
+import logging
+import time
+from typing import Callable, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models import SimilarBooks
+
+from ..config import SIMILAR_BOOKS_TOP_K
+from .model_store_service import get_recommendation_model
+
+# Set up logger
+logger = logging.getLogger("app.similarity_service")
+
+# Upper bound on the dense similarity scores held in memory per block
+MAX_BLOCK_CELLS = 16_000_000
+
+
+def compute_similar_books(
+    db: Session,
+    top_k: int = SIMILAR_BOOKS_TOP_K,
+    model_dir: Optional[str] = None,
+    progress: Optional[Callable[[float], None]] = None,
+) -> dict:
+    """
+    Precompute the most similar books for every book in the recommendation model.
+
+    Similarities are computed as blocked sparse matrix products of the TF-IDF
+    matrix with itself, so memory stays bounded regardless of catalog size.
+    Each book's top-K neighbours are stored in one row of the similar_books
+    table.
+
+    Args:
+        db (Session): Database session.
+        top_k (int): Number of similar books to keep per book.
+        model_dir (Optional[str]): Root directory of the model artifacts.
+        progress (Optional[Callable[[float], None]]): Called with the fraction
+                                                      of the books done.
+
+    Returns:
+        dict: A message with the number of books processed.
+
+    Raises:
+        FileNotFoundError: If no recommendation model has been trained yet.
+    """
+    logger.info("Computing similar books")
+    progress = progress or (lambda fraction: None)
+    start = time.perf_counter()
+    model = get_recommendation_model(model_dir)
+    matrix, book_ids = model.active_matrix()
+    n_books = matrix.shape[0]
+    matrix_t = matrix.T.tocsr()
+    block_size = max(1, MAX_BLOCK_CELLS // max(n_books, 1))
+    top_k = min(top_k, n_books - 1)
+
+    for block_start in range(0, n_books, block_size):
+        block_stop = min(block_start + block_size, n_books)
+        scores = np.asarray((matrix[block_start:block_stop] @ matrix_t).todense())
+        # A book is not similar to itself
+        rows = np.arange(block_stop - block_start)
+        scores[rows, rows + block_start] = -np.inf
+
+        rows_to_save = []
+        for row, row_scores in enumerate(scores):
+            if top_k > 0:
+                top = np.argpartition(-row_scores, top_k - 1)[:top_k]
+                top = top[np.argsort(-row_scores[top], kind="stable")]
+            else:
+                top = np.zeros(0, dtype=np.int64)
+            rows_to_save.append(
+                {
+                    "book_id": int(book_ids[block_start + row]),
+                    "similar_book_ids": json.dumps([int(book_ids[i]) for i in top]),
+                    "scores": json.dumps([round(float(row_scores[i]), 6) for i in top]),
+                    "model_version": model.version,
+                }
+            )
+        _save_similar_books(db, rows_to_save)
+        progress(block_stop / n_books)
+        logger.debug(f"Similar books computed for rows {block_start}-{block_stop}")
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Similar books computed for {n_books} books in {elapsed:.1f}s")
+    return {"detail": "Similar books computed", "books": n_books}
+
+
+def _save_similar_books(db: Session, rows: list):
+    """
+    Replace the stored neighbours of a block of books in one transaction.
+
+    Args:
+        db (Session): Database session.
+        rows (list): The similar_books rows to store.
+    """
+    block_ids = [row["book_id"] for row in rows]
+    db.query(SimilarBooks).filter(SimilarBooks.book_id.in_(block_ids)).delete(
+        synchronize_session=False
+    )
+    db.bulk_insert_mappings(SimilarBooks, rows)
+    db.commit()
+
+
+def get_similar_books(db: Session, book_id: int):
+    """
+    Read the precomputed similar books of a book with one primary key lookup.
+
+    Args:
+        db (Session): Database session.
+        book_id (int): ID of the book.
+
+    Returns:
+        Tuple[list, list] | None: The similar book IDs and their scores, or None
+                                  if they have not been computed.
+    """
+    similar = db.get(SimilarBooks, book_id)
+    if similar is None:
+        return None
+    return json.loads(similar.similar_book_ids), json.loads(similar.scores)
@@ -0,0 +1,235 @@
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Callable, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import Book, Review
+
+from ..config import TRAINING_SNAPSHOT_BATCH_SIZE, TRAINING_SNAPSHOT_DIR
+
+# Set up logger
+logger = logging.getLogger("app.snapshot_service")
+
+# Snapshot kinds
+FULL = "full"
+INCREMENTAL = "incremental"
+
+MANIFESTS_DIR = "manifests"
+COMPRESSION = "zstd"
+
+# Exported tables: their columns and Arrow types
+TABLES = {
+    "books": (
+        Book,
+        pa.schema(
+            [
+                ("id", pa.int64()),
+                ("title", pa.string()),
+                ("author", pa.string()),
+                ("genre", pa.string()),
+                ("year_of_publication", pa.int32()),
+                ("summary", pa.string()),
+                ("content", pa.string()),
+                ("updated_at", pa.timestamp("us")),
+            ]
+        ),
+    ),
+    "reviews": (
+        Review,
+        pa.schema(
+            [
+                ("id", pa.int64()),
+                ("book_id", pa.int64()),
+                ("user_id", pa.int64()),
+                ("rating", pa.int32()),
+                ("review_text", pa.string()),
+                ("updated_at", pa.timestamp("us")),
+            ]
+        ),
+    ),
+}
+
+
+def _list_manifests(snapshot_dir: str) -> List[dict]:
+    manifests_dir = os.path.join(snapshot_dir, MANIFESTS_DIR)
+    if not os.path.isdir(manifests_dir):
+        return []
+    manifests = []
+    for name in sorted(os.listdir(manifests_dir)):
+        if name.endswith(".json"):
+            with open(os.path.join(manifests_dir, name)) as manifest_file:
+                manifests.append(json.load(manifest_file))
+    return manifests
+
+
+def latest_snapshot(snapshot_dir: Optional[str] = None) -> Optional[dict]:
+    """
+    Get the manifest of the most recent snapshot.
+
+    Args:
+        snapshot_dir (Optional[str]): Root directory of the snapshots.
+
+    Returns:
+        Optional[dict]: The manifest, or None if nothing has been exported.
+    """
+    manifests = _list_manifests(snapshot_dir or TRAINING_SNAPSHOT_DIR)
+    return manifests[-1] if manifests else None
+
+
+def _export_table(
+    db: Session,
+    name: str,
+    path: str,
+    since: Optional[datetime],
+    batch_size: int,
+    on_rows: Callable[[int], None],
+) -> int:
+    """
+    Stream the rows of a table into a Parquet file, one row group per batch.
+
+    Args:
+        db (Session): Database session.
+        name (str): The exported table, "books" or "reviews".
+        path (str): The Parquet file to write.
+        since (Optional[datetime]): Only export rows changed after this time.
+        batch_size (int): Number of rows per row group.
+        on_rows (Callable[[int], None]): Called with the rows of each batch.
+
+    Returns:
+        int: Number of rows exported.
+    """
+    model, schema = TABLES[name]
+    query = db.query(*(getattr(model, field.name) for field in schema)).order_by(
+        model.id
+    )
+    # Rows changed while a snapshot is written are exported again by the next
+    # incremental one; readers keep the latest copy of each row. Rows created
+    # before updated_at was tracked are only in full snapshots.
+    if since is not None:
+        query = query.filter(model.updated_at > since)
+
+    rows = 0
+    with pq.ParquetWriter(path, schema, compression=COMPRESSION) as writer:
+        batch = []
+        for row in query.yield_per(batch_size):
+            batch.append(row)
+            if len(batch) == batch_size:
+                writer.write_batch(_to_record_batch(batch, schema))
+                rows += len(batch)
+                on_rows(len(batch))
+                batch = []
+        if batch or not rows:
+            writer.write_batch(_to_record_batch(batch, schema))
+            rows += len(batch)
+            on_rows(len(batch))
+    return rows
+
+
+def _to_record_batch(rows: list, schema: pa.Schema) -> pa.RecordBatch:
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+def _prune_snapshots(snapshot_dir: str, keep_id: str):
+    # A full snapshot supersedes every earlier snapshot
+    for directory in list(TABLES) + [MANIFESTS_DIR]:
+        directory = os.path.join(snapshot_dir, directory)
+        for name in os.listdir(directory):
+            if name.split(".")[0] < keep_id:
+                os.remove(os.path.join(directory, name))
+
+
+def export_training_snapshot(
+    db: Session,
+    model_dir: Optional[str] = None,
+    progress: Optional[Callable[[float], None]] = None,
+    incremental: bool = False,
+    batch_size: Optional[int] = None,
+) -> dict:
+    """
+    Export books and reviews as a compressed Parquet training snapshot.
+
+    Rows are streamed from the database and written one row group per batch,
+    so memory is bounded by the batch size. Each snapshot writes
+    books/<id>.parquet, reviews/<id>.parquet and manifests/<id>.json. An
+    incremental snapshot only holds the rows changed since the previous
+    snapshot; deletions are only reflected by the next full snapshot, which
+    also removes the snapshots it supersedes. The books directory can be
+    passed to infra/ml/train.py as is.
+
+    Args:
+        db (Session): Database session.
+        model_dir (Optional[str]): Root directory of the snapshots.
+        progress (Optional[Callable[[float], None]]): Called with the exported
+                                                      fraction of the rows.
+        incremental (bool): Only export rows changed since the last snapshot.
+        batch_size (Optional[int]): Number of rows per row group.
+
+    Returns:
+        dict: The snapshot manifest.
+    """
+    snapshot_dir = model_dir or TRAINING_SNAPSHOT_DIR
+    progress = progress or (lambda fraction: None)
+    batch_size = batch_size or TRAINING_SNAPSHOT_BATCH_SIZE
+    for directory in list(TABLES) + [MANIFESTS_DIR]:
+        os.makedirs(os.path.join(snapshot_dir, directory), exist_ok=True)
+
+    previous = latest_snapshot(snapshot_dir)
+    since = None
+    if incremental and previous is not None:
+        since = datetime.fromisoformat(previous["until"])
+    until = datetime.utcnow()
+    snapshot_id = until.strftime("%Y%m%dT%H%M%S%f")
+    kind = FULL if since is None else INCREMENTAL
+
+    total = sum(db.query(func.count(model.id)).scalar() for model, _ in TABLES.values())
+    exported = 0
+
+    def on_rows(rows: int):
+        nonlocal exported
+        exported += rows
+        progress(min(exported / total, 1.0) if total else 1.0)
+
+    manifest = {
+        "id": snapshot_id,
+        "kind": kind,
+        "since": since.isoformat() if since else None,
+        "until": until.isoformat(),
+        "tables": {},
+    }
+    for name in TABLES:
+        path = os.path.join(snapshot_dir, name, f"{snapshot_id}.parquet")
+        staging_path = f"{path}.tmp"
+        rows = _export_table(db, name, staging_path, since, batch_size, on_rows)
+        os.replace(staging_path, path)
+        manifest["tables"][name] = {
+            "path": os.path.relpath(path, snapshot_dir),
+            "rows": rows,
+            "bytes": os.path.getsize(path),
+        }
+
+    # The manifest is written last, so only complete snapshots are listed
+    manifest_path = os.path.join(snapshot_dir, MANIFESTS_DIR, f"{snapshot_id}.json")
+    with open(f"{manifest_path}.tmp", "w") as manifest_file:
+        json.dump(manifest, manifest_file)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+    if kind == FULL:
+        _prune_snapshots(snapshot_dir, snapshot_id)
+
+    logger.info(
+        f"Exported {kind} training snapshot {snapshot_id}: "
+        + ", ".join(
+            f"{table['rows']} {name} ({table['bytes']} bytes)"
+            for name, table in manifest["tables"].items()
+        )
+    )
+    return manifest
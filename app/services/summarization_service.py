@@ -1,85 +1,588 @@
 import asyncio
+import heapq
+import itertools
 import logging
-from functools import partial
-from typing import List
+import math
+import multiprocessing
+import re
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
 
-from transformers import pipeline
+from sqlalchemy.orm import Session
+from transformers import AutoTokenizer, pipeline
+
+from ..config import (
+    SUMMARIZATION_BATCH_SIZE,
+    SUMMARIZATION_BATCH_WAIT_MS,
+    SUMMARIZATION_CHUNK_TOKENS,
+    SUMMARIZATION_MAX_QUEUE,
+    SUMMARIZATION_MODEL,
+    SUMMARIZATION_WORKERS,
+)
+from .summary_cache_service import (
+    get_cached_summaries,
+    store_summaries,
+    summary_cache_key,
+)
 
 # Set up logger
 logger = logging.getLogger("app.summarization_service")
 
 # Initialize the summarization pipeline using a smaller model
 summarizer = None
+_summarizer_lock = threading.Lock()
+tokenizer = None
+
+# Generation settings shared by every summary
+MAX_LENGTH = 150
+MIN_LENGTH = 40
+GENERATION_PARAMS = {
+    "max_length": MAX_LENGTH,
+    "min_length": MIN_LENGTH,
+    "do_sample": False,
+    "truncation": True,
+}
+
+# Prompts of the chunks of a book, and of the summaries of its chunks
+CONTENT_CONTEXT = "Summarize the following book content:"
+REDUCE_CONTEXT = "Summarize the following summaries of parts of a book:"
+REVIEWS_CONTEXT = (
+    "Summarize the following book reviews: It is in the format "
+    "User Review: some_review_text || User Rating: number_out_of_5"
+)
+REVIEWS_REDUCE_CONTEXT = "Summarize the following summaries of book reviews:"
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# Request priorities; lower values are summarized first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+
+class SummarizationBusyError(Exception):
+    """
+    Raised when the summarization queue is full.
+
+    Attributes:
+        retry_after (int): Seconds after which the request may be retried.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Summarization queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
 
 
 def get_summarizer():
     """
-    Initialize the summarization pipeline using a specified model.
+    Get the summarization pipeline, loading the model on first use.
 
     Returns:
         transformers.pipeline: A pipeline object for text summarization.
     """
-    logger.info("Initializing summarizer model")
-    return pipeline("summarization", model="t5-small")
+    global summarizer
+    if summarizer is None:
+        with _summarizer_lock:
+            if summarizer is None:
+                logger.info("Initializing summarizer model")
+                summarizer = pipeline("summarization", model=SUMMARIZATION_MODEL)
+    return summarizer
+
+
+def get_tokenizer():
+    """
+    Get the tokenizer of the summarization model, loading it on first use.
+
+    Only the tokenizer is loaded in the API process, to split long content.
+
+    Returns:
+        transformers.PreTrainedTokenizer: The tokenizer.
+    """
+    global tokenizer
+    if tokenizer is None:
+        with _summarizer_lock:
+            if tokenizer is None:
+                tokenizer = AutoTokenizer.from_pretrained(SUMMARIZATION_MODEL)
+    return tokenizer
+
+
+def _token_counts(texts: List[str]) -> List[int]:
+    if not texts:
+        return []
+    input_ids = get_tokenizer()(texts, add_special_tokens=False)["input_ids"]
+    return [len(ids) for ids in input_ids]
+
+
+def chunk_pieces(pieces: List[str], max_tokens: int) -> List[str]:
+    """
+    Pack consecutive pieces of text into chunks of at most max_tokens tokens.
+
+    Chunks end between pieces where possible; a piece longer than max_tokens is
+    split between words. The chunks are balanced, so the last one is not a
+    short remainder.
+
+    Args:
+        pieces (List[str]): The pieces to pack, such as sentences or reviews.
+        max_tokens (int): Upper bound on the tokens of a chunk.
+
+    Returns:
+        List[str]: The chunks, in order.
+    """
+    packed, counts = [], []
+    pieces = [piece for piece in pieces if piece]
+    for piece, count in zip(pieces, _token_counts(pieces)):
+        if count <= max_tokens:
+            packed.append(piece)
+            counts.append(count)
+        else:
+            words = piece.split()
+            packed.extend(words)
+            counts.extend(_token_counts(words))
+
+    total = sum(counts)
+    if total <= max_tokens:
+        return [" ".join(packed)] if packed else []
+    target = math.ceil(total / math.ceil(total / max_tokens))
+    chunks, chunk, size = [], [], 0
+    for piece, count in zip(packed, counts):
+        if chunk and (size >= target or size + count > max_tokens):
+            chunks.append(" ".join(chunk))
+            chunk, size = [], 0
+        chunk.append(piece)
+        size += count
+    chunks.append(" ".join(chunk))
+    return chunks
+
+
+def _init_summarization_worker():
+    # Load the model once per worker instead of on its first batch
+    try:
+        get_summarizer()
+    except Exception as e:
+        logger.error(f"Error loading the summarizer model: {e}")
+
+
+def _summarize_batch(texts: List[str]) -> List[str]:
+    """
+    Summarize a batch of texts as one padded pipeline call.
+
+    Args:
+        texts (List[str]): The texts to summarize.
+
+    Returns:
+        List[str]: The summary of each text.
+    """
+    summaries = get_summarizer()(texts, batch_size=len(texts), **GENERATION_PARAMS)
+    return [summary["summary_text"] for summary in summaries]
+
+
+class SummarizationBatcher:
+    """
+    Schedule summarization requests onto a dedicated pool of model workers.
+
+    Requests wait in a bounded priority queue, so interactive requests are
+    summarized before background ones. Whenever a worker is free, a background
+    thread waits up to max_wait_seconds after the first queued request for
+    others to arrive, then sends up to max_batch_size texts to the worker as
+    one batch and resolves each caller's future with its own summary.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int,
+        max_wait_seconds: float,
+        workers: int = 1,
+        max_queue: int = 64,
+        executor: Optional[Executor] = None,
+    ):
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._condition = threading.Condition()
+        self._queue: List[Tuple[int, int, str, Future]] = []
+        self._sequence = itertools.count()
+        self._idle_workers = workers
+        # Moving average of the batch duration, used to estimate Retry-After
+        self._batch_seconds = 1.0
+        self._thread = threading.Thread(
+            target=self._run, name="summarization-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def _new_executor(self) -> Executor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_summarization_worker,
+        )
+
+    def retry_after(self) -> int:
+        """
+        Estimate how long the queued requests take to drain.
+
+        Returns:
+            int: The estimate in whole seconds, at least 1.
+        """
+        batches = math.ceil(len(self._queue) / (self.max_batch_size * self.workers))
+        return max(1, math.ceil(batches * self._batch_seconds))
+
+    def submit(self, text: str, priority: int = INTERACTIVE) -> Future:
+        """
+        Queue a text to summarize.
+
+        Args:
+            text (str): The text to summarize.
+            priority (int): INTERACTIVE or BACKGROUND.
+
+        Returns:
+            Future: Resolved with the summary.
+
+        Raises:
+            SummarizationBusyError: If the queue is full.
+        """
+        return self.submit_many([text], priority)[0]
+
+    def submit_many(
+        self, texts: List[str], priority: int = INTERACTIVE
+    ) -> List[Future]:
+        """
+        Queue the texts of one request, such as the chunks of a long book.
+
+        The request is admitted as a whole if all its texts fit in the queue,
+        so its texts can be summarized in parallel batches.
+
+        Args:
+            texts (List[str]): The texts to summarize.
+            priority (int): INTERACTIVE or BACKGROUND.
+
+        Returns:
+            List[Future]: Resolved with the summary of each text.
+
+        Raises:
+            SummarizationBusyError: If the texts do not fit in the queue.
+        """
+        futures = [Future() for _ in texts]
+        with self._condition:
+            if len(self._queue) + len(texts) > self.max_queue:
+                raise SummarizationBusyError(self.retry_after())
+            for text, future in zip(texts, futures):
+                heapq.heappush(
+                    self._queue, (priority, next(self._sequence), text, future)
+                )
+            self._condition.notify()
+        return futures
+
+    def _next_batch(self) -> List[Tuple[str, Future]]:
+        with self._condition:
+            while not self._queue or not self._idle_workers:
+                self._condition.wait()
+            flush_at = time.monotonic() + self.max_wait_seconds
+            while len(self._queue) < self.max_batch_size:
+                remaining = flush_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = []
+            while self._queue and len(batch) < self.max_batch_size:
+                _, _, text, future = heapq.heappop(self._queue)
+                if future.set_running_or_notify_cancel():
+                    batch.append((text, future))
+            if batch:
+                self._idle_workers -= 1
+            return batch
+
+    def _dispatch(self, texts: List[str]) -> Future:
+        if self._executor is None:
+            self._executor = self._new_executor()
+        try:
+            return self._executor.submit(_summarize_batch, texts)
+        except BrokenProcessPool:
+            if not self._owns_executor:
+                raise
+            # A crashed worker breaks the whole pool; start a new one
+            logger.warning("Summarization workers crashed, restarting the pool")
+            self._executor.shutdown(wait=False)
+            self._executor = self._new_executor()
+            return self._executor.submit(_summarize_batch, texts)
+
+    def _complete(self, batch: List[Tuple[str, Future]], started: float, result):
+        with self._condition:
+            self._idle_workers += 1
+            self._batch_seconds = 0.8 * self._batch_seconds + 0.2 * (
+                time.monotonic() - started
+            )
+            self._condition.notify()
+        try:
+            summaries = result.result()
+        except Exception as e:
+            logger.error(f"Error summarizing a batch of {len(batch)} texts: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        logger.debug(f"Summarized a batch of {len(batch)} texts")
+        for (_, future), summary in zip(batch, summaries):
+            future.set_result(summary)
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                continue
+            started = time.monotonic()
+            try:
+                result = self._dispatch([text for text, _ in batch])
+            except Exception as e:
+                result = Future()
+                result.set_exception(e)
+            result.add_done_callback(
+                lambda result, batch=batch, started=started: self._complete(
+                    batch, started, result
+                )
+            )
+
+
+_batcher_lock = threading.Lock()
+_batcher = None
+
+
+def get_summarization_batcher() -> SummarizationBatcher:
+    """
+    Get the process-wide summarization batcher, starting it on first use.
+
+    Returns:
+        SummarizationBatcher: The batcher.
+    """
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = SummarizationBatcher(
+                    SUMMARIZATION_BATCH_SIZE,
+                    SUMMARIZATION_BATCH_WAIT_MS / 1000,
+                    workers=SUMMARIZATION_WORKERS,
+                    max_queue=SUMMARIZATION_MAX_QUEUE,
+                )
+    return _batcher
+
+
+def _cache_key(prompt: str, text: str, **params) -> str:
+    return summary_cache_key(
+        SUMMARIZATION_MODEL, {**GENERATION_PARAMS, **params}, prompt, text
+    )
+
+
+async def _generate(
+    prompt: str, texts: Dict[str, str], priority: int, db: Optional[Session]
+) -> Dict[str, str]:
+    """
+    Summarize texts on the batcher and store their summaries in the cache.
+
+    Texts are queued a round of batches at a time, so a long book does not
+    take over the queue. Each round is stored as it completes, so a request
+    rejected part way resumes where it stopped.
+
+    Args:
+        prompt (str): The prompt added before each text.
+        texts (Dict[str, str]): The texts to summarize, keyed by cache key.
+        priority (int): INTERACTIVE or BACKGROUND.
+        db (Optional[Session]): Database session, or None to skip the cache.
+
+    Returns:
+        Dict[str, str]: The summary of each text, keyed by cache key.
+    """
+    batcher = get_summarization_batcher()
+    window = max(1, min(batcher.max_queue, batcher.max_batch_size * batcher.workers))
+    pending = list(texts.items())
+    generated = {}
+    for start in range(0, len(pending), window):
+        stop = start + window
+        # Add context to indicate what kind of text is summarized
+        futures = batcher.submit_many(
+            [f"{prompt} {text}" for _, text in pending[start:stop]], priority
+        )
+        summaries = dict(
+            zip(
+                [key for key, _ in pending[start:stop]],
+                await asyncio.gather(*(asyncio.wrap_future(f) for f in futures)),
+            )
+        )
+        if db is not None:
+            await asyncio.to_thread(store_summaries, db, summaries, SUMMARIZATION_MODEL)
+        generated.update(summaries)
+    return generated
+
+
+async def _summarize_all(
+    prompt: str, texts: List[str], priority: int, db: Optional[Session]
+) -> List[str]:
+    """
+    Summarize texts with a prompt, looking every one up in the cache first.
+
+    Args:
+        prompt (str): The prompt added before each text.
+        texts (List[str]): The texts to summarize.
+        priority (int): INTERACTIVE or BACKGROUND.
+        db (Optional[Session]): Database session, or None to skip the cache.
+
+    Returns:
+        List[str]: The summary of each text.
+    """
+    keys = [_cache_key(prompt, text) for text in texts]
+    # The cache is read and written in a thread, off the event loop
+    summaries = {}
+    if db is not None:
+        summaries = await asyncio.to_thread(get_cached_summaries, db, keys)
+    # Duplicate texts are summarized once
+    missing = {key: text for key, text in zip(keys, texts) if key not in summaries}
+    if missing:
+        summaries.update(await _generate(prompt, missing, priority, db))
+    logger.debug(f"Summarized {len(texts)} texts, {len(missing)} not cached")
+    return [summaries[key] for key in keys]
+
+
+def _chunk(context: str, pieces: List[str]) -> List[str]:
+    # Loads the tokenizer and tokenizes every piece, so it runs off the event
+    # loop. Tokens left for the text once the prompt and end token are added
+    budget = SUMMARIZATION_CHUNK_TOKENS - _token_counts([context])[0] - 1
+    return chunk_pieces(pieces, budget)
+
+
+async def _map(
+    context: str, pieces: List[str], priority: int, db: Optional[Session]
+) -> List[str]:
+    # Summarize the pieces in chunks that fit the model window
+    chunks = await asyncio.to_thread(_chunk, context, pieces)
+    return await _summarize_all(context, chunks or [""], priority, db)
+
+
+async def _reduce(
+    context: str, summaries: List[str], priority: int, db: Optional[Session]
+) -> Tuple[str, int]:
+    """
+    Summarize summaries again, in as many rounds as needed, into one summary.
+
+    Args:
+        context (str): The prompt of the reduce passes.
+        summaries (List[str]): The summaries, in order.
+        priority (int): INTERACTIVE or BACKGROUND.
+        db (Optional[Session]): Database session, or None to skip the cache.
+
+    Returns:
+        Tuple[str, int]: The summary and the number of reduce rounds.
+    """
+    rounds = 0
+    while len(summaries) > 1:
+        chunks = await asyncio.to_thread(_chunk, context, summaries)
+        if len(chunks) >= len(summaries):
+            # The window is too small to reduce further; the last pass
+            # summarizes what fits in it
+            chunks = [" ".join(summaries)]
+        summaries = await _summarize_all(context, chunks, priority, db)
+        rounds += 1
+    return summaries[0], rounds
 
 
-async def generate_summary_for_content(content: str) -> str:
+async def generate_summary_for_content(
+    content: str, priority: int = INTERACTIVE, db: Optional[Session] = None
+) -> str:
     """
     Generate a summary for the book content with added context.
 
+    Content longer than the model's input window is split into token-aware
+    chunks that are summarized in parallel batches; the chunk summaries are
+    then summarized again, in as many rounds as needed, into one summary of
+    the whole book. With a database session, the summary of the content and
+    of every chunk is looked up in the summary cache before any inference.
+
     Args:
         content (str): The content of the book to be summarized.
+        priority (int): INTERACTIVE or BACKGROUND.
+        db (Optional[Session]): Database session, or None to skip the cache.
 
     Returns:
         str: The generated summary of the book content.
+
+    Raises:
+        SummarizationBusyError: If the summarization queue is full.
     """
     logger.info("Generating summary for book content")
-    summarizer = get_summarizer()
 
-    # Add context to indicate that this is a book content summary
-    context = "Summarize the following book content:"
-    input_text = f"{context} {content}"
+    # The whole-book summary also depends on how the content is split
+    content_key = _cache_key(
+        CONTENT_CONTEXT,
+        content,
+        chunk_tokens=SUMMARIZATION_CHUNK_TOKENS,
+        reduce_prompt=REDUCE_CONTEXT,
+    )
+    if db is not None:
+        cached = await asyncio.to_thread(get_cached_summaries, db, [content_key])
+        if cached:
+            logger.info("Summary for content found in the cache")
+            return cached[content_key]
 
-    loop = asyncio.get_event_loop()
     try:
-        summary = await loop.run_in_executor(
-            None,
-            partial(
-                summarizer, input_text, max_length=150, min_length=40, do_sample=False
-            ),
-        )
-        logger.info("Summary generation for content successful")
-        return summary[0]["summary_text"]
+        # Chunks of the content end on sentence boundaries where possible
+        sentences = await asyncio.to_thread(SENTENCE_END.split, content)
+        summaries = await _map(CONTENT_CONTEXT, sentences, priority, db)
+        summary, rounds = await _reduce(REDUCE_CONTEXT, summaries, priority, db)
+        logger.info(f"Summary generation for content successful in {rounds + 1} rounds")
+    except SummarizationBusyError:
+        logger.warning("Summarization queue is full")
+        raise
     except Exception as e:
         logger.error(f"Error generating summary for content: {e}")
         raise
 
+    if db is not None:
+        await asyncio.to_thread(
+            store_summaries, db, {content_key: summary}, SUMMARIZATION_MODEL
+        )
+    return summary
+
 
-def generate_summary_for_reviews(reviews: List[str]) -> str:
+async def generate_summary_for_reviews(
+    reviews: List[str],
+    priority: int = INTERACTIVE,
+    db: Optional[Session] = None,
+    previous_summary: Optional[str] = None,
+) -> str:
     """
     Generate a summary for a list of reviews with added context.
 
+    Reviews are summarized in chunks that fit the model window, and the chunk
+    summaries are reduced into one. Given the summary of earlier reviews, only
+    the new reviews are summarized and then folded into it, so the cost of an
+    update is proportional to the new reviews.
+
     Args:
         reviews (List[str]): A list of review texts to be summarized.
+        priority (int): INTERACTIVE or BACKGROUND.
+        db (Optional[Session]): Database session, or None to skip the cache.
+        previous_summary (Optional[str]): The summary of earlier reviews.
 
     Returns:
         str: The generated summary of the reviews.
-    """
-    logger.info("Generating summary for reviews")
-    summarizer = get_summarizer()
 
-    # Combine reviews into one text and add context
-    combined_reviews = " ".join(reviews)
-    context = (
-        "Summarize the following book reviews: It is in the format "
-        "User Review: some_review_text || User Rating: number_out_of_5"
-    )
-    input_text = f"{context} {combined_reviews}"
+    Raises:
+        SummarizationBusyError: If the summarization queue is full.
+    """
+    logger.info(f"Generating summary for {len(reviews)} reviews")
 
     try:
-        summary = summarizer(input_text, max_length=150, min_length=40, do_sample=False)
+        summaries = await _map(REVIEWS_CONTEXT, reviews, priority, db)
+        if previous_summary:
+            summaries = [previous_summary] + summaries
+        summary, _ = await _reduce(REVIEWS_REDUCE_CONTEXT, summaries, priority, db)
         logger.info("Summary generation for reviews successful")
-        return summary[0]["summary_text"]
+        return summary
+    except SummarizationBusyError:
+        logger.warning("Summarization queue is full")
+        raise
     except Exception as e:
         logger.error(f"Error generating summary for reviews: {e}")
         raise
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import SummaryCache
+
+# Set up logger
+logger = logging.getLogger("app.summary_cache_service")
+
+
+def summary_cache_key(model: str, params: dict, prompt: str, text: str) -> str:
+    """
+    Build the cache key of a summary.
+
+    Args:
+        model (str): The summarization model.
+        params (dict): The generation parameters.
+        prompt (str): The prompt the text is summarized with.
+        text (str): The summarized text.
+
+    Returns:
+        str: A SHA-256 hex digest of all the inputs.
+    """
+    payload = json.dumps([model, params, prompt, text], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_cached_summaries(db: Session, keys: Iterable[str]) -> Dict[str, str]:
+    """
+    Look up cached summaries.
+
+    Args:
+        db (Session): Database session.
+        keys (Iterable[str]): The cache keys.
+
+    Returns:
+        Dict[str, str]: The summary of every key found.
+    """
+    keys = list(set(keys))
+    if not keys:
+        return {}
+    rows = (
+        db.query(SummaryCache.key, SummaryCache.summary)
+        .filter(SummaryCache.key.in_(keys))
+        .all()
+    )
+    return dict(rows)
+
+
+def _insert(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        # The database has no INSERT ... ON CONFLICT
+        return None
+    return dialect_insert(SummaryCache)
+
+
+def _insert_portably(db: Session, rows: List[dict]):
+    """
+    Insert the rows whose key is not stored yet, with plain statements.
+
+    A row a concurrent writer stored first is skipped.
+
+    Args:
+        db (Session): Database session.
+        rows (List[dict]): The cache rows.
+    """
+    stored = set(get_cached_summaries(db, [row["key"] for row in rows]))
+    for row in rows:
+        if row["key"] in stored:
+            continue
+        try:
+            with db.begin_nested():
+                db.execute(insert(SummaryCache).values(**row))
+        except IntegrityError:
+            pass
+
+
+def store_summaries(db: Session, summaries: Dict[str, str], model: str):
+    """
+    Store generated summaries, keeping any already stored under the same key.
+
+    Args:
+        db (Session): Database session.
+        summaries (Dict[str, str]): The summary of each cache key.
+        model (str): The summarization model that generated them.
+    """
+    if not summaries:
+        return
+    created_at = datetime.utcnow()
+    rows = [
+        {"key": key, "summary": summary, "model": model, "created_at": created_at}
+        for key, summary in summaries.items()
+    ]
+    statement = _insert(db)
+    if statement is None:
+        _insert_portably(db, rows)
+    else:
+        db.execute(
+            statement.values(rows).on_conflict_do_nothing(
+                index_elements=[SummaryCache.key]
+            )
+        )
+    db.commit()
+    logger.debug(f"Cached {len(summaries)} summaries")
@@ -0,0 +1,318 @@
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import Book
+
+from ..config import (
+    RECOMMENDATION_TRAINING_BATCH_SIZE,
+    RECOMMENDATION_TRAINING_WORKERS,
+)
+from .model_store_service import ModelWriter, overlay_removed_ids
+
+# Set up logger
+logger = logging.getLogger("app.training_service")
+
+# Columns a book is represented by in the recommendation model
+BOOK_TEXT_COLUMNS = (Book.id, Book.genre, Book.author, Book.summary, Book.content)
+# Settings of the TF-IDF vectorizer of the recommendation model
+TFIDF_PARAMS = {"stop_words": "english"}
+
+
+def book_text(book) -> str:
+    """
+    Build the text a book is represented by in the recommendation model.
+
+    Args:
+        book (Book): The book, or a row with its text columns.
+
+    Returns:
+        str: The book's genre, author, summary and content.
+    """
+    return f"{book.genre} {book.author} {book.summary} {book.content}"
+
+
+def iter_book_batches(
+    db: Session, batch_size: int, max_book_id: Optional[int] = None
+) -> Iterator[Tuple[List[int], List[str]]]:
+    """
+    Stream the text of every book in ID order, one batch at a time.
+
+    Only the text columns are loaded, through a server-side cursor where the
+    database supports one, so memory is bounded by the batch size.
+
+    Args:
+        db (Session): Database session.
+        batch_size (int): Number of books per batch.
+        max_book_id (Optional[int]): Skip books with a higher ID.
+
+    Yields:
+        Tuple[List[int], List[str]]: The book IDs and texts of each batch.
+    """
+    query = db.query(*BOOK_TEXT_COLUMNS).order_by(Book.id)
+    if max_book_id is not None:
+        query = query.filter(Book.id <= max_book_id)
+    book_ids, texts = [], []
+    for row in query.yield_per(batch_size):
+        book_ids.append(row.id)
+        texts.append(book_text(row))
+        if len(book_ids) == batch_size:
+            yield book_ids, texts
+            book_ids, texts = [], []
+    if book_ids:
+        yield book_ids, texts
+
+
+def build_vectorizer(
+    document_frequencies: Dict[str, int], n_documents: int, **params
+) -> TfidfVectorizer:
+    """
+    Build a fitted TF-IDF vectorizer from document frequencies.
+
+    The vocabulary is sorted and the IDF weights are smoothed the way
+    TfidfVectorizer.fit does, so the result matches a single in-memory fit.
+
+    Args:
+        document_frequencies (Dict[str, int]): Number of documents each term
+                                               appears in.
+        n_documents (int): Number of documents counted.
+        **params: Vectorizer settings.
+
+    Returns:
+        TfidfVectorizer: The fitted vectorizer.
+    """
+    terms = sorted(document_frequencies)
+    vectorizer = TfidfVectorizer(
+        vocabulary={term: index for index, term in enumerate(terms)}, **params
+    )
+    df = np.fromiter(
+        (document_frequencies[term] for term in terms),
+        dtype=np.float64,
+        count=len(terms),
+    )
+    smoothing = int(vectorizer.smooth_idf)
+    vectorizer.idf_ = np.log((n_documents + smoothing) / (df + smoothing)) + 1
+    return vectorizer
+
+
+def count_document_frequencies(texts: List[str], params: dict) -> Dict[str, int]:
+    """
+    Count the documents each term of a shard appears in.
+
+    Args:
+        texts (List[str]): The documents of the shard.
+        params (dict): Vectorizer settings.
+
+    Returns:
+        Dict[str, int]: The partial document frequencies.
+    """
+    analyzer = TfidfVectorizer(**params).build_analyzer()
+    document_frequencies: Dict[str, int] = {}
+    for text in texts:
+        for term in set(analyzer(text)):
+            document_frequencies[term] = document_frequencies.get(term, 0) + 1
+    return document_frequencies
+
+
+# Vectorizer of a pool worker, set once per worker by init_vectorizer_worker
+_worker_vectorizer: Optional[TfidfVectorizer] = None
+
+
+def init_vectorizer_worker(vectorizer: TfidfVectorizer):
+    global _worker_vectorizer
+    _worker_vectorizer = vectorizer
+
+
+def vectorize(texts: List[str]):
+    return _worker_vectorizer.transform(texts)
+
+
+def ordered_map(
+    function: Callable,
+    batches: Iterator[Tuple[List[int], List[str]]],
+    pool: Optional[ProcessPoolExecutor],
+    max_pending: int,
+):
+    """
+    Apply a function to the texts of each batch, in order.
+
+    With a pool, up to max_pending batches are processed in parallel, which
+    keeps memory bounded while every worker stays busy.
+
+    Args:
+        function (Callable): Function applied to the texts of a batch.
+        batches (Iterator[Tuple[List[int], List[str]]]): Book IDs and texts.
+        pool (Optional[ProcessPoolExecutor]): Worker pool, or None to run inline.
+        max_pending (int): Upper bound on the batches in flight.
+
+    Yields:
+        tuple: The book IDs of each batch and the function's result.
+    """
+    if pool is None:
+        for book_ids, texts in batches:
+            yield book_ids, function(texts)
+        return
+    pending = deque()
+    for book_ids, texts in batches:
+        pending.append((book_ids, pool.submit(function, texts)))
+        if len(pending) >= max_pending:
+            book_ids, future = pending.popleft()
+            yield book_ids, future.result()
+    while pending:
+        book_ids, future = pending.popleft()
+        yield book_ids, future.result()
+
+
+@contextmanager
+def worker_pool(workers: int, **kwargs):
+    if workers <= 1:
+        yield None
+        return
+    # Workers are spawned so they never inherit the server's threads or sockets
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"), **kwargs
+    ) as pool:
+        yield pool
+
+
+def train_tfidf_model(
+    db: Session,
+    model_dir: Optional[str] = None,
+    progress: Optional[Callable[[float], None]] = None,
+    batch_size: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> dict:
+    """
+    Train the TF-IDF recommendation model in two streaming passes over the books.
+
+    The first pass counts document frequencies to build the vocabulary and IDF
+    weights; the second vectorizes each batch and appends its rows to the
+    model files. Peak memory depends on the batch size and the vocabulary,
+    not on the size of the catalog.
+
+    Batches are tokenized and vectorized on a pool of worker processes while
+    the main process streams books and merges the partial results, so both
+    passes scale with the number of cores.
+
+    Books added, updated or deleted while training runs are applied to the
+    current version's overlay, and carried over to the new version's overlay
+    when it is activated.
+
+    Args:
+        db (Session): Database session.
+        model_dir (Optional[str]): Root directory of the model artifacts.
+        progress (Optional[Callable[[float], None]]): Called with the completed
+                                                      fraction of the training.
+        batch_size (Optional[int]): Number of books per batch.
+        workers (Optional[int]): Number of worker processes.
+
+    Returns:
+        dict: The model version, its size and the duration of each stage.
+
+    Raises:
+        ValueError: If there are no books to train on.
+    """
+    progress = progress or (lambda fraction: None)
+    batch_size = batch_size or RECOMMENDATION_TRAINING_BATCH_SIZE
+    n_books, max_book_id = db.query(func.count(Book.id), func.max(Book.id)).one()
+    if not n_books:
+        logger.error("No books found for training the model")
+        raise ValueError("No books found for training the model")
+
+    workers = workers or RECOMMENDATION_TRAINING_WORKERS or os.cpu_count() or 1
+    # Starting workers is only worth it when every worker gets a batch
+    workers = min(workers, -(-n_books // batch_size))
+    max_pending = 2 * workers
+    timings = {}
+
+    # Pass 1: document frequencies. Books changed from this point on are also
+    # applied to the current version's overlay, and carried over on commit.
+    training_started = datetime.utcnow()
+    removed_before = overlay_removed_ids(model_dir)
+    start = time.perf_counter()
+    document_frequencies: Dict[str, int] = {}
+    n_documents = 0
+    with worker_pool(workers) as pool:
+        counts = ordered_map(
+            partial(count_document_frequencies, params=TFIDF_PARAMS),
+            iter_book_batches(db, batch_size, max_book_id),
+            pool,
+            max_pending,
+        )
+        for book_ids, partial_frequencies in counts:
+            for term, count in partial_frequencies.items():
+                document_frequencies[term] = document_frequencies.get(term, 0) + count
+            n_documents += len(book_ids)
+            progress(0.4 * n_documents / n_books)
+    vectorizer = build_vectorizer(document_frequencies, n_documents, **TFIDF_PARAMS)
+    n_terms = len(document_frequencies)
+    del document_frequencies
+    timings["count_seconds"] = time.perf_counter() - start
+    logger.info(
+        f"Counted {n_terms} terms in {n_documents} books "
+        f"in {timings['count_seconds']:.1f}s on {workers} workers"
+    )
+
+    # Pass 2: vectorize each batch and append it to the model files
+    start = time.perf_counter()
+    with ModelWriter(vectorizer, model_dir) as writer:
+        init_vectorizer_worker(vectorizer)
+        with worker_pool(
+            workers, initializer=init_vectorizer_worker, initargs=(vectorizer,)
+        ) as pool:
+            rows = ordered_map(
+                vectorize,
+                iter_book_batches(db, batch_size, max_book_id),
+                pool,
+                max_pending,
+            )
+            for book_ids, matrix in rows:
+                writer.append(matrix, book_ids)
+                progress(0.4 + 0.5 * writer.n_rows / n_books)
+        timings["vectorize_seconds"] = time.perf_counter() - start
+        logger.info(
+            f"Vectorized {writer.n_rows} books "
+            f"in {timings['vectorize_seconds']:.1f}s on {workers} workers"
+        )
+
+        def changes_during_training():
+            rows = (
+                db.query(*BOOK_TEXT_COLUMNS)
+                .filter((Book.id > max_book_id) | (Book.updated_at >= training_started))
+                .all()
+            )
+            removed = np.setdiff1d(overlay_removed_ids(model_dir), removed_before)
+            existing = {
+                book_id
+                for (book_id,) in db.query(Book.id).filter(
+                    Book.id.in_(removed.tolist())
+                )
+            }
+            return (
+                {row.id: book_text(row) for row in rows},
+                [int(book_id) for book_id in removed if book_id not in existing],
+            )
+
+        start = time.perf_counter()
+        version = writer.commit(changes_during_training)
+        timings["commit_seconds"] = time.perf_counter() - start
+    progress(1.0)
+    return {
+        "version": version,
+        "books": n_documents,
+        "terms": n_terms,
+        "workers": workers,
+        "timings": {stage: round(seconds, 3) for stage, seconds in timings.items()},
+    }
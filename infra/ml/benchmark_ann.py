@@ -0,0 +1,178 @@
+import argparse
+import logging
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+
+from app.services.ann_index_service import BruteForceIndex, LSHIndex
+from app.services.model_store_service import RecommendationModel
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def generate_catalog(n_books, n_features=100000, n_topics=200, terms_per_book=40):
+    """
+    Generate a synthetic, L2-normalized TF-IDF matrix with topical structure.
+
+    Each book draws its terms from the term pool of one topic with a skewed
+    distribution, so books of a topic share vocabulary the way books of a
+    genre or author do.
+
+    Args:
+        n_books (int): Number of books to generate.
+        n_features (int): Vocabulary size.
+        n_topics (int): Number of topics.
+        terms_per_book (int): Term draws per book.
+
+    Returns:
+        tuple: The catalog matrix, the term pool of each topic and the topic
+               of each book.
+    """
+    rng = np.random.default_rng(42)
+    pools = rng.integers(0, n_features, size=(n_topics, 2000))
+    topics = rng.integers(0, n_topics, size=n_books)
+    ranks = (2000 * rng.random((n_books, terms_per_book)) ** 3).astype(np.int64)
+    terms = pools[topics[:, None], ranks]
+    rows = np.repeat(np.arange(n_books), terms_per_book)
+    values = rng.random(n_books * terms_per_book).astype(np.float32)
+    matrix = sp.csr_matrix(
+        (values, (rows, terms.ravel())), shape=(n_books, n_features), dtype=np.float32
+    )
+    return normalize(matrix), pools, topics
+
+
+def generate_queries(pools, n_queries, n_features, terms_per_query=6):
+    """
+    Generate short preference-like queries from the topics' most common terms.
+
+    Args:
+        pools (np.ndarray): Term pool of each topic.
+        n_queries (int): Number of queries to generate.
+        n_features (int): Vocabulary size.
+        terms_per_query (int): Terms per query.
+
+    Returns:
+        scipy.sparse.csr_matrix: One normalized query per row.
+    """
+    rng = np.random.default_rng(7)
+    topics = rng.integers(0, len(pools), size=n_queries)
+    ranks = rng.integers(0, 50, size=(n_queries, terms_per_query))
+    terms = pools[topics[:, None], ranks]
+    rows = np.repeat(np.arange(n_queries), terms_per_query)
+    values = np.ones(n_queries * terms_per_query)
+    queries = sp.csr_matrix(
+        (values, (rows, terms.ravel())), shape=(n_queries, n_features)
+    )
+    return normalize(queries)
+
+
+def run_queries(model, queries, k):
+    """
+    Run each query separately and record its latency.
+
+    Args:
+        model (RecommendationModel): The model to query.
+        queries (scipy.sparse.csr_matrix): One query per row.
+        k (int): Number of books to return per query.
+
+    Returns:
+        tuple: The result book IDs of each query and the latencies in ms.
+    """
+    results, latencies = [], []
+    for row in range(queries.shape[0]):
+        query = queries[row]
+        start = time.perf_counter()
+        book_ids, _ = model.search(query, k)[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(book_ids)
+    return results, np.array(latencies)
+
+
+def benchmark(n_books, n_queries, k, n_tables, n_bits, n_probes, max_candidates):
+    """
+    Compare recall@k and latency of LSH against exact search for one catalog.
+
+    Args:
+        n_books (int): Number of books in the catalog.
+        n_queries (int): Number of queries to run.
+        k (int): Number of books to return per query.
+        n_tables (int): LSH tables.
+        n_bits (int): LSH bits per table.
+        n_probes (int): Extra LSH buckets probed per table.
+        max_candidates (int): Upper bound on the books scored per LSH query.
+
+    Returns:
+        dict: The benchmark results.
+    """
+    logger.info(f"Generating catalog of {n_books} books...")
+    matrix, pools, _ = generate_catalog(n_books)
+    queries = generate_queries(pools, n_queries, matrix.shape[1])
+    book_ids = np.arange(n_books, dtype=np.int64)
+
+    exact = RecommendationModel(
+        "exact", None, matrix, book_ids, index=BruteForceIndex()
+    )
+    exact_results, exact_latencies = run_queries(exact, queries, k)
+
+    start = time.perf_counter()
+    index = LSHIndex.build(
+        matrix,
+        n_tables=n_tables,
+        n_bits=n_bits,
+        n_probes=n_probes,
+        max_candidates=max_candidates,
+    )
+    build_seconds = time.perf_counter() - start
+    approximate = RecommendationModel("lsh", None, matrix, book_ids, index=index)
+    lsh_results, lsh_latencies = run_queries(approximate, queries, k)
+
+    recall = np.mean(
+        [
+            len(set(found) & set(expected)) / max(len(expected), 1)
+            for found, expected in zip(lsh_results, exact_results)
+        ]
+    )
+    return {
+        "books": n_books,
+        "recall": recall,
+        "exact_p50": np.percentile(exact_latencies, 50),
+        "exact_p99": np.percentile(exact_latencies, 99),
+        "lsh_p50": np.percentile(lsh_latencies, 50),
+        "lsh_p99": np.percentile(lsh_latencies, 99),
+        "lsh_build_seconds": build_seconds,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the LSH recommendation index against exact search."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--tables", type=int, default=24)
+    parser.add_argument("--bits", type=int, default=8)
+    parser.add_argument("--probes", type=int, default=2)
+    parser.add_argument("--max-candidates", type=int, default=20000)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        result = benchmark(
+            size,
+            args.queries,
+            args.k,
+            args.tables,
+            args.bits,
+            args.probes,
+            args.max_candidates,
+        )
+        logger.info(
+            f"{result['books']} books: recall@{args.k}={result['recall']:.3f} | "
+            f"exact p50={result['exact_p50']:.2f}ms p99={result['exact_p99']:.2f}ms | "
+            f"lsh p50={result['lsh_p50']:.2f}ms p99={result['lsh_p99']:.2f}ms | "
+            f"lsh build={result['lsh_build_seconds']:.1f}s"
+        )
@@ -1,4 +1,5 @@
 import logging
+import os
 
 import sagemaker
 from sagemaker.sklearn.estimator import SKLearn
@@ -30,9 +31,12 @@ def setup_sagemaker_training():
     prefix = "recommendation-model"
     logger.info(f"Using S3 bucket: {bucket} with prefix: {prefix}")
 
-    # Upload the training data to S3
+    # Upload the books of the training snapshots exported by the app
+    snapshot_dir = os.environ.get("TRAINING_SNAPSHOT_DIR", "training_snapshots")
     train_input = sagemaker_session.upload_data(
-        "path/to/your/local/data.csv", bucket=bucket, key_prefix=f"{prefix}/data"
+        os.path.join(snapshot_dir, "books"),
+        bucket=bucket,
+        key_prefix=f"{prefix}/data",
     )
     logger.info(f"Training data uploaded to: {train_input}")
 
@@ -40,6 +44,7 @@ def setup_sagemaker_training():
     logger.info("Creating SKLearn estimator...")
     sklearn_estimator = SKLearn(
         entry_point="train.py",  # The script name for training
+        dependencies=["app"],  # train.py reuses the app's training code
         role=role,
         instance_count=1,
         instance_type="ml.m5.large",
@@ -0,0 +1,277 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.services.model_store_service import (
+    current_version,
+    load_recommendation_model,
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Number of recommendations returned per instance
+N_NEIGHBORS = 10
+
+
+def model_fn(model_dir):
+    """
+    Load the model version written by train.py.
+
+    Args:
+        model_dir (str): Directory the model versions are saved in.
+
+    Returns:
+        RecommendationModel: The active model version.
+
+    Raises:
+        FileNotFoundError: If the directory holds no model version.
+    """
+    version = current_version(model_dir)
+    if version is None:
+        raise FileNotFoundError(f"No recommendation model in {model_dir}")
+    logger.info(f"Loading model version {version} from: {model_dir}")
+    return load_recommendation_model(version, model_dir)
+
+
+def input_fn(request_body, content_type="application/json"):
+    """
+    Parse an invocation request into one query text per instance.
+
+    The body is {"instances": [...]}, or a bare list, where each instance is
+    a text or an object with "preferred_genres" and "preferred_authors".
+
+    Args:
+        request_body (bytes): The request body.
+        content_type (str): The request content type.
+
+    Returns:
+        list: The query texts.
+
+    Raises:
+        ValueError: If the content type or the body is not supported.
+    """
+    if content_type.split(";")[0].strip() != "application/json":
+        raise ValueError(f"Unsupported content type '{content_type}'")
+    body = json.loads(request_body)
+    instances = body.get("instances") if isinstance(body, dict) else body
+    if not isinstance(instances, list):
+        raise ValueError("The request must contain a list of instances")
+
+    texts = []
+    for instance in instances:
+        if isinstance(instance, str):
+            texts.append(instance)
+        elif isinstance(instance, dict):
+            texts.append(
+                f"{instance.get('preferred_genres') or ''} "
+                f"{instance.get('preferred_authors') or ''}"
+            )
+        else:
+            raise ValueError("Each instance must be a text or a preference object")
+    return texts
+
+
+def predict_fn(texts, model):
+    """
+    Rank the most similar books of every query text with one search call.
+
+    Args:
+        texts (list): The query texts.
+        model (RecommendationModel): The model returned by model_fn.
+
+    Returns:
+        list: One list of {"book_id", "score"} objects per text, best first.
+    """
+    results = model.search(model.transform(texts), N_NEIGHBORS)
+    return [
+        [
+            {"book_id": book_id, "score": score}
+            for book_id, score in zip(book_ids, scores)
+        ]
+        for book_ids, scores in results
+    ]
+
+
+def output_fn(predictions):
+    """
+    Serialize predictions as an invocation response body.
+
+    Args:
+        predictions (list): The predictions returned by predict_fn.
+
+    Returns:
+        bytes: The JSON response body.
+    """
+    return json.dumps({"predictions": predictions}).encode("utf-8")
+
+
+class BatchingPredictor:
+    """
+    Coalesce concurrent requests into batched predict_fn calls.
+
+    A background thread waits up to max_wait_seconds after the first queued
+    request for others to arrive, then predicts up to max_batch_size texts at
+    once and hands each request its own predictions.
+    """
+
+    def __init__(self, model, max_batch_size, max_wait_seconds):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._condition = threading.Condition()
+        self._queue = []
+        threading.Thread(target=self._run, name="batcher", daemon=True).start()
+
+    def predict(self, texts):
+        """
+        Predict a request's texts in a batch shared with concurrent requests.
+
+        Args:
+            texts (list): The query texts of one request.
+
+        Returns:
+            list: The predictions of the texts.
+        """
+        if not texts:
+            return []
+        future = Future()
+        with self._condition:
+            self._queue.append((texts, future))
+            self._condition.notify()
+        return future.result()
+
+    def _next_batch(self):
+        with self._condition:
+            while not self._queue:
+                self._condition.wait()
+            flush_at = time.monotonic() + self.max_wait_seconds
+            while True:
+                queued = sum(len(texts) for texts, _ in self._queue)
+                remaining = flush_at - time.monotonic()
+                if queued >= self.max_batch_size or remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            # Requests are never split, so a large one forms a batch of its own
+            batch, size = [], 0
+            while self._queue and (
+                not batch or size + len(self._queue[0][0]) <= self.max_batch_size
+            ):
+                texts, future = self._queue.pop(0)
+                batch.append((texts, future))
+                size += len(texts)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            texts = [text for request_texts, _ in batch for text in request_texts]
+            try:
+                predictions = predict_fn(texts, self.model)
+            except Exception as e:
+                logger.exception("Batch prediction failed")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            start = 0
+            for request_texts, future in batch:
+                stop = start + len(request_texts)
+                future.set_result(predictions[start:stop])
+                start = stop
+
+
+def make_handler(predictor):
+    """
+    Build the request handler of the SageMaker-compatible invocation contract.
+
+    Args:
+        predictor (BatchingPredictor): The shared predictor.
+
+    Returns:
+        type: The handler class, with GET /ping and POST /invocations.
+    """
+
+    class InvocationHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _respond(self, status, body=b"", content_type="application/json"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/ping":
+                self._respond(200)
+            else:
+                self._respond(404)
+
+        def do_POST(self):
+            if self.path != "/invocations":
+                self._respond(404)
+                return
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                texts = input_fn(
+                    body, self.headers.get("Content-Type", "application/json")
+                )
+            except ValueError as e:
+                self._respond(400, json.dumps({"error": str(e)}).encode("utf-8"))
+                return
+            try:
+                predictions = predictor.predict(texts)
+            except Exception as e:
+                self._respond(500, json.dumps({"error": str(e)}).encode("utf-8"))
+                return
+            self._respond(200, output_fn(predictions))
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return InvocationHandler
+
+
+def serve(model_dir, host, port, max_batch_size, max_wait_ms):
+    """
+    Serve the model over HTTP until interrupted.
+
+    Args:
+        model_dir (str): Directory the model versions are saved in.
+        host (str): Interface to bind.
+        port (int): Port to bind.
+        max_batch_size (int): Upper bound on the texts predicted at once.
+        max_wait_ms (float): Time to wait for concurrent requests to batch.
+    """
+    predictor = BatchingPredictor(
+        model_fn(model_dir), max_batch_size, max_wait_ms / 1000
+    )
+    server = ThreadingHTTPServer((host, port), make_handler(predictor))
+    logger.info(f"Serving recommendations on http://{host}:{port}/invocations")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down the inference server")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve the recommendation model over HTTP."
+    )
+    parser.add_argument(
+        "--model-dir", default=os.environ.get("SM_MODEL_DIR", "/opt/ml/model")
+    )
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    args = parser.parse_args()
+    serve(args.model_dir, args.host, args.port, args.max_batch_size, args.max_wait_ms)
@@ -1,56 +1,220 @@
 import logging
 import os
-import pickle
+import time
+from functools import partial
 
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.neighbors import NearestNeighbors
+
+from app.services.model_store_service import ModelWriter
+from app.services.training_service import (
+    TFIDF_PARAMS,
+    build_vectorizer,
+    count_document_frequencies,
+    init_vectorizer_worker,
+    ordered_map,
+    vectorize,
+    worker_pool,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Columns of the input data used by the model
+TEXT_COLUMNS = ["genre", "author", "summary", "content"]
+INPUT_COLUMNS = ["id"] + TEXT_COLUMNS
+CHUNK_SIZE = 50000
+
 
-def train_recommendation_model(input_data_path, model_output_dir):
+def list_input_files(input_data_path):
     """
-    Train a recommendation model using the input data and save the model to the
-    specified output directory.
+    List the CSV and Parquet files of the input data.
+
+    Training snapshot files are named after their export time, so name order
+    is the order they were exported in.
 
     Args:
-        input_data_path (str): Path to the input CSV file containing book data.
-        model_output_dir (str): Directory where the trained model and vectorizer
-                                will be saved.
+        input_data_path (str): A data file, or a directory of data files such
+                               as a SageMaker input channel.
 
     Returns:
-        dict: A dictionary containing a success message.
+        list: The data file paths, in name order.
     """
-    logger.info(f"Loading data from: {input_data_path}")
+    if not os.path.isdir(input_data_path):
+        return [input_data_path]
+    return [
+        os.path.join(input_data_path, name)
+        for name in sorted(os.listdir(input_data_path))
+        if name.endswith((".csv", ".parquet"))
+    ]
 
-    # Load data (Assume a CSV with 'id', 'genre', 'author', 'summary', 'content')
-    data = pd.read_csv(input_data_path)
 
-    logger.info("Preparing data for training...")
-    # Prepare the data
-    book_data = [
-        f"{row['genre']} {row['author']} {row['summary']} {row['content']}"
-        for _, row in data.iterrows()
-    ]
+def read_chunks(input_paths, chunk_size=CHUNK_SIZE):
+    """
+    Read the model columns of the input files one chunk at a time.
+
+    Args:
+        input_paths (list): CSV and Parquet file paths.
+        chunk_size (int): Number of rows per chunk.
+
+    Yields:
+        pandas.DataFrame: The next chunk of rows.
+    """
+    for path in input_paths:
+        if path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+
+            parquet_file = pq.ParquetFile(path)
+            for batch in parquet_file.iter_batches(
+                batch_size=chunk_size, columns=INPUT_COLUMNS
+            ):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(path, usecols=INPUT_COLUMNS, chunksize=chunk_size)
+
+
+def chunk_texts(chunk):
+    """
+    Build the text of every book of a chunk with column operations.
+
+    Args:
+        chunk (pandas.DataFrame): Rows with the model columns.
+
+    Returns:
+        list: The genre, author, summary and content of each book.
+    """
+    texts = chunk[TEXT_COLUMNS[0]].astype(str)
+    for column in TEXT_COLUMNS[1:]:
+        texts = texts + " " + chunk[column].astype(str)
+    return texts.tolist()
+
+
+def iter_texts(input_paths, chunk_size=CHUNK_SIZE):
+    """
+    Stream the book IDs and texts of the input files, one chunk at a time.
+
+    When the same book is in several files, only its copy in the last file is
+    kept.
+
+    Args:
+        input_paths (list): CSV and Parquet file paths.
+        chunk_size (int): Number of rows per chunk.
 
-    # Train a simple model using TF-IDF and Nearest Neighbors
-    logger.info("Training the TF-IDF and Nearest Neighbors model...")
-    vectorizer = TfidfVectorizer(stop_words="english")
-    X = vectorizer.fit_transform(book_data)
+    Yields:
+        tuple: The book IDs and texts of each chunk.
+    """
+    # Files are read newest first, so the latest copy of a book exported by
+    # incremental snapshots replaces earlier ones
+    seen_ids = set()
+    for chunk in read_chunks(input_paths[::-1], chunk_size):
+        if len(input_paths) > 1:
+            chunk = chunk[~chunk["id"].isin(seen_ids)]
+            seen_ids.update(chunk["id"].tolist())
+        if len(chunk):
+            yield chunk["id"].tolist(), chunk_texts(chunk)
+
+
+def log_throughput(stage, rows, seconds):
+    logger.info(
+        f"{stage}: {rows} rows in {seconds:.2f}s "
+        f"({rows / seconds if seconds else 0:.0f} rows/s)"
+    )
+
+
+def fit_tfidf_streaming(input_paths, model_output_dir, workers, chunk_size=CHUNK_SIZE):
+    """
+    Fit TF-IDF in two streaming passes, matching TfidfVectorizer.fit_transform.
+
+    The first pass counts document frequencies of each chunk on a process
+    pool and merges them into the sorted vocabulary and smoothed IDF weights.
+    The second pass reads the input again, encodes each chunk with the merged
+    vectorizer and appends its rows to the model files, so neither the text
+    nor the matrix has to fit in memory.
 
-    model = NearestNeighbors(n_neighbors=10, algorithm="auto").fit(X)
+    Args:
+        input_paths (list): CSV and Parquet file paths.
+        model_output_dir (str): Directory the model version is written to.
+        workers (int): Number of worker processes.
+        chunk_size (int): Number of rows per chunk.
+
+    Returns:
+        tuple: The model version and the duration of each stage in seconds.
+    """
+    timings = {}
+    max_pending = 2 * workers
 
-    # Save the model and vectorizer to a file
-    model_path = os.path.join(model_output_dir, "model.pkl")
-    logger.info(f"Saving trained model to: {model_path}")
-    with open(model_path, "wb") as model_file:
-        pickle.dump((model, vectorizer, data["id"].tolist()), model_file)
+    start = time.perf_counter()
+    document_frequencies = {}
+    n_documents = 0
+    with worker_pool(workers) as pool:
+        counts = ordered_map(
+            partial(count_document_frequencies, params=TFIDF_PARAMS),
+            iter_texts(input_paths, chunk_size),
+            pool,
+            max_pending,
+        )
+        for book_ids, partial_frequencies in counts:
+            for term, count in partial_frequencies.items():
+                document_frequencies[term] = document_frequencies.get(term, 0) + count
+            n_documents += len(book_ids)
+    timings["count"] = time.perf_counter() - start
+    log_throughput("Read and count", n_documents, timings["count"])
 
-    logger.info("Model training completed successfully.")
-    return {"detail": "Model trained successfully"}
+    vectorizer = build_vectorizer(document_frequencies, n_documents, **TFIDF_PARAMS)
+    del document_frequencies
+
+    start = time.perf_counter()
+    with ModelWriter(vectorizer, model_output_dir) as writer:
+        init_vectorizer_worker(vectorizer)
+        with worker_pool(
+            workers, initializer=init_vectorizer_worker, initargs=(vectorizer,)
+        ) as pool:
+            rows = ordered_map(
+                vectorize, iter_texts(input_paths, chunk_size), pool, max_pending
+            )
+            for book_ids, matrix in rows:
+                writer.append(matrix, book_ids)
+        timings["vectorize"] = time.perf_counter() - start
+        log_throughput("Read and vectorize", writer.n_rows, timings["vectorize"])
+
+        # The search index is built from the memory-mapped matrix
+        start = time.perf_counter()
+        version = writer.commit()
+        timings["index"] = time.perf_counter() - start
+        log_throughput("Build search index", writer.n_rows, timings["index"])
+    return version, timings
+
+
+def train_recommendation_model(
+    input_data_path, model_output_dir, workers=None, chunk_size=CHUNK_SIZE
+):
+    """
+    Train a recommendation model using the input data and save the model to the
+    specified output directory.
+
+    The model is written in the format the app loads with model_store_service,
+    so the artifact can be served by infra/ml/serve.py or by the app itself.
+
+    Args:
+        input_data_path (str): Path to a CSV or Parquet file of book data, or
+                               to a directory of such files.
+        model_output_dir (str): Directory where the model version is saved.
+        workers (int): Number of worker processes, defaults to every core.
+        chunk_size (int): Number of rows read at a time.
+
+    Returns:
+        dict: A dictionary containing a success message and the model version.
+    """
+    workers = workers or os.cpu_count() or 1
+    # Data with the columns 'id', 'genre', 'author', 'summary' and 'content'
+    input_paths = list_input_files(input_data_path)
+    logger.info(f"Loading data from: {', '.join(input_paths)}")
+
+    logger.info(f"Training the TF-IDF model on {workers} cores...")
+    version, _ = fit_tfidf_streaming(input_paths, model_output_dir, workers, chunk_size)
+
+    logger.info(f"Model version {version} saved to: {model_output_dir}")
+    return {"detail": "Model trained successfully", "version": version}
 
 
 if __name__ == "__main__":
@@ -59,5 +223,7 @@ if __name__ == "__main__":
     input_data_path = os.environ.get("SM_CHANNEL_TRAIN", "/opt/ml/input/data/train")
     model_output_dir = os.environ.get("SM_MODEL_DIR", "/opt/ml/model")
 
+    workers = int(os.environ.get("SM_NUM_CPUS", os.cpu_count() or 1))
+
     logger.info("Starting model training...")
-    train_recommendation_model(input_data_path, model_output_dir)
+    train_recommendation_model(input_data_path, model_output_dir, workers)
@@ -179,3 +179,59 @@ def set_user_preferences(client, user_token):
         headers=headers,
     )
     return response.json()
+
+
+@pytest.fixture(scope="function")
+def recommendation_model_dir(tmp_path, monkeypatch):
+    """
+    Fixture to store recommendation model artifacts in a temporary directory.
+    Returns the path of the directory.
+    """
+    model_dir = str(tmp_path / "recommendation_model")
+    monkeypatch.setattr(
+        "app.services.model_store_service.RECOMMENDATION_MODEL_DIR", model_dir
+    )
+    monkeypatch.setattr(
+        "app.services.collaborative_service.COLLABORATIVE_MODEL_DIR",
+        str(tmp_path / "collaborative_model"),
+    )
+    return model_dir
+
+
+@pytest.fixture(scope="function")
+def create_catalog(db_session):
+    """
+    Fixture to add a small catalog of books directly to the database.
+    Returns the list of created books.
+    """
+    books = [
+        models.Book(
+            title="Space Voyage",
+            author="Ann Stellar",
+            genre="Science Fiction",
+            year_of_publication=2001,
+            content="Rockets, starships and distant planets in deep space.",
+            summary="A crew travels between galaxies.",
+        ),
+        models.Book(
+            title="Dragon Crown",
+            author="Bob Mythic",
+            genre="Fantasy",
+            year_of_publication=1999,
+            content="Dragons, wizards and an enchanted kingdom.",
+            summary="A young mage claims the throne.",
+        ),
+        models.Book(
+            title="Quiet Harbor",
+            author="Cara Tides",
+            genre="Romance",
+            year_of_publication=2015,
+            content="Two strangers fall in love in a seaside town.",
+            summary="A summer love story.",
+        ),
+    ]
+    db_session.add_all(books)
+    db_session.commit()
+    for book in books:
+        db_session.refresh(book)
+    return books
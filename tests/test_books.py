@@ -122,3 +122,108 @@ def test_delete_book(client, admin_token, create_test_book):
     response = client.get(f"/books/{book_id}", headers=headers)
     logger.debug(f"Verify book deletion response: {response.status_code}")
     assert response.status_code == 404
+
+
+def test_similar_books(
+    client, user_token, db_session, create_catalog, recommendation_model_dir
+):
+    """
+    Test that precomputed similar books are served as ranked book cards.
+    """
+    from app.services.recommendation_service import train_recommendation_model
+    from app.services.similarity_service import compute_similar_books
+
+    logger.info("Testing similar books retrieval.")
+    train_recommendation_model(db_session)
+    compute_similar_books(db_session, top_k=2)
+
+    headers = {"Authorization": f"Bearer {user_token}"}
+    book_id = create_catalog[0].id
+    response = client.get(f"/books/{book_id}/similar", headers=headers)
+    logger.debug(f"Similar books response: {response.json()}")
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 2
+    assert book_id not in [book["id"] for book in data]
+    assert data[0]["score"] >= data[1]["score"]
+    assert "content" not in data[0]
+
+
+def test_similar_books_job(
+    client, admin_token, db_session, create_catalog, recommendation_model_dir
+):
+    """
+    Test that similar books are computed in a background job whose status can
+    be polled, keeping SIMILAR_BOOKS_TOP_K books by default.
+    """
+    import json
+    import time
+
+    from app.services.recommendation_service import train_recommendation_model
+
+    logger.info("Testing the similar books job.")
+    train_recommendation_model(db_session)
+
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = client.post("/admin/compute-similar-books", headers=headers)
+    assert response.status_code == 202
+    job = response.json()
+    assert job["kind"] == "similar-books"
+
+    deadline = time.monotonic() + 120
+    while job["status"] in ("pending", "running") and time.monotonic() < deadline:
+        time.sleep(0.5)
+        job = client.get(f"/admin/jobs/{job['id']}", headers=headers).json()
+    logger.debug(f"Similar books job: {job}")
+    assert job["status"] == "succeeded"
+    assert json.loads(job["detail"])["books"] == len(create_catalog)
+
+    book_id = create_catalog[0].id
+    response = client.get(f"/books/{book_id}/similar", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()) == len(create_catalog) - 1
+
+
+def test_similar_books_not_computed(client, user_token, create_catalog):
+    """
+    Test that a 404 is returned when similar books were not computed.
+    """
+    logger.info("Testing similar books before computation.")
+    headers = {"Authorization": f"Bearer {user_token}"}
+    response = client.get(f"/books/{create_catalog[0].id}/similar", headers=headers)
+    assert response.status_code == 404
+
+
+def test_training_snapshot_export(db_session, create_catalog, tmp_path):
+    """
+    Test that a full snapshot holds every book and review, and that an
+    incremental snapshot only holds the rows changed since.
+    """
+    import pyarrow.parquet as pq
+
+    from app.models import Review
+    from app.services.snapshot_service import export_training_snapshot
+
+    db_session.add(
+        Review(book_id=create_catalog[0].id, user_id=1, review_text="Good", rating=4)
+    )
+    db_session.commit()
+    snapshot_dir = str(tmp_path)
+
+    full = export_training_snapshot(db_session, snapshot_dir, batch_size=2)
+    assert full["kind"] == "full"
+    books = pq.read_table(tmp_path / full["tables"]["books"]["path"])
+    assert books.column("id").to_pylist() == [book.id for book in create_catalog]
+    assert (
+        pq.ParquetFile(tmp_path / full["tables"]["books"]["path"]).num_row_groups == 2
+    )
+    assert full["tables"]["reviews"]["rows"] == 1
+
+    create_catalog[2].title = "Quiet Harbor, Revised"
+    db_session.commit()
+    incremental = export_training_snapshot(db_session, snapshot_dir, incremental=True)
+    assert incremental["kind"] == "incremental"
+    assert incremental["since"] == full["until"]
+    books = pq.read_table(tmp_path / incremental["tables"]["books"]["path"])
+    assert books.column("title").to_pylist() == ["Quiet Harbor, Revised"]
+    assert incremental["tables"]["reviews"]["rows"] == 0
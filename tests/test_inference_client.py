@@ -0,0 +1,268 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services.inference_client_service import (
+    CircuitBreaker,
+    CircuitOpenError,
+    HttpInferenceClient,
+    InferenceClient,
+    InferenceError,
+    RemoteRecommender,
+    SageMakerInferenceClient,
+)
+
+# Set up a logger for the test
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture(scope="function")
+def inference_server():
+    """
+    Fixture to run a local stand-in for the remote recommendation endpoint.
+    Each instance is answered with the book ID given in its preferred genres.
+    The server records the batch size of every call, and the status codes in
+    `failures` are returned before any successful response.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            instances = body["instances"]
+            server.batches.append(len(instances))
+            if server.failures:
+                self.send_response(server.failures.pop(0))
+                self.end_headers()
+                return
+            payload = json.dumps(
+                {
+                    "predictions": [
+                        [{"book_id": int(instance["preferred_genres"]), "score": 1.0}]
+                        for instance in instances
+                    ]
+                }
+            ).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.batches = []
+    server.failures = []
+    server.url = f"http://127.0.0.1:{server.server_port}/invocations"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_recommender(
+    url, retries=2, failure_threshold=2, batch_wait_ms=20, batch_size=16
+):
+    client = HttpInferenceClient(url, timeout=2.0, retries=retries, pool_size=4)
+    return RemoteRecommender(
+        client,
+        CircuitBreaker(failure_threshold, 60),
+        batch_size,
+        batch_wait_ms / 1000,
+        workers=4,
+    )
+
+
+class StubInferenceClient(InferenceClient):
+    """
+    Backend stand-in that answers with fixed predictions once `release` is set.
+    """
+
+    def __init__(self, predictions, timeout=0.2):
+        super().__init__(timeout, retries=0)
+        self.predictions = predictions
+        self.release = threading.Event()
+        self.release.set()
+
+    def predict(self, instances, deadline=None):
+        self.release.wait()
+        return self.predictions
+
+
+def test_concurrent_requests_are_batched(inference_server):
+    """
+    Test that concurrent requests are merged into fewer remote calls and that
+    every caller gets its own prediction.
+    """
+    recommender = make_recommender(inference_server.url)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(
+            pool.map(
+                lambda book_id: recommender.recommend(
+                    {"preferred_genres": str(book_id), "preferred_authors": ""}
+                ),
+                range(8),
+            )
+        )
+
+    assert results == [([book_id], [1.0]) for book_id in range(8)]
+    assert sum(inference_server.batches) == 8
+    assert len(inference_server.batches) < 8
+
+
+def test_transient_errors_are_retried(inference_server):
+    """
+    Test that throttling and server errors are retried within the deadline.
+    """
+    inference_server.failures = [503, 429]
+    recommender = make_recommender(inference_server.url)
+
+    assert recommender.recommend_many(
+        [{"preferred_genres": "3", "preferred_authors": ""}]
+    ) == [([3], [1.0])]
+    assert len(inference_server.batches) == 3
+
+
+def test_circuit_breaker_falls_back_to_local_model(
+    inference_server,
+    db_session,
+    create_catalog,
+    recommendation_model_dir,
+    monkeypatch,
+):
+    """
+    Test that repeated failures open the circuit, that calls then fail without
+    reaching the backend, and that recommendations fall back to the local model.
+    """
+    from app.models import UserPreferences
+    from app.services import recommendation_service
+
+    inference_server.failures = [500] * 10
+    recommender = make_recommender(inference_server.url, retries=0)
+    instance = {"preferred_genres": "1", "preferred_authors": ""}
+    for _ in range(2):
+        with pytest.raises(InferenceError):
+            recommender.recommend(instance)
+    with pytest.raises(CircuitOpenError):
+        recommender.recommend(instance)
+    assert len(inference_server.batches) == 2
+
+    recommendation_service.train_recommendation_model(db_session)
+    monkeypatch.setattr(
+        recommendation_service, "get_remote_recommender", lambda: recommender
+    )
+    preferences = UserPreferences(
+        user_id=1, preferred_genres="Fantasy", preferred_authors="Bob Mythic"
+    )
+    rankings = recommendation_service.rank_recommendations_batch([preferences])
+    assert rankings[1][0][0] == create_catalog[1].id
+    assert len(inference_server.batches) == 2
+
+
+def test_batches_are_sent_concurrently(inference_server, monkeypatch):
+    """
+    Test that batches are sent on as many connections as the pool holds.
+    """
+    do_post = inference_server.RequestHandlerClass.do_POST
+
+    def slow_post(self):
+        time.sleep(0.3)
+        do_post(self)
+
+    monkeypatch.setattr(inference_server.RequestHandlerClass, "do_POST", slow_post)
+    recommender = make_recommender(inference_server.url, batch_wait_ms=0, batch_size=1)
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(
+            pool.map(
+                lambda book_id: recommender.recommend(
+                    {"preferred_genres": str(book_id), "preferred_authors": ""}
+                ),
+                range(4),
+            )
+        )
+
+    assert results == [([book_id], [1.0]) for book_id in range(4)]
+    assert inference_server.batches == [1, 1, 1, 1]
+    assert time.monotonic() - started < 1.0
+
+
+def test_queue_timeouts_do_not_open_the_circuit():
+    """
+    Test that a request timing out before its batch was sent is not counted
+    as a backend failure, while one timing out on the backend is.
+    """
+    client = StubInferenceClient([[1]])
+    client.release.clear()
+    breaker = CircuitBreaker(2, 60)
+    recommender = RemoteRecommender(client, breaker, 1, 0)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(recommender.recommend, {}) for _ in range(2)]
+        errors = [future.exception() for future in futures]
+    client.release.set()
+
+    assert all(isinstance(error, InferenceError) for error in errors)
+    assert breaker._failures == 1
+    assert not breaker.is_open
+
+
+def test_malformed_predictions_raise_inference_errors():
+    """
+    Test that predictions that cannot be parsed surface as InferenceError and
+    count as backend failures.
+    """
+    breaker = CircuitBreaker(2, 60)
+    recommender = RemoteRecommender(
+        StubInferenceClient([[{"score": 1.0}]]), breaker, 1, 0
+    )
+    with pytest.raises(InferenceError):
+        recommender.recommend({})
+    recommender.client.predictions = [["not a book ID"]]
+    with pytest.raises(InferenceError):
+        recommender.recommend_many([{}])
+    assert breaker.is_open
+
+
+def test_trial_call_timing_out_in_the_queue_is_released():
+    """
+    Test that a trial call that times out before reaching the backend does
+    not keep the circuit open, and that the next call is let through.
+    """
+    client = StubInferenceClient([[1]])
+    client.release.clear()
+    breaker = CircuitBreaker(1, 0)
+    recommender = RemoteRecommender(client, breaker, 1, 0)
+    # Keep the only connection busy so the trial call waits in the queue
+    busy = recommender.batcher.submit({}, time.monotonic() + 5)
+    breaker.record_failure()
+    assert breaker.is_open
+
+    with pytest.raises(InferenceError):
+        recommender.recommend({})
+    assert breaker.is_open
+    client.release.set()
+    busy.result(timeout=5)
+
+    assert recommender.recommend({}) == ([1], [0.0])
+    assert not breaker.is_open
+
+
+def test_sagemaker_attempts_are_bounded_by_the_deadline():
+    """
+    Test that each SageMaker attempt reads for at most the time left before
+    the deadline, and that clients are shared between similar deadlines.
+    """
+    client = SageMakerInferenceClient("endpoint", "us-east-1", 2.0, 0, 4)
+
+    runtime = client._runtime(0.6)
+    assert runtime.meta.config.read_timeout == 0.5
+    assert client._runtime(0.7) is runtime
+    assert client._runtime(0.1).meta.config.read_timeout == 0.25
+    assert client._runtime(30).meta.config.read_timeout == 2.0
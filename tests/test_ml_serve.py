@@ -0,0 +1,114 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from infra.ml.serve import BatchingPredictor, input_fn
+
+# Set up a logger for the test
+logger = logging.getLogger(__name__)
+
+
+class StubModel:
+    """
+    Recommendation model stand-in that returns the book whose index is the
+    text. It records the number of texts of every search.
+    Book IDs are 100 plus the index.
+    """
+
+    def __init__(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def transform(self, texts):
+        return texts
+
+    def search(self, X, n_neighbors):
+        with self.lock:
+            self.batches.append(len(X))
+        return [([100 + int(text)], [1.0]) for text in X]
+
+
+@pytest.fixture(scope="function")
+def stub_model():
+    """
+    Fixture to build a model as returned by model_fn, with stub components.
+    """
+    return StubModel()
+
+
+def test_input_fn_parses_instances():
+    """
+    Test that text and preference instances are turned into query texts,
+    whether they are wrapped in "instances" or sent as a bare list.
+    """
+    body = json.dumps(
+        {
+            "instances": [
+                "space rockets",
+                {"preferred_genres": "Fantasy", "preferred_authors": "Bob Mythic"},
+                {"preferred_genres": "Mystery"},
+            ]
+        }
+    ).encode("utf-8")
+    assert input_fn(body, "application/json; charset=utf-8") == [
+        "space rockets",
+        "Fantasy Bob Mythic",
+        "Mystery ",
+    ]
+    assert input_fn(json.dumps(["space rockets"])) == ["space rockets"]
+
+
+@pytest.mark.parametrize(
+    "body, content_type",
+    [
+        (b"genre,author", "text/csv"),
+        (json.dumps({"instances": "space rockets"}).encode("utf-8"), None),
+        (json.dumps({"texts": ["space rockets"]}).encode("utf-8"), None),
+        (json.dumps([42]).encode("utf-8"), None),
+    ],
+)
+def test_input_fn_rejects_invalid_requests(body, content_type):
+    """
+    Test that unsupported content types and bodies without a list of text or
+    preference instances raise ValueError.
+    """
+    with pytest.raises(ValueError):
+        input_fn(body, content_type or "application/json")
+
+
+def test_batching_predictor_coalesces_requests(stub_model):
+    """
+    Test that concurrent requests share a batch and that each gets its own
+    predictions, in order.
+    """
+    predictor = BatchingPredictor(stub_model, max_batch_size=8, max_wait_seconds=1.0)
+    requests = [[str(2 * i), str(2 * i + 1)] for i in range(4)]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(predictor.predict, requests))
+
+    assert stub_model.batches == [8]
+    for texts, predictions in zip(requests, results):
+        assert [prediction[0]["book_id"] for prediction in predictions] == [
+            100 + int(text) for text in texts
+        ]
+        assert predictions[0][0]["score"] == 1.0
+
+
+def test_batching_predictor_never_splits_requests(stub_model):
+    """
+    Test that a request larger than the batch size forms a batch of its own,
+    and that an empty request does not reach the model.
+    """
+    predictor = BatchingPredictor(stub_model, max_batch_size=4, max_wait_seconds=0)
+    texts = [str(index) for index in range(6)]
+
+    predictions = predictor.predict(texts)
+    assert stub_model.batches == [6]
+    assert [prediction[0]["book_id"] for prediction in predictions] == [
+        100 + index for index in range(6)
+    ]
+    assert predictor.predict([]) == []
+    assert stub_model.batches == [6]
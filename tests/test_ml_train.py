@@ -0,0 +1,132 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from app.services.model_store_service import load_recommendation_model
+from infra.ml.train import (
+    INPUT_COLUMNS,
+    chunk_texts,
+    fit_tfidf_streaming,
+    iter_texts,
+    list_input_files,
+    read_chunks,
+    train_recommendation_model,
+)
+
+# Set up a logger for the test
+logger = logging.getLogger(__name__)
+
+BOOKS = [
+    (1, "Science Fiction", "Ann Stellar", "A voyage", "Rockets and stars in space."),
+    (2, "Fantasy", "Bob Mythic", "Dragons", "Wizards and dragons cast magic."),
+    (3, "Mystery", "Cat Sleuth", "A murder", "A detective solves a murder case."),
+    (4, "Fantasy", "Dee Arcane", "Magic school", "Young wizards study magic spells."),
+    (5, "Romance", "Eve Heart", "A love story", "Two hearts meet in Paris."),
+]
+
+
+def make_frame(books):
+    return pd.DataFrame(books, columns=INPUT_COLUMNS)
+
+
+@pytest.fixture(scope="function")
+def input_dir(tmp_path):
+    """
+    Fixture to write the books as a CSV file and a Parquet file, plus a file
+    of another type that is not training data.
+    Returns the path of the directory.
+    """
+    make_frame(BOOKS[:3]).to_csv(tmp_path / "snapshot-1.csv", index=False)
+    make_frame(BOOKS[3:]).to_parquet(tmp_path / "snapshot-2.parquet", index=False)
+    (tmp_path / "manifest.json").write_text("{}")
+    return tmp_path
+
+
+def test_list_input_files(input_dir):
+    """
+    Test that a directory lists its CSV and Parquet files in name order, and
+    that a single file is used as is.
+    """
+    assert list_input_files(str(input_dir)) == [
+        str(input_dir / "snapshot-1.csv"),
+        str(input_dir / "snapshot-2.parquet"),
+    ]
+    path = str(input_dir / "snapshot-1.csv")
+    assert list_input_files(path) == [path]
+
+
+def test_read_chunks_reads_csv_and_parquet(input_dir):
+    """
+    Test that CSV and Parquet files are read in chunks of the model columns.
+    """
+    chunks = list(read_chunks(list_input_files(str(input_dir)), chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 1, 2]
+    assert all(list(chunk.columns) == INPUT_COLUMNS for chunk in chunks)
+    assert pd.concat(chunks)["id"].tolist() == [1, 2, 3, 4, 5]
+    assert chunk_texts(chunks[0])[0] == (
+        "Science Fiction Ann Stellar A voyage Rockets and stars in space."
+    )
+
+
+def test_newest_file_wins_across_files(tmp_path):
+    """
+    Test that a book exported in several files is only kept from the newest.
+    """
+    make_frame(BOOKS[:2]).to_csv(tmp_path / "snapshot-1.csv", index=False)
+    updated = (2, "Fantasy", "Bob Mythic", "Dragons", "The dragons sleep.")
+    make_frame([updated, BOOKS[2]]).to_parquet(
+        tmp_path / "snapshot-2.parquet", index=False
+    )
+
+    rows = [
+        row
+        for book_ids, texts in iter_texts(list_input_files(str(tmp_path)))
+        for row in zip(book_ids, texts)
+    ]
+    assert sorted(book_id for book_id, _ in rows) == [1, 2, 3]
+    assert dict(rows)[2].endswith("The dragons sleep.")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_streaming_fit_matches_in_memory_fit(input_dir, tmp_path_factory, workers):
+    """
+    Test that the two-pass streaming fit writes the model
+    TfidfVectorizer.fit_transform would, both inline and on a worker pool.
+    """
+    input_paths = list_input_files(str(input_dir))
+    model_dir = str(tmp_path_factory.mktemp("model"))
+    version, timings = fit_tfidf_streaming(
+        input_paths, model_dir, workers, chunk_size=2
+    )
+
+    model = load_recommendation_model(version, model_dir)
+    frame = pd.concat(read_chunks(input_paths[::-1]))
+    expected = TfidfVectorizer(stop_words="english")
+    expected_X = expected.fit_transform(chunk_texts(frame))
+    assert model.book_ids.tolist() == frame["id"].tolist()
+    assert list(model.vectorizer.get_feature_names_out()) == list(
+        expected.get_feature_names_out()
+    )
+    assert np.allclose(model.vectorizer.idf_, expected.idf_)
+    assert np.allclose(model.matrix.toarray(), expected_X.toarray(), atol=1e-6)
+    assert set(timings) == {"count", "vectorize", "index"}
+
+
+def test_trained_model_is_served(input_dir, tmp_path_factory):
+    """
+    Test that the model written by training is loaded and queried by the
+    inference server.
+    """
+    from infra.ml.serve import model_fn, predict_fn
+
+    model_dir = str(tmp_path_factory.mktemp("model"))
+    result = train_recommendation_model(str(input_dir), model_dir, workers=1)
+
+    model = model_fn(model_dir)
+    assert model.version == result["version"]
+    predictions = predict_fn(["wizards and dragons"], model)
+    assert predictions[0][0]["book_id"] == 2
+    assert predictions[0][0]["score"] > predictions[0][1]["score"]
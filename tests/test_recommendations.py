@@ -71,18 +71,20 @@ def test_fetch_recommendations(
     """
     logger.info("Testing recommendation fetching.")
     headers = {"Authorization": f"Bearer {user_token}"}
+    mock_redis.get.return_value = None
 
     mock_recommended_books = [
         {
+            "id": 1,
             "title": "Mock Book",
             "author": "Test Author",
             "genre": "Fiction",
-            "year_of_publication": 2024,
+            "score": 0.9,
         }
     ]
 
     with patch(
-        "app.services.recommendation_service.get_recommendations"
+        "app.routers.recommendations.get_recommendations"
     ) as mock_get_recommendations:
         mock_get_recommendations.return_value = mock_recommended_books
 
@@ -92,3 +94,748 @@ def test_fetch_recommendations(
         assert response.status_code == 200
         assert isinstance(response.json(), list)
         assert response.json()[0]["title"] == "Mock Book"
+
+
+def test_recommendations_are_hydrated_in_one_query(
+    db_session, create_catalog, recommendation_model_dir, mock_redis
+):
+    """
+    Test that ranked recommendations are loaded as cards with a single query,
+    and that full books are available on demand.
+    """
+    from sqlalchemy import event
+
+    from app.models import UserPreferences
+    from app.services.recommendation_service import (
+        get_recommendations,
+        hydrate_recommendations,
+        rank_recommendations,
+        train_recommendation_model,
+    )
+
+    mock_redis.get.return_value = None
+    train_recommendation_model(db_session)
+    preferences = UserPreferences(
+        user_id=1, preferred_genres="Fantasy", preferred_authors="Bob Mythic"
+    )
+
+    book_ids, scores = rank_recommendations(db_session, preferences)
+    statements = []
+    engine = db_session.get_bind()
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        cards = hydrate_recommendations(db_session, book_ids, scores)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert len(statements) == 1
+    assert cards[0].id == create_catalog[1].id
+    assert [card.score for card in cards] == sorted(
+        (card.score for card in cards), reverse=True
+    )
+    assert not hasattr(cards[0], "content")
+
+    cached = json.loads(mock_redis.setex.call_args_list[0].args[2])
+    assert cached["book_ids"] == [card.id for card in cards]
+
+    books = get_recommendations(db_session, preferences, full=True)
+    assert [book.id for book in books] == [card.id for card in cards]
+    assert books[0].content == create_catalog[1].content
+
+
+def test_preference_signature_is_normalized():
+    """
+    Test that preference sets differing only in order, casing or whitespace
+    share one signature.
+    """
+    from app.schemas import UserPreferences
+    from app.services.recommendation_service import preference_signature
+
+    first = UserPreferences(
+        id=1,
+        user_id=1,
+        preferred_genres="Fiction, Science Fiction",
+        preferred_authors="Test Author",
+    )
+    second = UserPreferences(
+        id=2,
+        user_id=2,
+        preferred_genres="science  fiction,fiction",
+        preferred_authors=" test author",
+    )
+    third = UserPreferences(
+        id=3, user_id=3, preferred_genres="Fantasy", preferred_authors="Test Author"
+    )
+
+    assert preference_signature(first) == preference_signature(second)
+    assert preference_signature(first) != preference_signature(third)
+
+
+def test_trained_model_round_trip(db_session, create_catalog, recommendation_model_dir):
+    """
+    Test that a trained model is saved as a memory-mapped artifact and finds
+    the most similar book for a preference text.
+    """
+    from app.services.model_store_service import get_recommendation_model
+    from app.services.recommendation_service import train_recommendation_model
+
+    train_recommendation_model(db_session)
+    model = get_recommendation_model()
+
+    # The matrix is a read-only view over the memory-mapped artifact files
+    assert not model.matrix.data.flags.owndata
+    assert not model.matrix.data.flags.writeable
+    book_ids, scores = model.search(model.transform(["dragons fantasy"]), 2)[0]
+    assert book_ids[0] == create_catalog[1].id
+    assert scores[0] >= scores[1]
+
+
+def test_incremental_index_updates(
+    db_session, create_catalog, recommendation_model_dir, monkeypatch
+):
+    """
+    Test that added and deleted books show up in recommendations without a
+    retrain, and that high vocabulary drift triggers a background re-fit.
+    """
+    from app import models
+    from app.services import recommendation_service
+    from app.services.model_store_service import get_recommendation_model
+
+    recommendation_service.train_recommendation_model(db_session)
+    trained_version = get_recommendation_model().version
+
+    book = models.Book(
+        title="Wizard School",
+        author="Dee Arcane",
+        genre="Fantasy",
+        year_of_publication=2020,
+        content="Wizards and dragons study magic in an enchanted castle.",
+        summary="Young wizards learn magic.",
+    )
+    db_session.add(book)
+    db_session.commit()
+    monkeypatch.setattr(recommendation_service, "RECOMMENDATION_DRIFT_THRESHOLD", 1.0)
+    recommendation_service.index_book(db_session, book.id)
+
+    model = get_recommendation_model()
+    assert model.version == trained_version
+    book_ids, _ = model.search(model.transform(["wizards dragons"]), 4)[0]
+    assert book.id in book_ids
+
+    recommendation_service.unindex_book(db_session, create_catalog[1].id)
+    model = get_recommendation_model()
+    book_ids, _ = model.search(model.transform(["wizards dragons"]), 4)[0]
+    assert create_catalog[1].id not in book_ids
+    assert len(book_ids) == 3
+
+    started_jobs = []
+    monkeypatch.setattr(
+        recommendation_service,
+        "start_training_job",
+        lambda db, kind: started_jobs.append(kind),
+    )
+    monkeypatch.setattr(recommendation_service, "RECOMMENDATION_DRIFT_THRESHOLD", 0.0)
+    recommendation_service.index_book(db_session, book.id)
+    assert started_jobs == ["recommendation"]
+
+
+def test_book_changes_during_retrain_are_carried_over(
+    db_session, create_catalog, recommendation_model_dir, monkeypatch
+):
+    """
+    Test that books added or deleted while a retrain runs are still reflected
+    once the new version is activated.
+    """
+    from app import models
+    from app.services import recommendation_service, training_service
+    from app.services.model_store_service import get_recommendation_model
+
+    recommendation_service.train_recommendation_model(db_session)
+    trained_version = get_recommendation_model().version
+    monkeypatch.setattr(recommendation_service, "RECOMMENDATION_DRIFT_THRESHOLD", 1.0)
+    book = models.Book(
+        title="Wizard School",
+        author="Dee Arcane",
+        genre="Fantasy",
+        year_of_publication=2020,
+        content="Wizards and dragons study magic in an enchanted castle.",
+        summary="Young wizards learn magic.",
+    )
+    deleted = create_catalog[2]
+    build_vectorizer = training_service.build_vectorizer
+
+    def change_books_after_first_pass(*args, **kwargs):
+        db_session.add(book)
+        db_session.delete(deleted)
+        db_session.commit()
+        recommendation_service.index_book(db_session, book.id)
+        recommendation_service.unindex_book(db_session, deleted.id)
+        return build_vectorizer(*args, **kwargs)
+
+    monkeypatch.setattr(
+        training_service, "build_vectorizer", change_books_after_first_pass
+    )
+    training_service.train_tfidf_model(db_session, workers=1)
+
+    model = get_recommendation_model()
+    assert model.version != trained_version
+    book_ids, _ = model.search(model.transform(["wizards dragons romance"]), 10)[0]
+    assert book.id in book_ids
+    assert deleted.id not in book_ids
+
+
+def test_lsh_index_backend(
+    db_session, create_catalog, recommendation_model_dir, monkeypatch
+):
+    """
+    Test that the LSH backend is persisted with the model and serves queries.
+    """
+    from app.services import model_store_service
+    from app.services.recommendation_service import train_recommendation_model
+
+    monkeypatch.setattr(model_store_service, "RECOMMENDATION_INDEX_BACKEND", "lsh")
+    train_recommendation_model(db_session)
+    model = model_store_service.get_recommendation_model()
+
+    assert model.index.name == "lsh"
+    book_ids, _ = model.search(model.transform(["dragons wizards fantasy"]), 1)[0]
+    assert book_ids == [create_catalog[1].id]
+
+
+def test_collaborative_and_hybrid_engines(
+    db_session, create_catalog, recommendation_model_dir
+):
+    """
+    Test that ALS factors recover shared tastes and blend with content scores.
+    """
+    from app.models import Review, User, UserPreferences
+    from app.services.collaborative_service import (
+        get_collaborative_model,
+        train_collaborative_model,
+    )
+    from app.services.recommendation_service import (
+        rank_books,
+        train_recommendation_model,
+    )
+
+    space, dragon, harbor = (book.id for book in create_catalog)
+    users = [User(email=f"reader{i}@example.com", username=f"r{i}") for i in range(3)]
+    db_session.add_all(users)
+    db_session.commit()
+    # Readers 0 and 1 share tastes; reader 1 has not rated the fantasy book yet
+    ratings = [
+        (0, space, 5),
+        (0, dragon, 5),
+        (0, harbor, 1),
+        (1, space, 5),
+        (1, harbor, 1),
+        (2, harbor, 5),
+        (2, space, 1),
+        (2, dragon, 1),
+    ]
+    db_session.add_all(
+        Review(user_id=users[u].id, book_id=b, rating=r, review_text="")
+        for u, b, r in ratings
+    )
+    db_session.commit()
+
+    result = train_collaborative_model(db_session)
+    assert result["ratings"] == len(ratings)
+    model = get_collaborative_model()
+    assert model.recommend(users[1].id, 1)[0] == [dragon]
+    assert model.recommend(12345, 1) is None
+
+    train_recommendation_model(db_session)
+    preferences = UserPreferences(
+        user_id=users[1].id, preferred_genres="Romance", preferred_authors=""
+    )
+    book_ids, scores = rank_books(db_session, preferences, "hybrid", n=3)
+    assert set(book_ids) <= {space, dragon, harbor}
+    assert scores == sorted(scores, reverse=True)
+
+    # Users without ratings fall back to the content model
+    preferences.user_id = 12345
+    assert rank_books(db_session, preferences, "collaborative", n=1)[0] == [harbor]
+
+
+def test_training_job(client, admin_token, create_catalog, recommendation_model_dir):
+    """
+    Test that training runs as a background job whose status can be polled.
+    """
+    import time
+
+    from app.services.model_store_service import get_recommendation_model
+
+    response = client.post("/admin/train-recommendation-model")
+    assert response.status_code == 202
+    job = response.json()
+    assert job["kind"] == "recommendation"
+
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    deadline = time.monotonic() + 120
+    while job["status"] in ("pending", "running") and time.monotonic() < deadline:
+        time.sleep(0.5)
+        job = client.get(f"/admin/jobs/{job['id']}", headers=headers).json()
+    logger.debug(f"Training job: {job}")
+    assert job["status"] == "succeeded"
+    assert job["progress"] == 1.0
+    assert get_recommendation_model().book_ids.tolist() == [
+        book.id for book in create_catalog
+    ]
+
+    response = client.get("/admin/jobs/12345", headers=headers)
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_streaming_training_matches_in_memory_fit(
+    db_session, create_catalog, recommendation_model_dir, workers
+):
+    """
+    Test that the batched two-pass trainer reproduces a single in-memory fit,
+    both inline and on a worker pool.
+    """
+    import numpy as np
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    from app.services.model_store_service import get_recommendation_model
+    from app.services.training_service import book_text, train_tfidf_model
+
+    result = train_tfidf_model(db_session, batch_size=1, workers=workers)
+    assert result["workers"] == workers
+    assert set(result["timings"]) == {
+        "count_seconds",
+        "vectorize_seconds",
+        "commit_seconds",
+    }
+    model = get_recommendation_model()
+
+    expected = TfidfVectorizer(stop_words="english")
+    X = expected.fit_transform([book_text(book) for book in create_catalog])
+    assert list(model.vectorizer.get_feature_names_out()) == list(
+        expected.get_feature_names_out()
+    )
+    assert np.allclose(model.vectorizer.idf_, expected.idf_)
+    assert np.allclose(model.matrix.toarray(), X.toarray(), atol=1e-6)
+    assert model.book_ids.tolist() == [book.id for book in create_catalog]
+
+
+def test_fetch_serves_precomputed_recommendations(
+    client,
+    user_token,
+    db_session,
+    set_user_preferences,
+    create_catalog,
+    recommendation_model_dir,
+    mock_redis,
+):
+    """
+    Test that fresh precomputed rows are served without recomputing, and that
+    preference changes fall back to online compute.
+    """
+    from app import models
+    from app.models import Recommendation
+    from app.services.recommendation_service import (
+        get_precomputed_recommendations,
+        index_book,
+        train_recommendation_model,
+    )
+
+    mock_redis.get.return_value = None
+    train_recommendation_model(db_session)
+    headers = {"Authorization": f"Bearer {user_token}"}
+    user_id = set_user_preferences["user_id"]
+
+    response = client.post(f"/recommendations/{user_id}", headers=headers)
+    assert response.status_code == 200
+    row = db_session.query(Recommendation).filter_by(user_id=user_id).one()
+    assert row.model_version is not None
+    assert len(json.loads(row.scores)) == len(json.loads(row.recommended_books))
+
+    with patch(
+        "app.services.recommendation_service.rank_recommendations",
+        side_effect=AssertionError("recomputed"),
+    ):
+        response = client.get(f"/recommendations/{user_id}", headers=headers)
+    assert response.status_code == 200
+    assert [book["id"] for book in response.json()] == json.loads(row.recommended_books)
+
+    client.post(
+        "/users/preferences/",
+        json={"preferred_genres": "Fantasy", "preferred_authors": "Bob Mythic"},
+        headers=headers,
+    )
+    db_session.expire_all()
+    assert db_session.query(Recommendation).filter_by(user_id=user_id).count() == 0
+
+    response = client.get(f"/recommendations/{user_id}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()[0]["id"] == create_catalog[1].id
+    assert db_session.query(Recommendation).filter_by(user_id=user_id).count() == 1
+
+    # Books entering the user's list expire the row
+    book = models.Book(
+        title="Wizard School",
+        author="Dee Arcane",
+        genre="Fantasy",
+        year_of_publication=2020,
+        content="Wizards and dragons study magic in an enchanted castle.",
+    )
+    db_session.add(book)
+    db_session.commit()
+    assert get_precomputed_recommendations(db_session, user_id) is not None
+    index_book(db_session, book.id)
+    assert get_precomputed_recommendations(db_session, user_id) is None
+
+    # A concurrent request storing the row first does not fail this one
+    def store_concurrently(db, user_id, book_ids, scores):
+        db.add(Recommendation(user_id=user_id, recommended_books="[]"))
+
+    with patch(
+        "app.services.recommendation_service.store_recommendations",
+        side_effect=store_concurrently,
+    ):
+        response = client.get(f"/recommendations/{user_id}", headers=headers)
+    assert response.status_code == 200
+    assert book.id in [book["id"] for book in response.json()]
+
+
+def test_catalog_changes_expire_only_affected_recommendations(
+    db_session, create_catalog, recommendation_model_dir, mock_redis
+):
+    """
+    Test that a book change only expires the stored recommendations it
+    alters, marking those users dirty, and keeps the others.
+    """
+    from app import models
+    from app.models import DirtyUser, Recommendation, User, UserPreferences
+    from app.services.recommendation_service import (
+        get_precomputed_recommendations,
+        index_book,
+        store_recommendations,
+        train_recommendation_model,
+        unindex_book,
+    )
+
+    space, dragon, harbor = create_catalog
+    train_recommendation_model(db_session)
+    fantasy, scifi = (
+        User(email=f"reader{i}@example.com", username=f"r{i}") for i in range(2)
+    )
+    db_session.add_all([fantasy, scifi])
+    db_session.commit()
+    db_session.add_all(
+        [
+            UserPreferences(
+                user_id=fantasy.id,
+                preferred_genres="Fantasy",
+                preferred_authors="Bob Mythic",
+            ),
+            UserPreferences(
+                user_id=scifi.id,
+                preferred_genres="Science Fiction",
+                preferred_authors="Ann Stellar",
+            ),
+        ]
+    )
+    # Full lists: a new book enters one when it beats the last score
+    store_recommendations(
+        db_session, fantasy.id, [dragon.id] + list(range(1001, 1010)), [0.5] * 9 + [0]
+    )
+    store_recommendations(
+        db_session, scifi.id, [space.id] + list(range(2001, 2010)), [0.9] * 10
+    )
+    db_session.commit()
+
+    book = models.Book(
+        title="Wizard School",
+        author="Dee Arcane",
+        genre="Fantasy",
+        year_of_publication=2020,
+        content="Fantasy wizards and dragons study magic in an enchanted castle.",
+    )
+    db_session.add(book)
+    db_session.commit()
+    index_book(db_session, book.id)
+    assert get_precomputed_recommendations(db_session, fantasy.id) is None
+    assert get_precomputed_recommendations(db_session, scifi.id) is not None
+    assert [row.user_id for row in db_session.query(DirtyUser)] == [fantasy.id]
+    mock_redis.delete.assert_called()
+
+    # Removing a listed book expires the lists holding it
+    unindex_book(db_session, space.id)
+    assert db_session.query(Recommendation).count() == 0
+    assert {row.user_id for row in db_session.query(DirtyUser)} == {
+        fantasy.id,
+        scifi.id,
+    }
+
+
+def test_precompute_only_dirty_users(
+    client,
+    user_token,
+    admin_token,
+    db_session,
+    set_user_preferences,
+    create_catalog,
+    recommendation_model_dir,
+):
+    """
+    Test that training marks every user dirty, that a precompute run clears
+    the marks, and that a preference change only marks that user.
+    """
+    from app.models import DirtyUser, Recommendation
+    from app.services.recommendation_service import train_recommendation_model
+
+    user_id = set_user_preferences["user_id"]
+    train_recommendation_model(db_session)
+    assert [row.user_id for row in db_session.query(DirtyUser)] == [user_id]
+
+    admin_headers = {"Authorization": f"Bearer {admin_token}"}
+    response = client.post("/admin/precompute-recommendations", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json() == {"recomputed": 1, "cleared": 1}
+    db_session.expire_all()
+    assert db_session.query(DirtyUser).count() == 0
+    row = db_session.query(Recommendation).filter_by(user_id=user_id).one()
+    assert json.loads(row.recommended_books)
+
+    client.post(
+        "/users/preferences/",
+        json={"preferred_genres": "Fantasy", "preferred_authors": "Bob Mythic"},
+        headers={"Authorization": f"Bearer {user_token}"},
+    )
+    db_session.expire_all()
+    dirty = db_session.query(DirtyUser).one()
+    assert (dirty.user_id, dirty.reason) == (user_id, "preferences")
+
+    response = client.post("/admin/precompute-recommendations", headers=admin_headers)
+    assert response.json() == {"recomputed": 1, "cleared": 1}
+    db_session.expire_all()
+    row = db_session.query(Recommendation).filter_by(user_id=user_id).one()
+    assert json.loads(row.recommended_books)[0] == create_catalog[1].id
+
+
+def test_users_are_marked_dirty_without_on_conflict(
+    db_session, set_user_preferences, monkeypatch
+):
+    """
+    Test that users are marked and re-marked on databases without
+    INSERT ... ON CONFLICT.
+    """
+    from app.models import DirtyUser
+    from app.services import dirty_user_service
+
+    monkeypatch.setattr(dirty_user_service, "_upsert", lambda db: None)
+    user_id = set_user_preferences["user_id"]
+    db_session.query(DirtyUser).delete()
+    db_session.commit()
+
+    dirty_user_service.mark_users_dirty(db_session, [user_id, user_id])
+    db_session.commit()
+    first = db_session.query(DirtyUser).one()
+    assert (first.user_id, first.reason) == (user_id, "preferences")
+    marked_at = first.marked_at
+
+    assert dirty_user_service.mark_all_users_dirty(db_session) == 1
+    db_session.expire_all()
+    dirty = db_session.query(DirtyUser).one()
+    assert (dirty.user_id, dirty.reason) == (user_id, "model")
+    assert dirty.marked_at >= marked_at
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_full_precompute_is_chunked_and_resumable(
+    db_session, set_user_preferences, create_catalog, recommendation_model_dir, workers
+):
+    """
+    Test that a full precompute resumes from the chunks checkpointed by an
+    interrupted run, and that a completed run leaves nothing to skip.
+    """
+    from app.models import DirtyUser, PrecomputeChunk, Recommendation, UserPreferences
+    from app.services.precompute_service import (
+        precompute_recommendations_for_all_users,
+    )
+    from app.services.recommendation_service import train_recommendation_model
+
+    user_id = set_user_preferences["user_id"]
+    db_session.add(
+        UserPreferences(
+            user_id=user_id + 1, preferred_genres="Romance", preferred_authors=""
+        )
+    )
+    db_session.commit()
+    train_recommendation_model(db_session)
+
+    result = precompute_recommendations_for_all_users(
+        db_session, chunk_size=1, workers=workers
+    )
+    assert (result["chunks"], result["users"], result["workers"]) == (2, 2, workers)
+    db_session.expire_all()
+    assert db_session.query(Recommendation).count() == 2
+    assert db_session.query(DirtyUser).count() == 0
+    assert db_session.query(PrecomputeChunk).count() == 0
+
+    # A later run for the same model recomputes everyone
+    result = precompute_recommendations_for_all_users(
+        db_session, chunk_size=1, workers=workers
+    )
+    assert (result["chunks"], result["users"]) == (2, 2)
+
+    # A run interrupted after one chunk resumes from the chunk left
+    db_session.add(
+        PrecomputeChunk(
+            model_version=result["version"],
+            start_user_id=user_id,
+            stop_user_id=user_id + 1,
+        )
+    )
+    db_session.commit()
+    result = precompute_recommendations_for_all_users(
+        db_session, chunk_size=1, workers=workers
+    )
+    assert (result["chunks"], result["users"]) == (1, 1)
+
+    # Checkpoints of another chunk size are not resumed
+    db_session.add(
+        PrecomputeChunk(
+            model_version=result["version"],
+            start_user_id=user_id,
+            stop_user_id=user_id + 1,
+        )
+    )
+    db_session.commit()
+    result = precompute_recommendations_for_all_users(
+        db_session, chunk_size=2, workers=1
+    )
+    assert result["users"] == 2
+    assert db_session.query(PrecomputeChunk).count() == 0
+
+
+def test_fallback_recommendations(
+    client, user_token, db_session, create_catalog, recommendation_model_dir, mock_redis
+):
+    """
+    Test that users without preferences, or any user while no model has been
+    trained, get the top-rated books, favouring their preferred genres.
+    """
+    from app.models import Review, User
+    from app.services.fallback_service import refresh_fallback_lists
+
+    mock_redis.get.return_value = None
+    user = db_session.query(User).filter_by(email="testuser@example.com").one()
+    space, dragon, harbor = create_catalog
+    for book, rating in ((space, 5), (space, 5), (dragon, 4), (harbor, 2)):
+        db_session.add(
+            Review(book_id=book.id, user_id=user.id, review_text="", rating=rating)
+        )
+    db_session.commit()
+    refresh_fallback_lists(db_session)
+    headers = {"Authorization": f"Bearer {user_token}"}
+
+    response = client.get(f"/recommendations/{user.id}", headers=headers)
+    assert response.status_code == 200
+    assert [book["id"] for book in response.json()] == [
+        space.id,
+        dragon.id,
+        harbor.id,
+    ]
+
+    client.post(
+        "/users/preferences/",
+        json={"preferred_genres": "Romance", "preferred_authors": ""},
+        headers=headers,
+    )
+    response = client.get(f"/recommendations/{user.id}?full=true", headers=headers)
+    assert response.status_code == 200
+    assert [book["id"] for book in response.json()][:1] == [harbor.id]
+    assert response.json()[0]["content"] == harbor.content
+
+    # Books deleted since the lists were built are skipped
+    db_session.query(Review).filter_by(book_id=harbor.id).delete()
+    db_session.delete(harbor)
+    db_session.commit()
+    response = client.get(f"/recommendations/{user.id}", headers=headers)
+    assert response.status_code == 200
+    assert [book["id"] for book in response.json()] == [space.id, dragon.id]
+
+
+def test_stale_fallback_lists_are_refreshed_once(
+    db_session, create_catalog, monkeypatch
+):
+    """
+    Test that stale fallback lists keep being served while a single background
+    rebuild runs.
+    """
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.services import fallback_service
+
+    fallback_service.refresh_fallback_lists(db_session)
+    stale = fallback_service._lists["cards"]
+    monkeypatch.setattr(fallback_service, "FALLBACK_REFRESH_SECONDS", 0)
+    release, builds = threading.Event(), []
+
+    def slow_build(db):
+        builds.append(db)
+        release.wait(5)
+        return {fallback_service.GLOBAL: []}
+
+    monkeypatch.setattr(fallback_service, "build_fallback_lists", slow_build)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        served = list(
+            pool.map(lambda _: fallback_service._current_lists(db_session), range(4))
+        )
+    assert all(lists is stale for lists in served)
+    release.set()
+    with fallback_service._refresh_lock:
+        assert len(builds) == 1
+    assert fallback_service._lists["cards"] == {fallback_service.GLOBAL: []}
+
+
+def test_preference_vectors_are_stored(
+    db_session, set_user_preferences, create_catalog, recommendation_model_dir
+):
+    """
+    Test that preference vectors are stored with the preferences, reused while
+    the preferences and model are unchanged, and refreshed otherwise.
+    """
+    from app.models import UserPreferences
+    from app.services.model_store_service import (
+        RecommendationModel,
+        get_recommendation_model,
+    )
+    from app.services.preference_vector_service import decode_vectors, preference_text
+    from app.services.recommendation_service import (
+        rank_books,
+        rank_recommendations_batch,
+        train_recommendation_model,
+    )
+
+    train_recommendation_model(db_session)
+    model = get_recommendation_model()
+    row = db_session.query(UserPreferences).one()
+    first = rank_recommendations_batch([row])
+    db_session.commit()
+    assert row.vector_version.startswith(f"{model.version}:")
+    stored = decode_vectors([row.preference_vector], model.matrix.shape[1])
+    expected = model.transform([preference_text(row)])
+    assert abs(stored - expected).max() < 1e-6
+
+    with patch.object(
+        RecommendationModel, "transform", side_effect=AssertionError("vectorized")
+    ):
+        assert rank_recommendations_batch([row]) == first
+        assert rank_books(db_session, row, "hybrid") == first[row.user_id]
+
+    row.preferred_genres = "Fantasy"
+    db_session.commit()
+    stale_version = row.vector_version
+    ranking = rank_recommendations_batch([row])[row.user_id]
+    assert row.vector_version != stale_version
+    assert ranking[0][0] == create_catalog[1].id
@@ -1,6 +1,8 @@
 import logging
 from unittest.mock import AsyncMock, patch
 
+import pytest
+
 # Set up a logger for the test
 logger = logging.getLogger(__name__)
 
@@ -30,7 +32,10 @@ def test_generate_book_summary(
     )  # Ensure that the summary is generated
 
 
-@patch("app.routers.summarization.generate_summary_for_reviews")
+@patch(
+    "app.services.review_summary_service.generate_summary_for_reviews",
+    new_callable=AsyncMock,
+)
 def test_generate_review_summary(
     mock_generate_review_summary, client, create_test_review, admin_token
 ):
@@ -54,8 +59,8 @@ def test_generate_review_summary(
     assert (
         data["summary"] == "This is a mocked review summary."
     )  # Ensure that the summary is generated
-    assert "reviews" in data
-    assert len(data["reviews"]) > 0  # Ensure that reviews were used
+    assert data["review_count"] == 1  # Ensure that reviews were used
+    assert data["stale"] is False
 
 
 def test_generate_book_summary_book_not_found(client, admin_token):
@@ -91,3 +96,531 @@ def test_generate_review_summary_no_reviews(client, create_test_book, admin_toke
     logger.debug(f"No reviews found response: {response.json()}")
     assert response.status_code == 404
     assert response.json()["detail"] == "No reviews found for this book"
+
+
+class WordTokenizer:
+    """
+    Stand-in for the model tokenizer that counts one token per word.
+    """
+
+    def __call__(self, texts, add_special_tokens=True):
+        return {"input_ids": [text.split() for text in texts]}
+
+
+def test_concurrent_summaries_are_batched(monkeypatch):
+    """
+    Test that concurrent summarization requests run as one pipeline batch and
+    that every caller gets its own summary.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.services import summarization_service
+
+    batches = []
+
+    def fake_summarizer(texts, **kwargs):
+        batches.append(len(texts))
+        return [{"summary_text": text.split()[-1]} for text in texts]
+
+    monkeypatch.setattr(
+        summarization_service, "get_summarizer", lambda: fake_summarizer
+    )
+    monkeypatch.setattr(summarization_service, "get_tokenizer", WordTokenizer)
+    monkeypatch.setattr(
+        summarization_service,
+        "_batcher",
+        summarization_service.SummarizationBatcher(
+            8, 0.2, executor=ThreadPoolExecutor(1)
+        ),
+    )
+
+    async def summarize_all():
+        return await asyncio.gather(
+            *(
+                summarization_service.generate_summary_for_content(f"book-{i}")
+                for i in range(5)
+            )
+        )
+
+    assert asyncio.run(summarize_all()) == [f"book-{i}" for i in range(5)]
+    assert batches == [5]
+
+
+def test_long_content_is_summarized_in_chunks(monkeypatch):
+    """
+    Test that content longer than the model window is split into chunks that
+    are summarized in one parallel batch, then reduced into one summary.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.services import summarization_service
+
+    batches = []
+
+    def fake_summarizer(texts, **kwargs):
+        batches.append(texts)
+        return [{"summary_text": f"Part {i}."} for i, _ in enumerate(texts)]
+
+    monkeypatch.setattr(
+        summarization_service, "get_summarizer", lambda: fake_summarizer
+    )
+    monkeypatch.setattr(summarization_service, "get_tokenizer", WordTokenizer)
+    monkeypatch.setattr(summarization_service, "SUMMARIZATION_CHUNK_TOKENS", 20)
+    monkeypatch.setattr(
+        summarization_service,
+        "_batcher",
+        summarization_service.SummarizationBatcher(
+            8, 0.05, executor=ThreadPoolExecutor(1)
+        ),
+    )
+    sentences = [f"Sentence {i} of the long book." for i in range(10)]
+
+    summary = asyncio.run(
+        summarization_service.generate_summary_for_content(" ".join(sentences))
+    )
+
+    map_batch, reduce_batch = batches
+    assert len(map_batch) > 1
+    assert all(len(text.split()) <= 20 for text in map_batch)
+    assert all(any(sentence in text for text in map_batch) for sentence in sentences)
+    assert reduce_batch == [
+        f"{summarization_service.REDUCE_CONTEXT} "
+        + " ".join(f"Part {i}." for i in range(len(map_batch)))
+    ]
+    assert summary == "Part 0."
+
+
+def test_content_is_tokenized_off_the_event_loop(monkeypatch):
+    """
+    Test that loading the tokenizer and tokenizing the content do not run on
+    the thread of the event loop.
+    """
+    import asyncio
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.services import summarization_service
+
+    threads = set()
+
+    def get_tokenizer():
+        threads.add(threading.get_ident())
+        return WordTokenizer()
+
+    monkeypatch.setattr(
+        summarization_service,
+        "get_summarizer",
+        lambda: lambda texts, **kwargs: [{"summary_text": "Part."} for _ in texts],
+    )
+    monkeypatch.setattr(summarization_service, "get_tokenizer", get_tokenizer)
+    monkeypatch.setattr(summarization_service, "SUMMARIZATION_CHUNK_TOKENS", 20)
+    monkeypatch.setattr(
+        summarization_service,
+        "_batcher",
+        summarization_service.SummarizationBatcher(
+            8, 0, executor=ThreadPoolExecutor(1)
+        ),
+    )
+    content = " ".join(f"Sentence {i} of the long book." for i in range(10))
+
+    async def summarize():
+        loop_thread = threading.get_ident()
+        await summarization_service.generate_summary_for_content(content)
+        return loop_thread
+
+    loop_thread = asyncio.run(summarize())
+    assert threads and loop_thread not in threads
+
+
+def test_interactive_summaries_run_first(monkeypatch):
+    """
+    Test that queued interactive requests are summarized before background
+    ones, and that a full queue rejects new requests.
+    """
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.services import summarization_service
+    from app.services.summarization_service import (
+        BACKGROUND,
+        INTERACTIVE,
+        SummarizationBatcher,
+        SummarizationBusyError,
+    )
+
+    release = threading.Event()
+    summarized = []
+
+    def fake_summarizer(texts, **kwargs):
+        release.wait(5)
+        summarized.extend(texts)
+        return [{"summary_text": text} for text in texts]
+
+    monkeypatch.setattr(
+        summarization_service, "get_summarizer", lambda: fake_summarizer
+    )
+    batcher = SummarizationBatcher(1, 0, max_queue=3, executor=ThreadPoolExecutor(1))
+
+    # The first request keeps the only worker busy while the others queue
+    futures = [batcher.submit("first", BACKGROUND)]
+    while batcher._queue or batcher._idle_workers:
+        time.sleep(0.01)
+    futures += [
+        batcher.submit("backfill", BACKGROUND),
+        batcher.submit("user-1", INTERACTIVE),
+        batcher.submit("user-2", INTERACTIVE),
+    ]
+    with pytest.raises(SummarizationBusyError) as busy:
+        batcher.submit("rejected", INTERACTIVE)
+    assert busy.value.retry_after >= 1
+
+    release.set()
+    assert [future.result(5) for future in futures] == [
+        "first",
+        "backfill",
+        "user-1",
+        "user-2",
+    ]
+    assert summarized == ["first", "user-1", "user-2", "backfill"]
+
+
+def test_requests_that_do_not_fit_are_rejected_whole(monkeypatch):
+    """
+    Test that a request with more texts than the queue has room for is
+    rejected without queueing any of them.
+    """
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.services import summarization_service
+    from app.services.summarization_service import (
+        SummarizationBatcher,
+        SummarizationBusyError,
+    )
+
+    release = threading.Event()
+
+    def fake_summarizer(texts, **kwargs):
+        release.wait(5)
+        return [{"summary_text": text} for text in texts]
+
+    monkeypatch.setattr(
+        summarization_service, "get_summarizer", lambda: fake_summarizer
+    )
+    batcher = SummarizationBatcher(1, 0, max_queue=3, executor=ThreadPoolExecutor(1))
+
+    # The first request keeps the only worker busy while the others queue
+    futures = [batcher.submit("first")]
+    while batcher._queue or batcher._idle_workers:
+        time.sleep(0.01)
+    futures += batcher.submit_many(["chunk-1", "chunk-2"])
+    with pytest.raises(SummarizationBusyError):
+        batcher.submit_many(["chunk-3", "chunk-4"])
+    assert [text for _, _, text, _ in sorted(batcher._queue)] == [
+        "chunk-1",
+        "chunk-2",
+    ]
+
+    release.set()
+    assert [future.result(5) for future in futures] == ["first", "chunk-1", "chunk-2"]
+
+
+def test_long_content_is_queued_in_windows(monkeypatch):
+    """
+    Test that content with more chunks than the queue holds is still
+    summarized, a round of batches at a time.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.services import summarization_service
+
+    batches = []
+
+    def fake_summarizer(texts, **kwargs):
+        batches.append(texts)
+        return [{"summary_text": "Part."} for _ in texts]
+
+    monkeypatch.setattr(
+        summarization_service, "get_summarizer", lambda: fake_summarizer
+    )
+    monkeypatch.setattr(summarization_service, "get_tokenizer", WordTokenizer)
+    monkeypatch.setattr(summarization_service, "SUMMARIZATION_CHUNK_TOKENS", 20)
+    monkeypatch.setattr(
+        summarization_service,
+        "_batcher",
+        summarization_service.SummarizationBatcher(
+            2, 0, max_queue=2, executor=ThreadPoolExecutor(1)
+        ),
+    )
+    sentences = [f"Sentence {i} of the long book." for i in range(10)]
+
+    summary = asyncio.run(
+        summarization_service.generate_summary_for_content(" ".join(sentences))
+    )
+
+    chunks = [text for batch in batches[:-1] for text in batch]
+    assert len(chunks) > 2
+    assert all(len(batch) <= 2 for batch in batches)
+    assert all(any(sentence in text for text in chunks) for sentence in sentences)
+    assert summary == "Part."
+
+
+def test_summary_queue_full_returns_503(
+    client, create_catalog, admin_token, monkeypatch
+):
+    """
+    Test that a full summarization queue is reported as 503 with Retry-After.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.services import summarization_service
+
+    monkeypatch.setattr(summarization_service, "get_tokenizer", WordTokenizer)
+    monkeypatch.setattr(
+        summarization_service,
+        "_batcher",
+        summarization_service.SummarizationBatcher(
+            8, 0, max_queue=0, executor=ThreadPoolExecutor(1)
+        ),
+    )
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    response = client.post(
+        f"/summarization/books/{create_catalog[0].id}/summary", headers=headers
+    )
+
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_unchanged_content_summary_is_cached(db_session, monkeypatch):
+    """
+    Test that summarizing unchanged content again is a cache lookup, and that
+    the chunks shared with other content are not summarized again.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.models import SummaryCache
+    from app.services import summarization_service
+
+    batches = []
+
+    def fake_summarizer(texts, **kwargs):
+        batches.append(texts)
+        return [{"summary_text": f"Summary {len(batches)}."} for _ in texts]
+
+    monkeypatch.setattr(
+        summarization_service, "get_summarizer", lambda: fake_summarizer
+    )
+    monkeypatch.setattr(summarization_service, "get_tokenizer", WordTokenizer)
+    monkeypatch.setattr(summarization_service, "SUMMARIZATION_CHUNK_TOKENS", 20)
+    monkeypatch.setattr(
+        summarization_service,
+        "_batcher",
+        summarization_service.SummarizationBatcher(
+            8, 0, executor=ThreadPoolExecutor(1)
+        ),
+    )
+    part = " ".join(f"Sentence {i} of the first part." for i in range(2))
+
+    def summarize(content):
+        return asyncio.run(
+            summarization_service.generate_summary_for_content(content, db=db_session)
+        )
+
+    first = summarize(f"{part} A short ending.")
+    assert summarize(f"{part} A short ending.") == first
+    assert len(batches) == 2
+
+    summarize(f"{part} A different ending.")
+    assert [len(batch) for batch in batches[2:]] == [1, 1]
+    assert db_session.query(SummaryCache).count() == 7
+
+
+def test_summaries_are_cached_without_on_conflict(db_session, monkeypatch):
+    """
+    Test that summaries are stored, keeping any stored under the same key, on
+    databases without INSERT ... ON CONFLICT.
+    """
+    from app.services import summary_cache_service
+
+    monkeypatch.setattr(summary_cache_service, "_insert", lambda db: None)
+
+    summary_cache_service.store_summaries(db_session, {"a": "First."}, "t5-small")
+    summary_cache_service.store_summaries(
+        db_session, {"a": "Second.", "b": "Other."}, "t5-small"
+    )
+
+    assert summary_cache_service.get_cached_summaries(db_session, ["a", "b"]) == {
+        "a": "First.",
+        "b": "Other.",
+    }
+
+
+def test_summary_cache_is_used_off_the_event_loop(monkeypatch):
+    """
+    Test that the summary cache is read and written outside the thread of the
+    event loop.
+    """
+    import asyncio
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.services import summarization_service
+
+    threads = []
+
+    def get_cached_summaries(db, keys):
+        threads.append(threading.get_ident())
+        return {}
+
+    def store_summaries(db, summaries, model):
+        threads.append(threading.get_ident())
+
+    monkeypatch.setattr(
+        summarization_service,
+        "get_summarizer",
+        lambda: lambda texts, **kwargs: [{"summary_text": "Part."} for _ in texts],
+    )
+    monkeypatch.setattr(summarization_service, "get_tokenizer", WordTokenizer)
+    monkeypatch.setattr(
+        summarization_service, "get_cached_summaries", get_cached_summaries
+    )
+    monkeypatch.setattr(summarization_service, "store_summaries", store_summaries)
+    monkeypatch.setattr(
+        summarization_service,
+        "_batcher",
+        summarization_service.SummarizationBatcher(
+            8, 0, executor=ThreadPoolExecutor(1)
+        ),
+    )
+
+    async def summarize():
+        loop_thread = threading.get_ident()
+        await summarization_service.generate_summary_for_content(
+            "A short book.", db=object()
+        )
+        return loop_thread
+
+    loop_thread = asyncio.run(summarize())
+    assert len(threads) >= 4 and loop_thread not in threads
+
+
+@patch(
+    "app.services.review_summary_service.generate_summary_for_reviews",
+    new_callable=AsyncMock,
+)
+def test_review_summary_is_stored_and_refreshed(
+    mock_generate_review_summary,
+    client,
+    create_catalog,
+    user_token,
+    admin_token,
+    monkeypatch,
+):
+    """
+    Test that a stored review summary is served without running the model,
+    and that it is refreshed in the background once enough reviews arrive.
+    """
+    from app.services import review_summary_service
+
+    monkeypatch.setattr(review_summary_service, "REVIEW_SUMMARY_REFRESH_REVIEWS", 2)
+    mock_generate_review_summary.side_effect = lambda reviews, *args: (
+        f"Summary of {len(reviews)} reviews."
+    )
+    book_id = create_catalog[0].id
+    user_headers = {"Authorization": f"Bearer {user_token}"}
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    def add_review(text):
+        response = client.post(
+            "/reviews",
+            json={"review_text": text, "rating": 4},
+            params={"book_id": book_id},
+            headers=user_headers,
+        )
+        assert response.status_code == 200
+
+    def review_summary():
+        response = client.post(
+            f"/summarization/books/{book_id}/reviews/summary", headers=headers
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    add_review("Great pacing.")
+    assert review_summary() == {
+        "summary": "Summary of 1 reviews.",
+        "review_count": 1,
+        "stale": False,
+    }
+    add_review("Lovely characters.")
+    assert review_summary()["stale"] is True
+    assert review_summary()["summary"] == "Summary of 1 reviews."
+    assert mock_generate_review_summary.call_count == 1
+
+    # The stale summary is served while the refresh runs after the response,
+    # which only summarizes the new reviews into the previous summary
+    add_review("A satisfying ending.")
+    assert review_summary()["summary"] == "Summary of 1 reviews."
+    assert review_summary() == {
+        "summary": "Summary of 2 reviews.",
+        "review_count": 3,
+        "stale": False,
+    }
+    assert mock_generate_review_summary.call_count == 2
+    reviews, _, _, previous_summary = mock_generate_review_summary.call_args.args
+    assert [review.split(" || ")[0] for review in reviews] == [
+        "User Review: Lovely characters.",
+        "User Review: A satisfying ending.",
+    ]
+    assert previous_summary == "Summary of 1 reviews."
+
+
+def test_new_reviews_are_folded_into_bounded_inputs(monkeypatch):
+    """
+    Test that folding new reviews into a summary never sends the model more
+    than its input window, however many reviews there are.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.services import summarization_service
+
+    batches = []
+
+    def fake_summarizer(texts, **kwargs):
+        batches.append(texts)
+        return [{"summary_text": "Readers liked it."} for _ in texts]
+
+    monkeypatch.setattr(
+        summarization_service, "get_summarizer", lambda: fake_summarizer
+    )
+    monkeypatch.setattr(summarization_service, "get_tokenizer", WordTokenizer)
+    monkeypatch.setattr(summarization_service, "SUMMARIZATION_CHUNK_TOKENS", 40)
+    monkeypatch.setattr(
+        summarization_service,
+        "_batcher",
+        summarization_service.SummarizationBatcher(
+            8, 0.05, executor=ThreadPoolExecutor(1)
+        ),
+    )
+    reviews = [f"User Review: Review {i}. || User Rating: 4" for i in range(10)]
+
+    summary = asyncio.run(
+        summarization_service.generate_summary_for_reviews(
+            reviews, previous_summary="Earlier readers loved it."
+        )
+    )
+
+    assert summary == "Readers liked it."
+    inputs = [text for batch in batches for text in batch]
+    assert all(len(text.split()) <= 40 for text in inputs)
+    assert sum("Review" in text and "User Rating" in text for text in inputs) > 1
+    assert any("Earlier readers loved it." in text for text in batches[-1])